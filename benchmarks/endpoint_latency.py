@@ -0,0 +1,80 @@
+"""
+Measure latency of lightweight endpoints while clip jobs are in flight.
+
+    uvicorn clip_generator.app.main:app &
+    python benchmarks/endpoint_latency.py --filename uploads/stream.mp4 --profile-id <id> --jobs 2
+
+Samples GET latency for the probe endpoints on an idle server, then submits
+``--jobs`` clip generation requests and samples again while they run. Prints
+p50/p95/p99 per phase; with the job queue the loaded p99 should stay close to
+the idle one.
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+import numpy as np
+
+
+async def sample(client, paths, seconds, concurrency):
+    latencies = []
+    deadline = time.perf_counter() + seconds
+
+    async def probe(path):
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            response = await client.get(path)
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(probe(paths[i % len(paths)]) for i in range(concurrency)))
+    return np.array(latencies) * 1000
+
+
+def report(name, latencies_ms):
+    p50, p95, p99 = np.percentile(latencies_ms, [50, 95, 99])
+    print(f"{name:>8}: n={len(latencies_ms):6d}  p50={p50:7.1f}ms  p95={p95:7.1f}ms  p99={p99:7.1f}ms")
+    return p99
+
+
+async def run(args):
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=60) as client:
+        idle = report("idle", await sample(client, args.paths, args.seconds, args.concurrency))
+
+        submitted = []
+        for i in range(args.jobs):
+            started = time.perf_counter()
+            response = await client.post("/generate-clips", json={
+                "filename": args.filename,
+                "profile_id": args.profile_id,
+                "title": f"latency-benchmark-{i}",
+                "video_id": f"latency-benchmark-{i}",
+            })
+            response.raise_for_status()
+            submitted.append(response.json()["job_id"])
+            print(f"submitted job {submitted[-1]} ({response.status_code}) "
+                  f"in {(time.perf_counter() - started) * 1000:.1f}ms")
+
+        loaded = report("loaded", await sample(client, args.paths, args.seconds, args.concurrency))
+        print(f"p99 ratio loaded/idle: {loaded / idle:.2f}")
+
+        for job_id in submitted:
+            job = (await client.get(f"/api/jobs/{job_id}")).json()
+            print(f"job {job_id}: {job['status']} (stage {job['stage']})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--filename", required=True, help="video to clip (local path or Supabase path)")
+    parser.add_argument("--profile-id", required=True)
+    parser.add_argument("--jobs", type=int, default=1)
+    parser.add_argument("--seconds", type=float, default=20.0, help="sampling time per phase")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--paths", nargs="+", default=["/api/getServerStatus", "/api/jobs?limit=5"])
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+Compare clip render backends on a local source video.
+
+    python benchmarks/render_backends.py path/to/source.mp4 --start 120 --duration 45
+
+Prints wall time per backend normalised to seconds per clip-minute and the
+speedup of each backend over MoviePy.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from clip_generator.utils.clipper import CROP_H, CROP_W
+from clip_generator.utils.renderer import RENDERERS
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("source")
+    parser.add_argument("--start", type=float, default=0.0)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--backends", nargs="+", default=list(RENDERERS))
+    args = parser.parse_args()
+
+    t0, t1 = args.start, args.start + args.duration
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for backend in args.backends:
+            timings = []
+            for run in range(args.repeat):
+                out = os.path.join(tmp, f"{backend}_{run}.mp4")
+                thumb = os.path.join(tmp, f"{backend}_{run}.jpg")
+                started = time.perf_counter()
+                RENDERERS[backend](args.source, out, thumb, t0, t1, CROP_W, CROP_H)
+                timings.append(time.perf_counter() - started)
+            results[backend] = min(timings)
+
+    baseline = results.get("moviepy")
+    for backend, seconds in results.items():
+        per_minute = seconds / (args.duration / 60)
+        speedup = f"{baseline / seconds:.1f}x" if baseline else "-"
+        print(f"{backend:>8}: {seconds:7.2f}s  ({per_minute:6.2f}s per clip-minute, {speedup} vs moviepy)")
+
+
+if __name__ == "__main__":
+    main()
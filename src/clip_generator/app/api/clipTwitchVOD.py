@@ -1,25 +1,22 @@
-import os
 import re
 import logging
-import subprocess
-import asyncio
 from fastapi import APIRouter, HTTPException
 from fastapi.concurrency import run_in_threadpool
-from pydantic import BaseModel
-from streamlink import Streamlink, StreamError
-from clip_generator.app.models.request import ClipRequest
-from clip_generator.app.api.generateClips import generate_clips
-from clip_generator.utils.supabaseClient.supabase import supabase
+from streamlink import StreamError
+from clip_generator.app.services.media_store import get_media_store, source_key
+from clip_generator.utils.hls_download import HLSError
+from clip_generator.utils.timeline import Timeline, range_tag
+from clip_generator.utils.twitch_vod import NoPlayableStream, download_twitch_vod
+from clip_generator.app.models.request import ClipRequest, RangeRequest
+from clip_generator.app.services.clip_jobs import enqueue_clip_job
+from clip_generator.utils.supabaseClient.resumable_upload import UploadFailed, storage_uploader
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 SUPABASE_BUCKET = 'videos'
-PROJECT_ROOT   = os.getcwd()
-OUTPUT_DIR     = os.path.join(PROJECT_ROOT, "output")
-os.makedirs(OUTPUT_DIR, exist_ok=True)
 
-class DownloadRequest(BaseModel):
+class DownloadRequest(RangeRequest):
     vod_url: str
     title: str
     storage: str = "local"
@@ -41,96 +38,59 @@ async def download_vod(req: DownloadRequest):
     vod_id = match.group(1)
     logger.info("✔ VOD ID: %s", vod_id)
 
-    mp4_path = os.path.join(OUTPUT_DIR, f"{vod_id}.mp4")
+    # Only the segments overlapping the requested ranges are fetched
+    ranges = req.requested_ranges()
+    source = source_key("twitch", vod_id, quality=req.quality, ranges=range_tag(ranges).lstrip("_"))
 
-    # 2. Check if already downloaded
-    if os.path.exists(mp4_path):
-        logger.info("✔ Video already downloaded at %s", mp4_path)
-    else:
-        # 3. Download if not present
-        session = Streamlink()
-        logger.info("→ Resolving streams for %s", req.vod_url)
+    def download(mp4_path):
+        # 2-3. Resolve the stream and fetch it (only when the media store doesn't have it yet)
         try:
-            streams = session.streams(req.vod_url)
+            download_twitch_vod(req.vod_url, req.quality, mp4_path, ranges)
         except StreamError as e:
             logger.exception("✗ Streamlink resolution error")
             raise HTTPException(400, f"Stream resolution failed: {e}")
-        if not streams:
+        except NoPlayableStream:
             logger.warning("✗ No playable streams found")
             raise HTTPException(404, "No playable streams found")
-        logger.info("✔ Qualities: %s", ", ".join(streams.keys()))
+        except HLSError as e:
+            logger.error("✗ HLS download failed: %s", e)
+            raise HTTPException(500, f"Download failed: {e}")
 
-        stream = streams.get(req.quality) or streams.get("best")
-        chosen = req.quality if req.quality in streams else "best"
-        logger.info("✔ Selected quality: %s", chosen)
-
-        ts_path  = os.path.join(OUTPUT_DIR, f"{vod_id}.ts")
-        logger.info("→ Downloading TS to %s", ts_path)
-
-        def sync_download():
-            fd = stream.open()
-            total_bytes = 0
-            try:
-                with open(ts_path, "wb") as out_file:
-                    last_logged_mb = 0
-                    while True:
-                        chunk = fd.read(1024*1024)
-                        if not chunk:
-                            break
-                        out_file.write(chunk)
-                        total_bytes += len(chunk)
-                        current_mb = total_bytes // (5 * 1024 * 1024)
-                        if current_mb > last_logged_mb:
-                            logger.info("… downloaded %d MB", current_mb * 5)
-                            last_logged_mb = current_mb
-            finally:
-                fd.close()
-            logger.info("✔ TS download complete: %d MB", total_bytes//(1024*1024))
-
-        await run_in_threadpool(sync_download)
-
-        # Remux TS → MP4
-        logger.info("→ Remuxing to MP4 at %s", mp4_path)
-        ff = subprocess.run(
-            ["ffmpeg", "-y", "-i", ts_path, "-c", "copy", mp4_path],
-            capture_output=True, text=True
-        )
-        if ff.returncode != 0:
-            logger.error("✗ FFmpeg error: %s", ff.stderr.strip())
-            raise HTTPException(500, "Error converting TS to MP4")
-        logger.info("✔ Remux complete, file size: %.1f MB", os.path.getsize(mp4_path)/1e6)
-
-        try:
-            os.remove(ts_path)
-        except OSError:
-            logger.warning("Could not remove temp TS file: %s", ts_path)
+    # Concurrent requests for the same VOD share one download
+    entry = await run_in_threadpool(get_media_store().fetch, source, download)
+    mp4_path = entry["path"]
+    timeline = Timeline.load(mp4_path)
+    logger.info("✔ Video ready at %s (%.1f MB)", mp4_path, entry["size"]/1e6)
 
     # 4. Optionally upload to Supabase (if requested)
     if req.storage.lower() == "supabase":
         logger.info("→ Uploading %s to Supabase bucket '%s'", mp4_path, SUPABASE_BUCKET)
-        if not supabase:
+        if not storage_uploader:
             logger.error("✗ Supabase not configured")
             raise HTTPException(500, "Supabase not configured")
-        with open(mp4_path, "rb") as f:
-            data = f.read()
-        res = supabase.storage.from_(SUPABASE_BUCKET).upload(f"{req.profile_id}/{vod_id}.mp4", data)
-        if res.get("error"):
-            logger.error("✗ Supabase upload error: %s", res['error']['message'])
-            raise HTTPException(500, f"Supabase upload failed: {res['error']['message']}")
-        url = supabase.storage.from_(SUPABASE_BUCKET).get_public_url(f"{req.profile_id}{vod_id}.mp4")["publicURL"]
+        # streamed in bounded parts; the MP4 is never read into memory whole
+        try:
+            url = await run_in_threadpool(storage_uploader.upload_file, mp4_path, SUPABASE_BUCKET,
+                                          f"{req.profile_id}/{vod_id}{range_tag(ranges)}.mp4")
+        except UploadFailed as e:
+            logger.error("✗ Supabase upload error: %s", e)
+            raise HTTPException(500, f"Supabase upload failed: {e}")
         logger.info("✔ Uploaded, public URL: %s", url)
-        return {"url": url}
+        # a partial download is named after its ranges; its timeline maps clip times back to the VOD
+        return {"url": url, "timeline": timeline.to_list() if timeline else None}
 
-    # 5. Start generate_clips in the background
+    # 5. Queue clip generation for the background workers
     clipRequestData = ClipRequest(
         filename=mp4_path,
         profile_id=req.profile_id,
         title=req.title,
         video_id=req.video_id,
+        timeline=timeline.to_list() if timeline else None,
     )
 
-    asyncio.create_task(generate_clips(clipRequestData))
-    logger.info("Clips generation for this video has started.")
+    # An identical request that is still queued or running is joined, not repeated
+    job = await run_in_threadpool(enqueue_clip_job, clipRequestData, entry["sha256"])
+    logger.info("Clip generation %s job %s", "attached to" if job["deduplicated"] else "queued as", job["id"])
 
     # 6. Return local path immediately
-    return {"local_path": mp4_path}
+    return {"local_path": mp4_path, "job_id": job["id"], "deduplicated": job["deduplicated"]}
@@ -1,26 +1,22 @@
-import os
 import re
 import logging
-import subprocess
-import asyncio
 from fastapi import APIRouter, HTTPException
 from fastapi.concurrency import run_in_threadpool
-from pydantic import BaseModel
 import yt_dlp  # Using yt-dlp for YouTube downloads
-from clip_generator.app.models.request import ClipRequest
-from clip_generator.app.api.generateClips import generate_clips
-from clip_generator.utils.supabaseClient.supabase import supabase
+from clip_generator.app.services.media_store import get_media_store, source_key
+from clip_generator.utils.timeline import Timeline, range_tag
+from clip_generator.utils.youtube_sections import download_sections
+from clip_generator.app.models.request import ClipRequest, RangeRequest
+from clip_generator.app.services.clip_jobs import enqueue_clip_job
+from clip_generator.utils.supabaseClient.resumable_upload import UploadFailed, storage_uploader
 from clip_generator.config import settings
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 SUPABASE_BUCKET = 'videos'
-PROJECT_ROOT   = os.getcwd()
-OUTPUT_DIR     = os.path.join(PROJECT_ROOT, "output")
-os.makedirs(OUTPUT_DIR, exist_ok=True)
 
-class DownloadRequest(BaseModel):
+class DownloadRequest(RangeRequest):
     video_url: str = "https://www.youtube.com/watch?v=dQw4w9WgXcQ"  # URL of the YouTube video to download
     title: str = "Example YouTube Video"  # Title for the video (used for clip generation)
     storage: str = "local"  # Where to store the video: "local" or "supabase"
@@ -42,16 +38,14 @@ async def download_youtube_video(req: DownloadRequest):
     youtube_id = youtube_id_match.group(1)
     logger.info("✔ YouTube ID: %s", youtube_id)
 
-    mp4_path = os.path.join(OUTPUT_DIR, f"{youtube_id}.mp4")
+    # Only the requested ranges are fetched (yt-dlp download_ranges)
+    ranges = req.requested_ranges()
+    source = source_key("youtube", youtube_id, quality=req.quality, ranges=range_tag(ranges).lstrip("_"))
 
-    # 2. Check if already downloaded
-    if os.path.exists(mp4_path):
-        logger.info("✔ Video already downloaded at %s", mp4_path)
-    else:
-        # 3. Download if not present using yt-dlp
+    def sync_download(mp4_path):
+        # 2. Download with yt-dlp (only when the media store doesn't have it yet)
         logger.info("→ Downloading YouTube video with ID: %s", youtube_id)
-        
-        # Configure yt-dlp options with fallbacks and better error handling
+
         # Configure yt-dlp options with fallbacks and better error handling
         ydl_opts = {
             'format': f'bestvideo[height<={req.quality.rstrip("p")}]+bestaudio/best[height<={req.quality.rstrip("p")}]/best',
@@ -73,69 +67,74 @@ async def download_youtube_video(req: DownloadRequest):
                               if d['status'] == 'downloading' and d.get('downloaded_bytes') else None)],
         }
         
-        def sync_download():
-            try:
-                logger.info("Starting YouTube download with yt-dlp...")
-                
-                # Use Google API key if available
-                api_key = getattr(settings, 'GOOGLE_API_KEY', None)
-                if api_key:
-                    logger.info("Using Google API key for YouTube access")
-                    ydl_opts['ap_mso'] = api_key
-                
-                with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                    info = ydl.extract_info(req.video_url, download=False)
-                    if info:
-                        logger.info(f"Video found: {info.get('title')} ({info.get('duration_string')})")
-                        available_formats = [f"{f['format_id']} - {f.get('height', 'N/A')}p" for f in info.get('formats', []) if f.get('height')]
-                        logger.info(f"Available qualities: {', '.join(available_formats[:5])}...")
-                    
+        try:
+            logger.info("Starting YouTube download with yt-dlp...")
+
+            # Use Google API key if available
+            api_key = getattr(settings, 'GOOGLE_API_KEY', None)
+            if api_key:
+                logger.info("Using Google API key for YouTube access")
+                ydl_opts['ap_mso'] = api_key
+
+            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                info = ydl.extract_info(req.video_url, download=False)
+                if info:
+                    logger.info(f"Video found: {info.get('title')} ({info.get('duration_string')})")
+                    available_formats = [f"{f['format_id']} - {f.get('height', 'N/A')}p" for f in info.get('formats', []) if f.get('height')]
+                    logger.info(f"Available qualities: {', '.join(available_formats[:5])}...")
+
+                if not ranges:
                     # Actually download the video
                     ydl.download([req.video_url])
-                return True
-            except yt_dlp.utils.DownloadError as e:
-                logger.exception("✗ YouTube download error")
-                if "Private video" in str(e):
-                    raise HTTPException(403, "Cannot download private video")
-                elif "not available" in str(e):
-                    raise HTTPException(404, "Video not available")
-                else:
-                    raise HTTPException(400, f"Download failed: {str(e)}")
-            except Exception as e:
-                logger.exception("✗ Unexpected error during download")
-                raise HTTPException(500, f"Unexpected error: {str(e)}")
-                
-        success = await run_in_threadpool(sync_download)
-        if not success:
-            raise HTTPException(500, "Error downloading YouTube video")
-        logger.info("✔ Download complete, file size: %.1f MB", os.path.getsize(mp4_path)/1e6)
+            if ranges:
+                download_sections(req.video_url, mp4_path, ranges, ydl_opts)
+        except yt_dlp.utils.DownloadError as e:
+            logger.exception("✗ YouTube download error")
+            if "Private video" in str(e):
+                raise HTTPException(403, "Cannot download private video")
+            elif "not available" in str(e):
+                raise HTTPException(404, "Video not available")
+            else:
+                raise HTTPException(400, f"Download failed: {str(e)}")
+        except Exception as e:
+            logger.exception("✗ Unexpected error during download")
+            raise HTTPException(500, f"Unexpected error: {str(e)}")
+
+    # 3. Concurrent requests for the same video share one download
+    entry = await run_in_threadpool(get_media_store().fetch, source, sync_download)
+    mp4_path = entry["path"]
+    timeline = Timeline.load(mp4_path)
+    logger.info("✔ Video ready at %s (%.1f MB)", mp4_path, entry["size"]/1e6)
 
     # 4. Optionally upload to Supabase (if requested)
     if req.storage.lower() == "supabase":
         logger.info("→ Uploading %s to Supabase bucket '%s'", mp4_path, SUPABASE_BUCKET)
-        if not supabase:
+        if not storage_uploader:
             logger.error("✗ Supabase not configured")
             raise HTTPException(500, "Supabase not configured")
-        with open(mp4_path, "rb") as f:
-            data = f.read()
-        res = supabase.storage.from_(SUPABASE_BUCKET).upload(f"{req.profile_id}/{youtube_id}.mp4", data)
-        if res.get("error"):
-            logger.error("✗ Supabase upload error: %s", res['error']['message'])
-            raise HTTPException(500, f"Supabase upload failed: {res['error']['message']}")
-        url = supabase.storage.from_(SUPABASE_BUCKET).get_public_url(f"{req.profile_id}/{youtube_id}.mp4")["publicURL"]
+        # streamed in bounded parts; the MP4 is never read into memory whole
+        try:
+            url = await run_in_threadpool(storage_uploader.upload_file, mp4_path, SUPABASE_BUCKET,
+                                          f"{req.profile_id}/{youtube_id}{range_tag(ranges)}.mp4")
+        except UploadFailed as e:
+            logger.error("✗ Supabase upload error: %s", e)
+            raise HTTPException(500, f"Supabase upload failed: {e}")
         logger.info("✔ Uploaded, public URL: %s", url)
-        return {"url": url}
+        # a partial download is named after its ranges; its timeline maps clip times back to the VOD
+        return {"url": url, "timeline": timeline.to_list() if timeline else None}
 
-    # 5. Start generate_clips in the background
+    # 5. Queue clip generation for the background workers
     clipRequestData = ClipRequest(
         filename=mp4_path,
         profile_id=req.profile_id,
         title=req.title,
         video_id=req.video_id,
+        timeline=timeline.to_list() if timeline else None,
     )
 
-    asyncio.create_task(generate_clips(clipRequestData))
-    logger.info("Clips generation for this video has started.")
+    # An identical request that is still queued or running is joined, not repeated
+    job = await run_in_threadpool(enqueue_clip_job, clipRequestData, entry["sha256"])
+    logger.info("Clip generation %s job %s", "attached to" if job["deduplicated"] else "queued as", job["id"])
 
     # 6. Return local path immediately
-    return {"local_path": mp4_path}
+    return {"local_path": mp4_path, "job_id": job["id"], "deduplicated": job["deduplicated"]}
@@ -1,20 +1,18 @@
-import os
 import re
 import logging
-import subprocess
 from fastapi import APIRouter, HTTPException
 from fastapi.concurrency import run_in_threadpool
-from pydantic import BaseModel
-from streamlink import Streamlink, StreamError
+from streamlink import StreamError
+from clip_generator.app.models.request import RangeRequest
+from clip_generator.app.services.media_store import get_media_store, source_key
+from clip_generator.utils.hls_download import HLSError
+from clip_generator.utils.timeline import Timeline, range_tag
+from clip_generator.utils.twitch_vod import NoPlayableStream, download_twitch_vod
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-PROJECT_ROOT = os.getcwd()
-OUTPUT_DIR = os.path.join(PROJECT_ROOT, "output")
-os.makedirs(OUTPUT_DIR, exist_ok=True)
-
-class DownloadRequest(BaseModel):
+class DownloadRequest(RangeRequest):
     vod_url: str = "https://www.twitch.tv/videos/123456789"  # URL of the Twitch VOD to download
     quality: str = "720p"  # Requested video quality, e.g. "720p", "best"
 
@@ -32,69 +30,29 @@ async def download_vod(req: DownloadRequest):
     vod_id = match.group(1)
     logger.info("✔ VOD ID: %s", vod_id)
 
-    mp4_path = os.path.join(OUTPUT_DIR, f"{vod_id}.mp4")
+    # Only the segments overlapping the requested ranges are fetched
+    ranges = req.requested_ranges()
+    source = source_key("twitch", vod_id, quality=req.quality, ranges=range_tag(ranges).lstrip("_"))
 
-    # 2. Check if already downloaded
-    if os.path.exists(mp4_path):
-        logger.info("✔ Video already downloaded at %s", mp4_path)
-    else:
-        # 3. Download if not present
-        session = Streamlink()
-        logger.info("→ Resolving streams for %s", req.vod_url)
+    def download(mp4_path):
+        # 2-3. Resolve the stream and fetch it (only when the media store doesn't have it yet)
         try:
-            streams = session.streams(req.vod_url)
+            download_twitch_vod(req.vod_url, req.quality, mp4_path, ranges)
         except StreamError as e:
             logger.exception("✗ Streamlink resolution error")
             raise HTTPException(400, f"Stream resolution failed: {e}")
-        if not streams:
+        except NoPlayableStream:
             logger.warning("✗ No playable streams found")
             raise HTTPException(404, "No playable streams found")
-        logger.info("✔ Qualities: %s", ", ".join(streams.keys()))
-
-        stream = streams.get(req.quality) or streams.get("best")
-        chosen = req.quality if req.quality in streams else "best"
-        logger.info("✔ Selected quality: %s", chosen)
-
-        ts_path  = os.path.join(OUTPUT_DIR, f"{vod_id}.ts")
-        logger.info("→ Downloading TS to %s", ts_path)
-
-        def sync_download():
-            fd = stream.open()
-            total_bytes = 0
-            try:
-                with open(ts_path, "wb") as out_file:
-                    last_logged_mb = 0
-                    while True:
-                        chunk = fd.read(1024*1024)
-                        if not chunk:
-                            break
-                        out_file.write(chunk)
-                        total_bytes += len(chunk)
-                        current_mb = total_bytes // (5 * 1024 * 1024)
-                        if current_mb > last_logged_mb:
-                            logger.info("… downloaded %d MB", current_mb * 5)
-                            last_logged_mb = current_mb
-            finally:
-                fd.close()
-            logger.info("✔ TS download complete: %d MB", total_bytes//(1024*1024))
+        except HLSError as e:
+            logger.error("✗ HLS download failed: %s", e)
+            raise HTTPException(500, f"Download failed: {e}")
 
-        await run_in_threadpool(sync_download)
-
-        # Remux TS → MP4
-        logger.info("→ Remuxing to MP4 at %s", mp4_path)
-        ff = subprocess.run(
-            ["ffmpeg", "-y", "-i", ts_path, "-c", "copy", mp4_path],
-            capture_output=True, text=True
-        )
-        if ff.returncode != 0:
-            logger.error("✗ FFmpeg error: %s", ff.stderr.strip())
-            raise HTTPException(500, "Error converting TS to MP4")
-        logger.info("✔ Remux complete, file size: %.1f MB", os.path.getsize(mp4_path)/1e6)
-
-        try:
-            os.remove(ts_path)
-        except OSError:
-            logger.warning("Could not remove temp TS file: %s", ts_path)
+    # Concurrent requests for the same VOD share one download
+    entry = await run_in_threadpool(get_media_store().fetch, source, download)
+    mp4_path = entry["path"]
+    timeline = Timeline.load(mp4_path)
+    logger.info("✔ Video ready at %s (%.1f MB)", mp4_path, entry["size"]/1e6)
 
     # No Supabase upload - simplified API only returns local file path
 
@@ -102,5 +60,6 @@ async def download_vod(req: DownloadRequest):
     return {
         "file_path": mp4_path,
         "video_id": vod_id,
-        "size_mb": round(os.path.getsize(mp4_path)/1e6, 2)
+        "size_mb": round(entry["size"]/1e6, 2),
+        "timeline": timeline.to_list() if timeline else None  # pass on as ClipRequest.timeline
     }
@@ -1,69 +1,38 @@
 from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
 import logging
 from clip_generator.app.models.request import ClipRequest
-from clip_generator.app.services.clip_service import process_video
-from clip_generator.utils.supabaseClient.supabase import supabase
+from clip_generator.app.services.clip_jobs import enqueue_clip_job
 
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
-@router.post("/generate-clips")
+@router.post("/generate-clips", status_code=202)
 async def generate_clips(request_data: ClipRequest):
     """
-    Handle clip generation from uploaded video filename.
-    Also creates a project record in Supabase and updates its status.
-    """
-    try:
-        # Create project with 'processing' status
-        insert_resp = supabase.table("projects").insert({
-            "profile_id": request_data.profile_id,
-            "video_url": request_data.filename,
-            "title": request_data.title,
-            "video_id": request_data.video_id,
-            "status": "processing"
-        }).execute()
-        #print(insert_resp)
-        if insert_resp.data[0]["id"] == None:
-           # logger.error(f"Failed to insert project: {insert_resp.error.message}")
-            raise HTTPException(status_code=500, detail="Failed to create project")
-
-        project_id = insert_resp.data[0]["id"]
-        profile_id = request_data.profile_id
-
-    except Exception as e:
-        logger.exception("Failed to create project in Supabase")
-        raise HTTPException(status_code=500, detail="Failed to create project")
+    Accept a clip generation request and queue it as a background job.
 
+    Returns 202 with the job handle right away; the project record, video
+    processing and Supabase updates all happen in a job worker process.
+    Poll ``GET /api/jobs/{job_id}`` for progress and the result. An identical
+    request that is still queued or running gets that job back
+    (``deduplicated``) instead of a new one.
+    """
     try:
-        logger.info(f"Processing video: {request_data.filename}")
-        result = process_video(request_data.filename, project_id, profile_id)
-        print("process_video result", result)
-        if result.get("status") != "ready":
-            raise HTTPException(status_code=500, detail="Video processing failed")
-        # Update project to 'complete'
-        supabase.table("projects").update({
-            "status": "completed"
-        }).eq("id", project_id).execute()
-
-        clips = result.get("clips", [])
-        if not clips:
-            raise HTTPException(status_code=500, detail="No clips generated")
-
-        supabase.table("clips").insert(clips).execute()
-
-        return {
-            "message": "✅ Processing complete",
-            "clips": result,
-            "project_id": project_id
-        }
-
-    except Exception as e:
-        logger.exception("Clip generation failed")
-
-        # Update project to 'failed'
-        supabase.table("projects").update({
-            "status": "failed"
-        }).eq("id", project_id).execute()
-
-        raise HTTPException(status_code=500, detail=f"Processing failed: {str(e)}")
+        job = await run_in_threadpool(enqueue_clip_job, request_data)
+    except Exception:
+        logger.exception("Failed to queue clip generation")
+        raise HTTPException(status_code=500, detail="Failed to queue clip generation")
+
+    if job["deduplicated"]:
+        logger.info(f"Clip generation for {request_data.filename} attached to job {job['id']}")
+    else:
+        logger.info(f"Queued clip generation for {request_data.filename} as job {job['id']}")
+    return {
+        "message": "Clip generation already in progress" if job["deduplicated"] else "Clip generation queued",
+        "job_id": job["id"],
+        "status": job["status"],
+        "deduplicated": job["deduplicated"],
+        "status_url": f"/api/jobs/{job['id']}",
+    }
@@ -1,6 +1,9 @@
 from fastapi import APIRouter
+from fastapi.concurrency import run_in_threadpool
 import time
 import psutil
+from clip_generator.app.services.job_queue import combine_worker_stats, get_job_queue, get_job_workers
+from clip_generator.app.services.media_store import get_media_store
 
 router = APIRouter()
 start_time = time.time()
@@ -12,4 +15,13 @@ async def api_status():
     uptime_seconds = int(time.time() - start_time)
     uptime_str = time.strftime("%H:%M:%S", time.gmtime(uptime_seconds))
     server_status = "Running" if psutil.cpu_percent() < 90 else "Under Load"
-    return {"uptime": uptime_str, "server_status": server_status}
+    # models and the transcript cache are used by the job workers, which
+    # publish their stats to the job database
+    workers = await run_in_threadpool(get_job_queue().worker_stats)
+    return {
+        "uptime": uptime_str,
+        "server_status": server_status,
+        **combine_worker_stats(workers),
+        "jobs": await run_in_threadpool(get_job_workers().stats),
+        "media_store": await run_in_threadpool(get_media_store().stats),
+    }
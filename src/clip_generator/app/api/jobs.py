@@ -0,0 +1,36 @@
+from typing import Optional
+from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
+import logging
+from clip_generator.app.services.job_queue import STATUSES, get_job_queue
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+
+@router.get("/jobs")
+async def list_jobs(status: Optional[str] = None, limit: int = 50):
+    """List background jobs, most recent first."""
+    if status is not None and status not in STATUSES:
+        raise HTTPException(400, f"Unknown status: {status}")
+    jobs = await run_in_threadpool(get_job_queue().list, status, min(max(limit, 1), 500))
+    return {"jobs": jobs}
+
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Status, per-stage progress and result of one job."""
+    job = await run_in_threadpool(get_job_queue().get, job_id)
+    if job is None:
+        raise HTTPException(404, "Job not found")
+    return job
+
+
+@router.post("/jobs/{job_id}/cancel")
+async def cancel_job(job_id: str):
+    """Cancel a queued job, or stop a running one at its next stage."""
+    job = await run_in_threadpool(get_job_queue().cancel, job_id)
+    if job is None:
+        raise HTTPException(404, "Job not found")
+    logger.info("Cancellation requested for job %s (%s)", job_id, job["status"])
+    return job
@@ -1,32 +1,78 @@
-from fastapi import APIRouter, UploadFile, File
-import os
-from pathlib import Path
-from clip_generator.config import INPUT_DIR
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Request, UploadFile, File
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel
+from clip_generator.app.services.upload_service import (OffsetMismatch, UploadError, save_upload,
+                                                         upload_sessions)
 
 router = APIRouter()
 
 
-def _safe_path(filename: str) -> Path:
-    """Return a safe path within ``INPUT_DIR`` for the given filename.
+class UploadSessionRequest(BaseModel):
+    filename: str
+    size: Optional[int] = None  # total bytes, if known; enforced at finalize
 
-    Only the base name of ``filename`` is used to avoid directory traversal
-    attacks.  The resulting path is validated to ensure it resides inside the
-    uploads directory.
-    """
 
-    safe_name = Path(filename).name
-    target_path = Path(INPUT_DIR) / safe_name
-    target_path.parent.mkdir(parents=True, exist_ok=True)
-    if not target_path.resolve().is_relative_to(Path(INPUT_DIR).resolve()):
-        raise ValueError("Invalid upload path")
-    return target_path
+class FinalizeRequest(BaseModel):
+    sha256: Optional[str] = None  # verified against the received bytes if given
 
 
 @router.post("/upload")
 async def upload_file(file: UploadFile = File(...)):
-    """Save an uploaded file to the local uploads directory using a safe name."""
+    """Stream an uploaded file to the local uploads directory using a safe name."""
+    try:
+        saved = await save_upload(file)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    return {"message": "File uploaded successfully", **saved}
 
-    file_path = _safe_path(file.filename)
-    with open(file_path, "wb") as f:
-        f.write(await file.read())
-    return {"message": "File uploaded successfully", "filename": file_path.name}
\ No newline at end of file
+
+@router.post("/upload/sessions", status_code=201)
+async def create_upload_session(req: UploadSessionRequest):
+    """Start a resumable upload; send the bytes with PUT /upload/sessions/{id}?offset=N."""
+    try:
+        return await run_in_threadpool(upload_sessions.create, req.filename, req.size)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+
+
+@router.get("/upload/sessions/{upload_id}")
+async def get_upload_session(upload_id: str):
+    """Current offset of a resumable upload (where the next part must start)."""
+    try:
+        return await run_in_threadpool(upload_sessions.status, upload_id)
+    except KeyError:
+        raise HTTPException(404, "Upload session not found")
+
+
+@router.put("/upload/sessions/{upload_id}")
+async def put_upload_part(upload_id: str, offset: int, request: Request):
+    """Append the raw request body at ``offset``; 409 with the current offset if it doesn't match."""
+    try:
+        return await upload_sessions.write(upload_id, offset, request.stream())
+    except KeyError:
+        raise HTTPException(404, "Upload session not found")
+    except OffsetMismatch as e:
+        raise HTTPException(409, {"message": str(e), "offset": e.expected})
+    except UploadError as e:
+        raise HTTPException(400, str(e))
+
+
+@router.post("/upload/sessions/{upload_id}/finalize")
+async def finalize_upload(upload_id: str, req: FinalizeRequest = FinalizeRequest()):
+    """Verify the upload and move it into the uploads directory."""
+    try:
+        saved = await run_in_threadpool(upload_sessions.finalize, upload_id, req.sha256)
+    except KeyError:
+        raise HTTPException(404, "Upload session not found")
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    return {"message": "File uploaded successfully", **saved}
+
+
+@router.delete("/upload/sessions/{upload_id}", status_code=204)
+async def abort_upload(upload_id: str):
+    try:
+        await run_in_threadpool(upload_sessions.abort, upload_id)
+    except KeyError:
+        raise HTTPException(404, "Upload session not found")
@@ -1,6 +1,7 @@
 import logging
 import os
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import FileResponse
 from importlib import resources
@@ -11,6 +12,8 @@ from clip_generator.app.api.downloadTwitchVOD import router as downloadTwitchVOD
 from clip_generator.app.api.downloadYoutubeVOD import router as downloadYoutubeVOD
 from clip_generator.app.api.clipTwitchVOD import router as clipTwitchVOD
 from clip_generator.app.api.clipYoutubeVOB import router as clipYoutubeVOD
+from clip_generator.app.api.jobs import router as jobs
+from clip_generator.app.services.job_queue import get_job_workers
 # Initialize app
 app = FastAPI(title="Relyy Video Tools", version="1.0.0")
 app.add_middleware(
@@ -22,6 +25,7 @@ app.add_middleware(
 )
 
 app.include_router(getServerStatus, prefix="/api")
+app.include_router(jobs, prefix="/api", tags=["Jobs"])
 app.include_router(generateClips)
 app.include_router(upload_router)
 app.include_router(clipTwitchVOD, prefix="/api/clips", tags=["Twitch"])
@@ -31,6 +35,16 @@ app.include_router(clipYoutubeVOD, prefix="/api/clips", tags=["YouTube"])
 app.include_router(downloadTwitchVOD, prefix="/api/downloads", tags=["Twitch"])
 app.include_router(downloadYoutubeVOD, prefix="/api/downloads", tags=["YouTube"])
 
+# Clip jobs run in separate worker processes, never on the event loop
+# (each worker loads its Whisper models up front if WHISPER_WARMUP is set)
+@app.on_event("startup")
+async def start_job_workers():
+    await run_in_threadpool(get_job_workers().start)
+
+@app.on_event("shutdown")
+async def stop_job_workers():
+    await run_in_threadpool(get_job_workers().stop)
+
 # Serve the index.html file
 @app.get("/")
 async def serve_index():
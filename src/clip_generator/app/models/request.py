@@ -1,7 +1,23 @@
 # app/models/request.py
 import uuid
-from typing import Optional, List, Dict, Any
-from pydantic import BaseModel
+from typing import Optional, List, Dict, Any, Tuple
+from pydantic import BaseModel, model_validator
+from clip_generator.utils.timeline import normalize_ranges
+
+class RangeRequest(BaseModel):
+    """Optional part of a VOD to fetch, in seconds of the original stream."""
+    start: Optional[float] = None  # e.g., 3600.0
+    end: Optional[float] = None  # e.g., 5400.0; omitted means "to the end"
+    ranges: Optional[List[Tuple[float, Optional[float]]]] = None  # e.g., [[600, 900], [7200, 8100]]
+
+    @model_validator(mode="after")
+    def check_ranges(self):
+        normalize_ranges(self.start, self.end, self.ranges)
+        return self
+
+    def requested_ranges(self):
+        """Merged ``(start, end)`` ranges, or None for the whole VOD."""
+        return normalize_ranges(self.start, self.end, self.ranges)
 
 class ClipRequest(BaseModel):
     
@@ -12,4 +28,7 @@ class ClipRequest(BaseModel):
     # end_time: float  # e.g., 10.0
     title: Optional[Any] = "Video-" + str(uuid.uuid4())  # e.g., "My Clip Title"
     video_id: str
+    # (file_time, vod_time) pieces when the file holds only part of a VOD,
+    # so clip times are stored in original-stream time (see utils/timeline.py)
+    timeline: Optional[List[Tuple[float, float]]] = None
     # caption: str  # e.g., "This is a caption for the clip." 
\ No newline at end of file
@@ -0,0 +1,63 @@
+import hashlib
+import json
+
+from clip_generator import config
+from clip_generator.app.services.job_queue import get_job_queue
+from clip_generator.app.services.upload_service import stored_content_hash
+from clip_generator.utils.supabaseClient.supabase import supabase
+
+# settings that change what a clip job produces
+PIPELINE_SETTINGS = (
+    "WHISPER_MODEL", "WHISPER_COMPUTE_TYPE", "WHISPER_LANGUAGE", "VAD_ENABLED", "VAD_BACKEND",
+    "CANDIDATE_MODE", "CANDIDATE_MIN_SECONDS", "CANDIDATE_MAX_SECONDS", "CANDIDATE_STRIDE",
+    "CANDIDATE_SNAP_TO_CUTS", "SCORE_WEIGHTS", "CLIP_KEYWORDS",
+)
+
+
+def source_work_key(request, content_hash=None):
+    """
+    Key of the per-source work of a clip job (scene detection, envelope,
+    transcript): the source's SHA-256 when known, else its filename, plus the
+    pipeline settings. It leaves out who asked, so jobs of different users on
+    the same source share that work (see ``process_video``).
+    """
+    identity = {
+        "source": content_hash or stored_content_hash(request.filename) or request.filename,
+        "settings": {name: getattr(config, name) for name in PIPELINE_SETTINGS},
+    }
+    return hashlib.sha256(json.dumps(identity, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def clip_job_key(request, content_hash=None):
+    """
+    Single-flight key of a clip job: its per-source work plus the timeline,
+    profile and video the clips are published for.
+    """
+    identity = {
+        "work": source_work_key(request, content_hash),
+        "timeline": request.timeline,
+        "profile_id": request.profile_id,
+        "video_id": request.video_id,
+    }
+    return hashlib.sha256(json.dumps(identity, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def enqueue_clip_job(request, content_hash=None):
+    """
+    Queue a "generate_clips" job for ``request`` (a ``ClipRequest``), or
+    return the identical job already queued or running. Jobs for other
+    profiles on the same source are separate but share its per-source work.
+    """
+    payload = request.model_dump() | {"work_key": source_work_key(request, content_hash)}
+    return get_job_queue().enqueue("generate_clips", payload, dedupe_key=clip_job_key(request, content_hash))
+
+
+def finalize_clip_job(job, status):
+    """
+    Finalizer of "generate_clips" jobs (see ``JOB_FINALIZERS``): show the
+    project as failed or cancelled, including when the worker running the
+    last attempt died and the job was ended by ``JobQueue.recover``.
+    """
+    project_id = job["payload"].get("project_id")
+    if project_id and supabase is not None:
+        supabase.table("projects").update({"status": status}).eq("id", project_id).execute()
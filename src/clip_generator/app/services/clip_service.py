@@ -1,69 +1,156 @@
 import requests
 import os
-from clip_generator.config import INPUT_DIR
-from clip_generator.utils.transcription import transcribe_audio
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor
+from clip_generator.config import CANDIDATE_MODE, OUTPUT_DIR, VAD_BACKEND, VAD_ENABLED, WHISPER_LANGUAGE
+from clip_generator.utils.audio import stream_pcm
+from clip_generator.utils.envelope import ENVELOPE_HOP, extract_envelope
+from clip_generator.utils.transcription import CHUNK_OVERLAP, publish_transcript, transcribe_audio
+from clip_generator.utils.transcript_cache import transcript_cache
+from clip_generator.utils.vad import detect_speech
+from clip_generator.utils.whisper_pool import whisper_pool
+from clip_generator.utils.candidates import candidate_windows
 from clip_generator.utils.clipper import cut_clips
+from clip_generator.utils.scene_detection import detect_raw_scenes, split_scenes
+from clip_generator.utils.timeline import Timeline
+from clip_generator.utils.timing import StageTimer
+from clip_generator.utils.word_index import WordIndex
+from clip_generator.utils.workspace import Workspace
 from clip_generator.utils.supabaseClient.supabase import supabase
+from clip_generator.app.services.media_store import get_media_store, source_key
 
 MAX_CLIPS = 3
 MIN_WORDS = 20
 CHUNK_SIZE = 30.0  # seconds
+VAD_BLOCK_SECONDS = 300.0  # audio per Silero pass
 
-def download_file(path_in_bucket: str, profile_id: str, output_dir: str) -> str:
+def download_file(path_in_bucket: str, profile_id: str) -> str:
     """
     Download a file from Supabase Storage using a signed URL if profile_id is provided,
     otherwise treat it as a public URL.
 
+    The file goes into the media store (app/services/media_store.py), so it is
+    downloaded once however many jobs ask for it, including at the same time.
+
     Args:
         path_in_bucket (str): The path of the file in the 'uploads' bucket.
         profile_id (str): The profile ID; used to determine whether to sign the URL.
-        output_dir (str): The local directory to save the downloaded file.
 
     Returns:
         str: The local file path of the downloaded file.
     """
-    if not os.path.exists(output_dir):
-        os.makedirs(output_dir)
-
-    filename = os.path.basename(path_in_bucket)
-    local_path = os.path.join(output_dir, filename)
-
-    # If the file already exists locally, just return it
-    if os.path.isfile(local_path):
-        print(f"✅ File already exists locally: {local_path}")
-        return local_path
-
     # Get a signed URL if profile_id is provided (indicating a private file)
-    if profile_id:
+    if not profile_id:
+        raise ValueError("Public URL access is not supported in this context.")
+
+    def download(local_path):
         print(f"🔐 Generating signed URL for: {path_in_bucket}")
         result = supabase.storage.from_("uploads").create_signed_url(path_in_bucket, 3600)
         print(f"🔐 Signed URL: {result}")
         url_to_download = result.get("signedURL")
+
+        print(f"⬇️ Downloading: {url_to_download}")
+        with requests.get(url_to_download, stream=True) as r:
+            r.raise_for_status()
+            with open(local_path, "wb") as f:
+                for chunk in r.iter_content(chunk_size=1024 * 1024):
+                    f.write(chunk)
+
+    suffix = os.path.splitext(path_in_bucket)[1] or ".mp4"
+    entry = get_media_store().fetch(source_key("supabase", f"uploads/{path_in_bucket}"), download, suffix)
+    print(f"✅ File ready: {entry['path']}")
+    return entry["path"]
+
+def transcribe_with_cache(full_path: str, project_id: str, profile_id: str, timer: StageTimer, timeline=None):
+    """
+    Run the audio half of the pipeline: envelope, VAD, then transcription or a cache hit.
+
+    Returns ``(transcript, speech, envelope)`` where ``speech`` is the VAD
+    ``SpeechMap`` (None when VAD is disabled) and ``envelope`` the audio's
+    ``AudioEnvelope``. The audio is streamed, never held whole: one pass
+    builds the envelope and one feeds the speech chunks to Whisper, each
+    skipped when its result is cached (Silero VAD reads one more). Jobs
+    running on the same audio at the same time compute these once
+    (``TranscriptCache.single_flight``). The transcript is published in
+    original-VOD time when ``timeline`` maps a partial download.
+    """
+    audio_hash = transcript_cache.audio_hash(full_path)
+    if not audio_hash:
+        return _transcribe(full_path, project_id, profile_id, timer, timeline, None, None)
+
+    cache_key = transcript_cache.make_key(audio_hash,
+                                          model=whisper_pool.model_name,
+                                          compute_type=whisper_pool.compute_type,
+                                          language=WHISPER_LANGUAGE,
+                                          chunk_size=CHUNK_SIZE,
+                                          overlap=CHUNK_OVERLAP,
+                                          vad=VAD_BACKEND if VAD_ENABLED else None)
+    envelope_key = transcript_cache.make_key(audio_hash, envelope_hop=ENVELOPE_HOP)
+    # Another job transcribing the same audio right now finishes first and
+    # this one picks its results up from the cache
+    with transcript_cache.single_flight(cache_key):
+        return _transcribe(full_path, project_id, profile_id, timer, timeline, cache_key, envelope_key)
+
+
+def _transcribe(full_path, project_id, profile_id, timer, timeline, cache_key, envelope_key):
+    projectTranscript = transcript_cache.get(cache_key) if cache_key else None
+    envelope = transcript_cache.get_envelope(envelope_key) if envelope_key else None
+
+    if envelope is None:
+        print("Measuring loudness...")
+        with timer.stage("envelope"):
+            envelope = extract_envelope(full_path)
+        if envelope_key:
+            transcript_cache.put_envelope(envelope_key, envelope)
+
+    # Find where people are actually talking so silence is never transcribed
+    speech = None
+    if VAD_ENABLED:
+        print("Detecting speech...")
+        with timer.stage("vad"):
+            speech = detect_speech(envelope=envelope, blocks=stream_pcm(full_path, VAD_BLOCK_SECONDS))
+
+    if projectTranscript:
+        print("Using cached transcript...")
+        publish_transcript(project_id, profile_id, projectTranscript, timeline)
     else:
-        raise ValueError("Public URL access is not supported in this context.")
+        # Transcribe the entire video to identify segments
+        print("Transcribing video...")
+        with timer.stage("transcription"):
+            audio = transcribe_audio(full_path, project_id, profile_id, CHUNK_SIZE,
+                                     speech=speech, envelope=envelope, timeline=timeline)
+        projectTranscript = audio.get("transcript")
+        if projectTranscript and cache_key:
+            transcript_cache.put(cache_key, projectTranscript)
 
-    print(f"⬇️ Downloading: {url_to_download}")
-    with requests.get(url_to_download, stream=True) as r:
-        r.raise_for_status()
-        with open(local_path, "wb") as f:
-            for chunk in r.iter_content(chunk_size=8192):
-                f.write(chunk)
+    return projectTranscript, speech, envelope
 
-    print(f"✅ File saved: {local_path}")
-    return local_path
 
-def process_video(filename: str, project_id: str, profile_id: str):
+def process_video(filename: str, project_id: str, profile_id: str, on_stage=None, timeline=None,
+                  output_dir: str = OUTPUT_DIR, work_key: str = None):
     """
     Process a video file to generate clips with captions.
 
     Args:
         filename (str): Path to the video file or Supabase path.
-        min_words (int): Minimum number of words required in a segment to create a clip.
-        max_clips (int): Maximum number of clips to create.
+        project_id (str): The project the clips belong to.
+        profile_id (str): The owner's profile ID.
+        on_stage (callable): Optional ``StageTimer`` listener, told when each
+            pipeline stage starts and ends.
+        timeline (Timeline): Maps the file back to the original VOD when it
+            holds only part of it (see utils/timeline.py).
+        output_dir (str): Where rendered clips and thumbnails are written;
+            jobs pass their own workspace (see utils/workspace.py).
+        work_key (str): Key of the source's per-source work (see
+            app/services/clip_jobs.py); jobs on the same source, for any
+            profile, run scene detection and transcription one at a time, so
+            later ones read what the first one cached.
 
     Returns:
         dict: Result from cut_clips (clips and status).
     """
+    timer = StageTimer(on_stage)
+
     # If the filename is a local file, use it directly
     if os.path.isfile(filename):
         full_path = filename
@@ -71,24 +158,89 @@ def process_video(filename: str, project_id: str, profile_id: str):
     else:
         # Otherwise, treat as a Supabase path and download
         print("Downloading file from Supabase...")
-        full_path = download_file(filename, profile_id, INPUT_DIR)
+        with timer.stage("download"):
+            full_path = download_file(filename, profile_id)
         print(f"Downloaded file to: {full_path}")
 
     if not os.path.isfile(full_path):
         raise FileNotFoundError(f"{full_path} not found.")
 
-    # Transcribe the entire video to identify segments
-    print("Transcribing video...")
-    audio = transcribe_audio(full_path, project_id, profile_id, CHUNK_SIZE)
+    # the media store must not evict the source while it is still being read
+    with get_media_store().in_use(full_path):
+        return _clip_file(full_path, project_id, profile_id, timer, timeline, output_dir, work_key)
+
+
+def _clip_file(full_path, project_id, profile_id, timer, timeline, output_dir, work_key):
+    # Scene detection reads the video frames and transcription the audio track,
+    # so run them side by side (detection in its own process) and join before
+    # choosing clips.
+    shared = transcript_cache.single_flight(work_key) if work_key else nullcontext()
+    with shared, ProcessPoolExecutor(max_workers=1) as pool:
+        scenes_future = timer.track("scene_detection", pool.submit(detect_raw_scenes, full_path))
+        projectTranscript, speech, envelope = transcribe_with_cache(full_path, project_id, profile_id, timer,
+                                                                    timeline)
+        raw_scenes = scenes_future.result()
+    cuts = [start for start, _ in raw_scenes[1:]]
 
-    projectTranscript = audio.get("transcript")
     if not projectTranscript:
         raise ValueError("No transcript generated. Please check the video file.")
 
+    if CANDIDATE_MODE == "windows":
+        # Sliding windows work on footage without cuts (e.g. a streamer cam)
+        duration = max(raw_scenes[-1][1] if raw_scenes else 0.0,
+                       max(seg["end"] for seg in projectTranscript))
+        scenes = candidate_windows(duration, WordIndex(projectTranscript), speech, cuts)
+    else:
+        scenes = split_scenes(raw_scenes)
+    print(f"Proposed {len(scenes)} candidate clips ({CANDIDATE_MODE})")
+
     print("✂️ Cutting clips...")
-    clips = cut_clips(full_path, projectTranscript, project_id, MIN_WORDS, MAX_CLIPS)
+    with timer.stage("clipping"):
+        clips = cut_clips(full_path, projectTranscript, project_id, MIN_WORDS, MAX_CLIPS,
+                          speech=speech, scenes=scenes, envelope=envelope, cuts=cuts,
+                          timeline=timeline, output_dir=output_dir)
     if not clips.get('status') == "ready":
         raise ValueError("No clips generated. Please check the video file or criteria.")
+    clips["timings"] = timer.summary()
     print(f"✅ Clips created: {clips}")
 
-    return clips
\ No newline at end of file
+    return clips
+
+def run_clip_job(payload: dict, job) -> dict:
+    """
+    Job handler for "generate_clips" (see app/services/job_queue.py).
+
+    ``payload`` holds the ``ClipRequest`` fields. The Supabase project is
+    created on the first attempt and its id remembered, so retries reuse it.
+    Once the job fails or is cancelled for good, ``finalize_clip_job`` (see
+    app/services/clip_jobs.py) updates the project's status.
+    """
+    project_id = payload.get("project_id")
+    if not project_id:
+        insert_resp = supabase.table("projects").insert({
+            "profile_id": payload["profile_id"],
+            "video_url": payload["filename"],
+            "title": payload.get("title"),
+            "video_id": payload.get("video_id"),
+            "status": "processing"
+        }).execute()
+        project_id = insert_resp.data[0]["id"]
+        if project_id is None:
+            raise RuntimeError("Failed to create project")
+        job.remember(project_id=project_id)
+    else:
+        supabase.table("projects").update({"status": "processing"}).eq("id", project_id).execute()
+
+    # Each attempt renders into its own scratch directory, removed afterwards
+    with Workspace(f"job-{job.id}") as workspace:
+        result = process_video(payload["filename"], project_id, payload["profile_id"], on_stage=job.on_stage,
+                               timeline=Timeline.from_list(payload.get("timeline")),
+                               output_dir=workspace.path, work_key=payload.get("work_key"))
+    clips = result.get("clips", [])
+    if not clips:
+        raise ValueError("No clips generated")
+
+    # clip rows were already written (one bulk upsert) by cut_clips
+    supabase.table("projects").update({"status": "completed"}).eq("id", project_id).execute()
+
+    return {"project_id": project_id, "clips": result}
@@ -0,0 +1,568 @@
+import json
+import logging
+import multiprocessing
+import os
+import signal
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import closing, contextmanager
+from functools import lru_cache
+from importlib import import_module
+
+from clip_generator.config import (JOB_DB_PATH, JOB_MAX_ATTEMPTS, JOB_POLL_INTERVAL, JOB_RETRY_DELAY,
+                                  JOB_STATS_INTERVAL, JOB_WORKERS, WHISPER_WARMUP)
+from clip_generator.utils.workspace import sweep_workspaces
+
+logger = logging.getLogger(__name__)
+
+QUEUED, RUNNING, COMPLETED, FAILED, CANCELLED = "queued", "running", "completed", "failed", "cancelled"
+STATUSES = (QUEUED, RUNNING, COMPLETED, FAILED, CANCELLED)
+
+# job kind -> "module:function"; handlers are imported inside the worker
+# process, so the API process never loads Whisper, OpenCV, etc.
+JOB_HANDLERS = {
+    "generate_clips": "clip_generator.app.services.clip_service:run_clip_job",
+}
+
+# job kind -> "module:function" called as ``finalizer(job, status)`` once a job
+# ends for good as failed or cancelled, in whichever process ends it (the API
+# process when a worker died), so these must stay light to import
+JOB_FINALIZERS = {
+    "generate_clips": "clip_generator.app.services.clip_jobs:finalize_clip_job",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    stage TEXT,
+    progress TEXT NOT NULL DEFAULT '{}',
+    result TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    worker_pid INTEGER,
+    run_after REAL NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    dedupe_key TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_by_status ON jobs (status, run_after, created_at);
+CREATE TABLE IF NOT EXISTS worker_stats (
+    pid INTEGER PRIMARY KEY,
+    stats TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+# Per-worker counters that are added up across workers in the server status;
+# the other fields (model settings, cache budget) are the same in every worker.
+SUMMED_STATS = {
+    "whisper": ("pool_size", "loaded", "leased", "load_seconds_total", "rss_mb"),
+    "transcript_cache": ("hits", "misses", "evictions"),
+}
+
+# added after the first release; older databases get it on startup
+MIGRATIONS = {
+    "dedupe_key": "ALTER TABLE jobs ADD COLUMN dedupe_key TEXT",
+}
+INDEXES = """
+CREATE INDEX IF NOT EXISTS jobs_by_dedupe_key ON jobs (dedupe_key, status);
+"""
+
+
+class JobCancelled(Exception):
+    """Raised inside a running job once cancellation has been requested."""
+
+
+class JobQueue:
+    """
+    Durable job queue in a local SQLite database.
+
+    Every state change is a short transaction, so the API process and any
+    number of worker processes can share the file. Jobs move
+    ``queued -> running -> completed | failed | cancelled``; a failed attempt
+    goes back to ``queued`` with exponential backoff until ``max_attempts``
+    is reached. ``progress`` maps each pipeline stage to ``running``/``done``.
+
+    A job enqueued with a ``dedupe_key`` is single-flight: while a job with
+    the same key is queued or running, enqueueing again returns that job
+    instead of adding another.
+    """
+
+    def __init__(self, path, retry_delay=JOB_RETRY_DELAY):
+        self.path = path
+        self.retry_delay = retry_delay
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with closing(self._connect()) as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript(SCHEMA)
+            columns = {row["name"] for row in db.execute("PRAGMA table_info(jobs)")}
+            for column, statement in MIGRATIONS.items():
+                if column not in columns:
+                    db.execute(statement)
+            db.executescript(INDEXES)
+
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        db.row_factory = sqlite3.Row
+        return db
+
+    @contextmanager
+    def _transaction(self):
+        with closing(self._connect()) as db:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                yield db
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+            db.execute("COMMIT")
+
+    @staticmethod
+    def _job(row):
+        if row is None:
+            return None
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job["progress"] = json.loads(job["progress"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        job["cancel_requested"] = bool(job["cancel_requested"])
+        return job
+
+    def enqueue(self, kind, payload, max_attempts=JOB_MAX_ATTEMPTS, dedupe_key=None):
+        """
+        Add a job and return it. With ``dedupe_key``, an active job with the
+        same key is returned instead (marked ``"deduplicated": True``).
+        """
+        if kind not in JOB_HANDLERS:
+            raise ValueError(f"Unknown job kind: {kind!r}")
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._transaction() as db:
+            if dedupe_key is not None:
+                row = db.execute(
+                    "SELECT id FROM jobs WHERE dedupe_key = ? AND status IN (?, ?) AND cancel_requested = 0"
+                    " ORDER BY created_at LIMIT 1",
+                    (dedupe_key, QUEUED, RUNNING),
+                ).fetchone()
+                if row is not None:
+                    existing = self._job(db.execute("SELECT * FROM jobs WHERE id = ?", (row["id"],)).fetchone())
+                    return existing | {"deduplicated": True}
+            db.execute(
+                "INSERT INTO jobs (id, kind, payload, status, max_attempts, run_after, created_at, updated_at,"
+                " dedupe_key) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, kind, json.dumps(payload), QUEUED, max_attempts, now, now, now, dedupe_key),
+            )
+        return self.get(job_id) | {"deduplicated": False}
+
+    def get(self, job_id):
+        with closing(self._connect()) as db:
+            return self._job(db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+
+    def list(self, status=None, limit=50):
+        """Most recent jobs first, optionally filtered by status."""
+        query, args = "SELECT * FROM jobs", []
+        if status:
+            query += " WHERE status = ?"
+            args.append(status)
+        query += " ORDER BY created_at DESC LIMIT ?"
+        args.append(limit)
+        with closing(self._connect()) as db:
+            return [self._job(row) for row in db.execute(query, args)]
+
+    def counts(self):
+        with closing(self._connect()) as db:
+            rows = db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {status: 0 for status in STATUSES} | {status: n for status, n in rows}
+
+    def claim(self, worker_pid):
+        """Atomically take the oldest runnable job for ``worker_pid``, or None."""
+        now = time.time()
+        with self._transaction() as db:
+            row = db.execute(
+                "SELECT id FROM jobs WHERE status = ? AND run_after <= ? ORDER BY created_at LIMIT 1",
+                (QUEUED, now),
+            ).fetchone()
+            if row is None:
+                return None
+            db.execute(
+                "UPDATE jobs SET status = ?, attempts = attempts + 1, worker_pid = ?, stage = NULL,"
+                " error = NULL, started_at = ?, updated_at = ? WHERE id = ?",
+                (RUNNING, worker_pid, now, now, row["id"]),
+            )
+        return self.get(row["id"])
+
+    def set_stage(self, job_id, stage, state):
+        """Record ``stage`` as ``state``; returns whether cancellation was requested."""
+        with self._transaction() as db:
+            row = db.execute("SELECT progress, cancel_requested FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return False
+            progress = json.loads(row["progress"])
+            progress[stage] = state
+            db.execute(
+                "UPDATE jobs SET progress = ?, stage = CASE WHEN ? = 'running' THEN ? ELSE stage END,"
+                " updated_at = ? WHERE id = ?",
+                (json.dumps(progress), state, stage, time.time(), job_id),
+            )
+        return bool(row["cancel_requested"])
+
+    def update_payload(self, job_id, **fields):
+        """Merge ``fields`` into the job's payload so later attempts see them."""
+        with self._transaction() as db:
+            row = db.execute("SELECT payload FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return
+            payload = json.loads(row["payload"]) | fields
+            db.execute("UPDATE jobs SET payload = ?, updated_at = ? WHERE id = ?",
+                       (json.dumps(payload), time.time(), job_id))
+
+    def _finish(self, db, job_id, status, **fields):
+        now = time.time()
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        db.execute(
+            f"UPDATE jobs SET status = ?, worker_pid = NULL, finished_at = ?, updated_at = ?"
+            f"{', ' + assignments if assignments else ''} WHERE id = ?",
+            (status, now, now, *fields.values(), job_id),
+        )
+
+    def _finalized(self, job_id, status):
+        """Run the job kind's finalizer; its errors are logged, the job stays finished."""
+        job = self.get(job_id)
+        finalizer = resolve_finalizer(job["kind"])
+        if finalizer is None:
+            return
+        try:
+            finalizer(job, status)
+        except Exception:
+            logger.exception("Finalizing job %s (%s) failed", job_id, status)
+
+    def complete(self, job_id, result=None):
+        with self._transaction() as db:
+            self._finish(db, job_id, COMPLETED, result=json.dumps(result, default=str))
+
+    def fail(self, job_id, error):
+        """Record a failed attempt; requeue with backoff if attempts remain. Returns the new status."""
+        with self._transaction() as db:
+            row = db.execute("SELECT attempts, max_attempts, cancel_requested FROM jobs WHERE id = ?",
+                             (job_id,)).fetchone()
+            if row is None:
+                return None
+            if row["cancel_requested"]:
+                status = CANCELLED
+            elif row["attempts"] >= row["max_attempts"]:
+                status = FAILED
+            else:
+                delay = self.retry_delay * 2 ** (row["attempts"] - 1)
+                db.execute(
+                    "UPDATE jobs SET status = ?, worker_pid = NULL, error = ?, run_after = ?, updated_at = ?"
+                    " WHERE id = ?",
+                    (QUEUED, error, time.time() + delay, time.time(), job_id),
+                )
+                return QUEUED
+            self._finish(db, job_id, status, error=error)
+        self._finalized(job_id, status)
+        return status
+
+    def mark_cancelled(self, job_id):
+        with self._transaction() as db:
+            self._finish(db, job_id, CANCELLED)
+        self._finalized(job_id, CANCELLED)
+
+    def cancel(self, job_id):
+        """
+        Cancel a job. Queued jobs are cancelled at once; running jobs stop at
+        their next stage boundary. Finished jobs are left alone.
+        """
+        with self._transaction() as db:
+            row = db.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return None
+            if row["status"] == QUEUED:
+                self._finish(db, job_id, CANCELLED)
+            elif row["status"] == RUNNING:
+                db.execute("UPDATE jobs SET cancel_requested = 1, updated_at = ? WHERE id = ?",
+                           (time.time(), job_id))
+        if row["status"] == QUEUED:
+            # an earlier attempt may have left state behind (e.g. a project)
+            self._finalized(job_id, CANCELLED)
+        return self.get(job_id)
+
+    def publish_stats(self, worker_pid, stats):
+        """Record a worker's latest in-process stats (see ``collect_worker_stats``)."""
+        with self._transaction() as db:
+            db.execute("INSERT OR REPLACE INTO worker_stats (pid, stats, updated_at) VALUES (?, ?, ?)",
+                       (worker_pid, json.dumps(stats, default=str), time.time()))
+
+    def worker_stats(self):
+        """Stats last published by each worker."""
+        with closing(self._connect()) as db:
+            rows = db.execute("SELECT pid, stats FROM worker_stats ORDER BY pid").fetchall()
+        return [json.loads(row["stats"]) | {"pid": row["pid"]} for row in rows]
+
+    def forget_workers(self, worker_pids=None):
+        """Drop the published stats of ``worker_pids``, or of every worker when None."""
+        with self._transaction() as db:
+            if worker_pids is None:
+                db.execute("DELETE FROM worker_stats")
+            else:
+                db.executemany("DELETE FROM worker_stats WHERE pid = ?", [(pid,) for pid in worker_pids])
+
+    def recover(self, worker_pids=None, count_attempt=True):
+        """
+        Requeue jobs left ``running`` by workers that are gone: those of
+        ``worker_pids``, or every running job (e.g. after a restart) when None.
+        With ``count_attempt=False`` (graceful shutdown) the interrupted
+        attempt is not counted against ``max_attempts``. Jobs that end here
+        (out of attempts, or cancelled) are finalized like any other.
+        Returns how many jobs were recovered.
+        """
+        query, args = "SELECT id, attempts, max_attempts, cancel_requested FROM jobs WHERE status = ?", [RUNNING]
+        if worker_pids is not None:
+            worker_pids = list(worker_pids)
+            if not worker_pids:
+                return 0
+            query += f" AND worker_pid IN ({', '.join('?' * len(worker_pids))})"
+            args += worker_pids
+
+        finished = []
+        with self._transaction() as db:
+            rows = db.execute(query, args).fetchall()
+            for row in rows:
+                attempts = row["attempts"] if count_attempt else row["attempts"] - 1
+                if row["cancel_requested"]:
+                    self._finish(db, row["id"], CANCELLED)
+                    finished.append((row["id"], CANCELLED))
+                elif attempts >= row["max_attempts"]:
+                    self._finish(db, row["id"], FAILED, attempts=attempts, error="Worker exited during the job")
+                    finished.append((row["id"], FAILED))
+                else:
+                    db.execute(
+                        "UPDATE jobs SET status = ?, attempts = ?, worker_pid = NULL, run_after = ?,"
+                        " updated_at = ? WHERE id = ?",
+                        (QUEUED, attempts, time.time(), time.time(), row["id"]),
+                    )
+        for job_id, status in finished:
+            self._finalized(job_id, status)
+        return len(rows)
+
+
+class JobContext:
+    """Handle passed to job handlers for progress reporting and cancellation."""
+
+    def __init__(self, queue, job):
+        self.queue = queue
+        self.id = job["id"]
+        self.payload = job["payload"]
+        self.attempt = job["attempts"]
+        self.max_attempts = job["max_attempts"]
+
+    @property
+    def last_attempt(self):
+        """Whether a failure now is final (the job will not be retried)."""
+        return self.attempt >= self.max_attempts
+
+    def stage(self, name, state="running"):
+        """Report a stage; raises ``JobCancelled`` when starting one after a cancel request."""
+        if self.queue.set_stage(self.id, name, state) and state == "running":
+            raise JobCancelled(self.id)
+
+    def on_stage(self, name, event):
+        """``StageTimer`` listener."""
+        self.stage(name, "running" if event == "start" else "done")
+
+    def remember(self, **fields):
+        """Persist values (e.g. a created project id) for retries of this job."""
+        self.payload.update(fields)
+        self.queue.update_payload(self.id, **fields)
+
+
+def _resolve(target):
+    module, _, name = target.partition(":")
+    return getattr(import_module(module), name)
+
+
+def resolve_handler(kind):
+    return _resolve(JOB_HANDLERS[kind])
+
+
+def resolve_finalizer(kind):
+    """The kind's finalizer (see ``JOB_FINALIZERS``), or None."""
+    target = JOB_FINALIZERS.get(kind)
+    return _resolve(target) if target else None
+
+
+def run_job(queue, job):
+    """Run one claimed job to completion, failure or cancellation."""
+    logger.info("Job %s (%s) started, attempt %d", job["id"], job["kind"], job["attempts"])
+    try:
+        result = resolve_handler(job["kind"])(job["payload"], JobContext(queue, job))
+    except JobCancelled:
+        queue.mark_cancelled(job["id"])
+        logger.info("Job %s cancelled", job["id"])
+    except Exception as e:
+        status = queue.fail(job["id"], f"{type(e).__name__}: {e}")
+        logger.exception("Job %s failed (now %s)", job["id"], status)
+    else:
+        queue.complete(job["id"], result)
+        logger.info("Job %s completed", job["id"])
+
+
+def collect_worker_stats():
+    """What a worker reports about itself: its Whisper pool and transcript cache."""
+    from clip_generator.utils.transcript_cache import transcript_cache
+    from clip_generator.utils.whisper_pool import whisper_pool
+    return {"whisper": whisper_pool.stats(), "transcript_cache": transcript_cache.stats()}
+
+
+def combine_worker_stats(entries):
+    """Fold per-worker stats into one section each, adding up ``SUMMED_STATS``."""
+    combined = {}
+    for section, summed in SUMMED_STATS.items():
+        parts = [entry[section] for entry in entries if section in entry]
+        merged = dict(parts[0]) if parts else {}
+        for key in summed:
+            if parts:
+                merged[key] = round(sum(part.get(key) or 0 for part in parts), 2)
+        combined[section] = merged | {"workers": len(parts)}
+    return combined
+
+
+def _publish_stats(queue, pid, interval):
+    while True:
+        try:
+            queue.publish_stats(pid, collect_worker_stats())
+        except Exception:
+            logger.exception("Could not publish worker stats")
+        time.sleep(interval)
+
+
+def worker_main(db_path, poll_interval=JOB_POLL_INTERVAL, stats_interval=JOB_STATS_INTERVAL):
+    """
+    Entry point of a worker process: load the Whisper models (if
+    ``WHISPER_WARMUP``), then claim and run jobs forever. Transcription runs
+    here, so a background thread publishes this process's stats for
+    ``/api/getServerStatus``.
+    """
+    logging.basicConfig(level=logging.INFO)
+    # lead a process group, so stopping the worker also stops its FFmpeg and
+    # process pool children
+    os.setpgrp()
+    queue = JobQueue(db_path)
+    pid = os.getpid()
+    threading.Thread(target=_publish_stats, args=(queue, pid, stats_interval),
+                     name="worker-stats", daemon=True).start()
+    if WHISPER_WARMUP:
+        from clip_generator.utils.whisper_pool import whisper_pool
+        try:
+            whisper_pool.warmup()
+        except Exception:
+            # jobs load models on demand, and report the error if it persists
+            logger.exception("Whisper warm-up failed")
+    while True:
+        job = queue.claim(pid)
+        if job is None:
+            time.sleep(poll_interval)
+            continue
+        run_job(queue, job)
+
+
+def _signal_worker(process, sig):
+    """Send ``sig`` to a worker's process group (or just the worker, before it has made one)."""
+    try:
+        os.killpg(process.pid, sig)
+    except ProcessLookupError:
+        if process.is_alive():
+            process.terminate()
+
+
+class JobWorkerPool:
+    """
+    ``concurrency`` worker processes running jobs from ``queue``.
+
+    Workers are spawned (not forked) so they start without the API's threads
+    and sockets, and are not daemonic so they can run their own process pools
+    for scene detection and rendering. A supervisor thread requeues the job of
+    any worker that dies and starts a replacement.
+    """
+
+    def __init__(self, queue, concurrency=JOB_WORKERS, poll_interval=JOB_POLL_INTERVAL):
+        self.queue = queue
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self._context = multiprocessing.get_context("spawn")
+        self._processes = []
+        self._stop = threading.Event()
+        self._supervisor = None
+
+    def _spawn(self):
+        process = self._context.Process(target=worker_main, args=(self.queue.path, self.poll_interval),
+                                        name="clip-job-worker")
+        process.start()
+        return process
+
+    def start(self):
+        self.queue.forget_workers()
+        recovered = self.queue.recover()
+        if recovered:
+            logger.info("Requeued %d job(s) interrupted by the last shutdown", recovered)
+        swept = sweep_workspaces()
+        if swept:
+            logger.info("Removed %d expired job workspace(s)", swept)
+        self._stop.clear()
+        self._processes = [self._spawn() for _ in range(self.concurrency)]
+        self._supervisor = threading.Thread(target=self._supervise, name="job-supervisor", daemon=True)
+        self._supervisor.start()
+        logger.info("Started %d job worker(s)", self.concurrency)
+
+    def _supervise(self):
+        while not self._stop.wait(self.poll_interval):
+            for i, process in enumerate(self._processes):
+                if process.is_alive() or self._stop.is_set():
+                    continue
+                logger.warning("Job worker %s exited with code %s; restarting", process.pid, process.exitcode)
+                _signal_worker(process, signal.SIGKILL)  # children it left behind
+                self.queue.recover([process.pid])
+                self.queue.forget_workers([process.pid])
+                self._processes[i] = self._spawn()
+
+    def stop(self, timeout=10.0):
+        """Stop the workers and requeue whatever they were running."""
+        self._stop.set()
+        if self._supervisor is not None:
+            self._supervisor.join(timeout)
+        for process in self._processes:
+            _signal_worker(process, signal.SIGTERM)
+        for process in self._processes:
+            process.join(timeout)
+            _signal_worker(process, signal.SIGKILL)
+        self.queue.recover([p.pid for p in self._processes], count_attempt=False)
+        self.queue.forget_workers([p.pid for p in self._processes])
+        self._processes = []
+
+    def stats(self):
+        return {
+            "workers": self.concurrency,
+            "alive": sum(p.is_alive() for p in self._processes),
+            **self.queue.counts(),
+        }
+
+
+# Opened on first use, not at import, so importing the app (or a test) never
+# creates the database
+@lru_cache(maxsize=None)
+def get_job_queue():
+    return JobQueue(JOB_DB_PATH)
+
+
+@lru_cache(maxsize=None)
+def get_job_workers():
+    return JobWorkerPool(get_job_queue())
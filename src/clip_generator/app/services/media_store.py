@@ -0,0 +1,306 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import subprocess
+import time
+from contextlib import closing, contextmanager, nullcontext
+from functools import lru_cache
+
+from clip_generator.config import MEDIA_LEASE_HOURS, MEDIA_STORE_DIR, MEDIA_STORE_MAX_GB
+from clip_generator.app.services.upload_service import stored_content_hash
+from clip_generator.utils.file_lock import exclusive_lock, shared_lock, try_exclusive_lock
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS media (
+    source TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    sha256 TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    metadata TEXT NOT NULL DEFAULT '{}',
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL,
+    leased_until REAL NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS media_by_hash ON media (sha256);
+CREATE INDEX IF NOT EXISTS media_by_path ON media (path);
+"""
+
+# added after the first release; older indexes get it on startup
+MIGRATIONS = {
+    "leased_until": "ALTER TABLE media ADD COLUMN leased_until REAL NOT NULL DEFAULT 0",
+}
+
+# files kept next to a stored video that belong to it
+SIDECARS = (".timeline.json", ".sha256")
+
+
+def source_key(kind, ident, **params):
+    """Identity of a downloadable source, e.g. ``source_key("twitch", "123", quality="720p")``."""
+    options = "&".join(f"{name}={value}" for name, value in sorted(params.items()) if value)
+    return f"{kind}:{ident}?{options}" if options else f"{kind}:{ident}"
+
+
+def file_sha256(path, block_size=1024 * 1024):
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            hasher.update(block)
+    return hasher.hexdigest()
+
+
+def probe_media(path):
+    """Duration and stream info from ffprobe, or {} if the file can't be probed."""
+    cmd = [
+        "ffprobe", "-v", "error",
+        "-show_entries", "format=duration:stream=codec_type,codec_name,width,height,sample_rate",
+        "-of", "json", path,
+    ]
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True)
+        info = json.loads(result.stdout) if result.returncode == 0 else {}
+    except (OSError, ValueError):
+        return {}
+    duration = info.get("format", {}).get("duration")
+    return {"duration": float(duration) if duration else None, "streams": info.get("streams", [])}
+
+
+class MediaStore:
+    """
+    Local store of downloaded sources, indexed in SQLite.
+
+    Each entry maps a source identity (see ``source_key``) to a local file,
+    its SHA-256, size/mtime (checked on every lookup, so a file changed or
+    deleted behind the store's back is treated as missing) and probed
+    metadata. Lookups by source or hash are single indexed reads.
+
+    ``fetch`` downloads a source at most once: concurrent callers, threads or
+    processes, serialise on a per-source file lock and the ones that waited
+    find the finished entry. Sources whose content turns out identical share
+    one file. Once the files exceed ``max_bytes`` the least recently used are
+    deleted, except those still needed: a fetched file is leased for
+    ``lease_seconds`` (jobs queued for it may not have started yet), and a
+    job reading one holds ``in_use``.
+    """
+
+    def __init__(self, directory=MEDIA_STORE_DIR, max_bytes=int(MEDIA_STORE_MAX_GB * 1024 ** 3),
+                 lease_seconds=MEDIA_LEASE_HOURS * 3600):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.lease_seconds = lease_seconds
+        self.db_path = os.path.join(directory, "index.sqlite3")
+        self.lock_dir = os.path.join(directory, ".locks")
+        os.makedirs(self.lock_dir, exist_ok=True)
+        self.evictions = 0
+        with closing(self._connect()) as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript(SCHEMA)
+            columns = {row["name"] for row in db.execute("PRAGMA table_info(media)")}
+            for column, statement in MIGRATIONS.items():
+                if column not in columns:
+                    db.execute(statement)
+
+    def _connect(self):
+        db = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        db.row_factory = sqlite3.Row
+        return db
+
+    @contextmanager
+    def _transaction(self):
+        with closing(self._connect()) as db:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                yield db
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+            db.execute("COMMIT")
+
+    def _source_lock(self, source):
+        name = hashlib.sha1(source.encode("utf-8")).hexdigest()
+        return exclusive_lock(os.path.join(self.lock_dir, f"{name}.lock"))
+
+    def _use_lock_path(self, path):
+        name = hashlib.sha1(os.path.realpath(path).encode("utf-8")).hexdigest()
+        return os.path.join(self.lock_dir, f"{name}.use")
+
+    def in_use(self, path):
+        """
+        Keep ``path`` from being evicted during the ``with`` block. Any number
+        of readers can hold it, across processes; a reader that dies
+        releases it. Paths outside the store need no protection.
+        """
+        if os.path.dirname(os.path.realpath(path)) != os.path.realpath(self.directory):
+            return nullcontext()
+        return self._reading(path)
+
+    @contextmanager
+    def _reading(self, path):
+        with shared_lock(self._use_lock_path(path)):
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"{path} was evicted from the media store")
+            yield
+
+    def path_for(self, source, suffix=".mp4"):
+        """Where a download of ``source`` is written."""
+        slug = re.sub(r"[^A-Za-z0-9.-]+", "_", source).strip("_")[:80]
+        digest = hashlib.sha1(source.encode("utf-8")).hexdigest()[:10]
+        return os.path.join(self.directory, f"{slug}-{digest}{suffix}")
+
+    @staticmethod
+    def _intact(row):
+        try:
+            st = os.stat(row["path"])
+        except OSError:
+            return False
+        return st.st_size == row["size"] and st.st_mtime_ns == row["mtime_ns"]
+
+    def _first_intact(self, db, rows):
+        """Entry for the first row whose file is intact (marked as used); stale rows are dropped."""
+        for row in rows:
+            if self._intact(row):
+                db.execute("UPDATE media SET last_used = ? WHERE source = ?", (time.time(), row["source"]))
+                entry = dict(row)
+                entry["metadata"] = json.loads(entry["metadata"])
+                return entry
+            logger.warning("Stored file for %s is missing or changed; forgetting it", row["source"])
+            db.execute("DELETE FROM media WHERE source = ?", (row["source"],))
+        return None
+
+    def lookup(self, source):
+        """The entry for ``source`` if its file is present and unchanged, else None."""
+        with self._transaction() as db:
+            return self._first_intact(db, db.execute("SELECT * FROM media WHERE source = ?", (source,)))
+
+    def by_hash(self, sha256):
+        """An intact entry whose content hashes to ``sha256``, else None."""
+        with self._transaction() as db:
+            return self._first_intact(db, db.execute(
+                "SELECT * FROM media WHERE sha256 = ? ORDER BY last_used DESC", (sha256,)).fetchall())
+
+    def add(self, source, path):
+        """Index ``path`` (already in place) as ``source``; returns its entry."""
+        digest = stored_content_hash(path) or file_sha256(path)
+        same = self.by_hash(digest)
+        if same and os.path.realpath(same["path"]) != os.path.realpath(path):
+            logger.info("%s has the same content as %s; keeping one copy", source, same["source"])
+            for suffix in SIDECARS:
+                if os.path.exists(path + suffix) and not os.path.exists(same["path"] + suffix):
+                    os.replace(path + suffix, same["path"] + suffix)
+            _remove_with_sidecars(path)
+            path = same["path"]
+            metadata = same["metadata"]
+        else:
+            metadata = probe_media(path)
+
+        st = os.stat(path)
+        now = time.time()
+        with self._transaction() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO media (source, path, sha256, size, mtime_ns, metadata, created_at, last_used)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (source, path, digest, st.st_size, st.st_mtime_ns, json.dumps(metadata), now, now),
+            )
+        return self.lookup(source)
+
+    def lease(self, path):
+        """Protect ``path`` from eviction for ``lease_seconds`` from now."""
+        with self._transaction() as db:
+            db.execute("UPDATE media SET leased_until = MAX(leased_until, ?) WHERE path = ?",
+                       (time.time() + self.lease_seconds, path))
+
+    def fetch(self, source, download, suffix=".mp4"):
+        """
+        Return the entry for ``source``, calling ``download(path)`` to write
+        the file first if it isn't stored yet. Only one download of a source
+        runs at a time; other callers wait for it and reuse the result. The
+        file is leased either way (see ``lease``).
+        """
+        entry = self.lookup(source)
+        if entry:
+            self.lease(entry["path"])
+            return entry
+        with self._source_lock(source):
+            entry = self.lookup(source)
+            if entry:
+                logger.info("%s was fetched by a concurrent request", source)
+                self.lease(entry["path"])
+                return entry
+            path = self.path_for(source, suffix)
+            started = time.perf_counter()
+            download(path)
+            entry = self.add(source, path)
+            self.lease(entry["path"])
+            logger.info("Stored %s (%.1f MB) in %.1fs", source, entry["size"] / 1e6,
+                        time.perf_counter() - started)
+        self.evict(keep={entry["path"]})
+        return entry
+
+    def evict(self, keep=()):
+        """
+        Delete least recently used files until the store fits in
+        ``max_bytes``, skipping ``keep``, leased files and files in use.
+        """
+        victims = {}  # path -> its use lock, held until the file is gone
+        try:
+            with self._transaction() as db:
+                rows = db.execute("SELECT path, MAX(size) AS size, MAX(last_used) AS used,"
+                                  " MAX(leased_until) AS leased_until FROM media"
+                                  " GROUP BY path ORDER BY used").fetchall()
+                total = sum(row["size"] for row in rows)
+                now = time.time()
+                for row in rows:
+                    if total <= self.max_bytes:
+                        break
+                    if row["path"] in keep or row["leased_until"] > now:
+                        continue
+                    lock = try_exclusive_lock(self._use_lock_path(row["path"]))
+                    if lock is None:
+                        logger.info("Not evicting %s: a job is reading it", row["path"])
+                        continue
+                    victims[row["path"]] = lock
+                    db.execute("DELETE FROM media WHERE path = ?", (row["path"],))
+                    total -= row["size"]
+            for path in victims:
+                logger.info("Evicting %s from the media store", path)
+                _remove_with_sidecars(path)
+                os.remove(self._use_lock_path(path))
+        finally:
+            for lock in victims.values():
+                lock.close()
+        self.evictions += len(victims)
+        return list(victims)
+
+    def stats(self):
+        with closing(self._connect()) as db:
+            files, size = db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM (SELECT MAX(size) AS size FROM media GROUP BY path)"
+            ).fetchone()
+            sources = db.execute("SELECT COUNT(*) FROM media").fetchone()[0]
+        return {
+            "files": files,
+            "sources": sources,
+            "size_mb": round(size / 1e6, 1),
+            "max_mb": round(self.max_bytes / 1e6, 1),
+            "evictions": self.evictions,
+        }
+
+
+def _remove_with_sidecars(path):
+    for target in (path, *(path + suffix for suffix in SIDECARS)):
+        try:
+            os.remove(target)
+        except FileNotFoundError:
+            pass
+
+
+
+@lru_cache(maxsize=None)
+def get_media_store():
+    """The shared store in ``MEDIA_STORE_DIR``, opened on first use rather than at import."""
+    return MediaStore()
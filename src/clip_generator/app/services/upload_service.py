@@ -0,0 +1,233 @@
+import hashlib
+import json
+import os
+import threading
+import uuid
+from pathlib import Path
+
+from fastapi.concurrency import run_in_threadpool
+
+from clip_generator.config import INPUT_DIR, UPLOAD_CHUNK_SIZE, UPLOAD_SESSION_DIR
+
+
+class UploadError(ValueError):
+    """A resumable upload request that cannot be applied (bad offset, size or hash)."""
+
+
+class OffsetMismatch(UploadError):
+    def __init__(self, expected):
+        super().__init__(f"Upload is at offset {expected}")
+        self.expected = expected
+
+
+def safe_path(filename: str, directory: str = None) -> Path:
+    """Return a safe path within ``directory`` for the given filename.
+
+    Only the base name of ``filename`` is used to avoid directory traversal
+    attacks.  The resulting path is validated to ensure it resides inside the
+    directory (``INPUT_DIR`` by default).
+    """
+    directory = directory or INPUT_DIR
+    safe_name = Path(filename).name
+    if not safe_name or safe_name.startswith("."):
+        raise ValueError("Invalid upload path")
+    target_path = Path(directory) / safe_name
+    target_path.parent.mkdir(parents=True, exist_ok=True)
+    if not target_path.resolve().is_relative_to(Path(directory).resolve()):
+        raise ValueError("Invalid upload path")
+    return target_path
+
+
+def write_hash_sidecar(path, digest: str) -> None:
+    Path(f"{path}.sha256").write_text(digest)
+
+
+def stored_content_hash(path):
+    """SHA-256 recorded for ``path`` when it was uploaded, or None."""
+    try:
+        return Path(f"{path}.sha256").read_text().strip() or None
+    except OSError:
+        return None
+
+
+async def stream_to_file(chunks, path, hasher=None, mode="wb") -> int:
+    """
+    Write an async iterator of byte chunks to ``path`` (disk writes run off
+    the event loop), feeding ``hasher`` as it goes. Returns the bytes written.
+    """
+    written = 0
+    f = await run_in_threadpool(open, path, mode)
+    try:
+        async for chunk in chunks:
+            if not chunk:
+                continue
+            if hasher is not None:
+                hasher.update(chunk)
+            await run_in_threadpool(f.write, chunk)
+            written += len(chunk)
+    finally:
+        await run_in_threadpool(f.close)
+    return written
+
+
+async def iter_upload_file(file, chunk_size: int = UPLOAD_CHUNK_SIZE):
+    """Read a Starlette ``UploadFile`` in ``chunk_size`` pieces."""
+    while True:
+        chunk = await file.read(chunk_size)
+        if not chunk:
+            break
+        yield chunk
+
+
+async def save_upload(file, chunk_size: int = UPLOAD_CHUNK_SIZE) -> dict:
+    """
+    Stream an ``UploadFile`` into ``INPUT_DIR`` with bounded memory.
+
+    The body goes to a ``.part`` file that is renamed into place once
+    complete, and its SHA-256 is computed on the fly and stored next to it.
+    """
+    target = safe_path(file.filename)
+    partial = target.with_name(f".{target.name}.{uuid.uuid4().hex}.part")
+    hasher = hashlib.sha256()
+    try:
+        size = await stream_to_file(iter_upload_file(file, chunk_size), partial, hasher)
+        os.replace(partial, target)
+    finally:
+        if partial.exists():
+            partial.unlink()
+    digest = hasher.hexdigest()
+    write_hash_sidecar(target, digest)
+    return {"filename": target.name, "size": size, "sha256": digest}
+
+
+class UploadSessions:
+    """
+    Resumable uploads: create a session, ``PUT`` parts at explicit byte
+    offsets, then finalize.
+
+    Session metadata and the partial file live in ``directory`` so uploads
+    survive disconnects and server restarts; a part must start exactly at the
+    session's current offset (the partial file's size), so a client that lost
+    track asks for the session status and continues from there. The SHA-256
+    is updated as parts arrive; if that running hash was lost (restart) it
+    is recomputed from disk at finalize.
+    """
+
+    def __init__(self, directory=UPLOAD_SESSION_DIR, target_dir=INPUT_DIR):
+        self.directory = directory
+        self.target_dir = target_dir
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._hashers = {}  # upload_id -> (sha256, bytes hashed)
+        self._busy = set()
+
+    def _path(self, upload_id, suffix):
+        if not upload_id.isalnum():
+            raise KeyError(upload_id)
+        return os.path.join(self.directory, f"{upload_id}{suffix}")
+
+    def _meta_path(self, upload_id):
+        return self._path(upload_id, ".json")
+
+    def _part_path(self, upload_id):
+        return self._path(upload_id, ".part")
+
+    def _load(self, upload_id):
+        try:
+            with open(self._meta_path(upload_id)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise KeyError(upload_id)
+
+    def create(self, filename, size=None):
+        target = safe_path(filename, self.target_dir)
+        if size is not None and size < 0:
+            raise UploadError("size must be >= 0")
+        upload_id = uuid.uuid4().hex
+        meta = {"upload_id": upload_id, "filename": target.name, "size": size}
+        open(self._part_path(upload_id), "wb").close()
+        with open(self._meta_path(upload_id), "w") as f:
+            json.dump(meta, f)
+        with self._lock:
+            self._hashers[upload_id] = (hashlib.sha256(), 0)
+        return self.status(upload_id)
+
+    def status(self, upload_id):
+        meta = self._load(upload_id)
+        return {**meta, "offset": os.path.getsize(self._part_path(upload_id))}
+
+    async def write(self, upload_id, offset, chunks):
+        """Append ``chunks`` (async iterator of bytes) at ``offset``; returns the new status."""
+        with self._lock:
+            if upload_id in self._busy:
+                raise UploadError("Another part is being written to this upload")
+            self._busy.add(upload_id)
+        try:
+            status = self.status(upload_id)
+            if offset != status["offset"]:
+                raise OffsetMismatch(status["offset"])
+
+            with self._lock:
+                hasher, hashed = self._hashers.get(upload_id, (None, 0))
+            if hasher is not None and hashed != offset:
+                hasher = None  # a previous part was cut off mid-stream
+            try:
+                await stream_to_file(self._limit(chunks, status["size"], offset),
+                                     self._part_path(upload_id), hasher, mode="ab")
+            finally:
+                status = self.status(upload_id)
+                with self._lock:
+                    if hasher is not None:
+                        self._hashers[upload_id] = (hasher, status["offset"])
+                    else:
+                        self._hashers.pop(upload_id, None)
+            return status
+        finally:
+            with self._lock:
+                self._busy.discard(upload_id)
+
+    @staticmethod
+    async def _limit(chunks, size, offset):
+        async for chunk in chunks:
+            offset += len(chunk)
+            if size is not None and offset > size:
+                raise UploadError(f"Upload exceeds its declared size of {size} bytes")
+            yield chunk
+
+    def _digest(self, upload_id, offset):
+        with self._lock:
+            hasher, hashed = self._hashers.get(upload_id, (None, 0))
+        if hasher is not None and hashed == offset:
+            return hasher.hexdigest()
+        hasher = hashlib.sha256()
+        with open(self._part_path(upload_id), "rb") as f:
+            for block in iter(lambda: f.read(UPLOAD_CHUNK_SIZE), b""):
+                hasher.update(block)
+        return hasher.hexdigest()
+
+    def finalize(self, upload_id, sha256=None):
+        """Check size and hash, then move the file into place. Returns its name, size and SHA-256."""
+        status = self.status(upload_id)
+        if status["size"] is not None and status["offset"] != status["size"]:
+            raise UploadError(f"Upload incomplete: {status['offset']} of {status['size']} bytes")
+        digest = self._digest(upload_id, status["offset"])
+        if sha256 and sha256.lower() != digest:
+            raise UploadError("SHA-256 mismatch")
+
+        target = safe_path(status["filename"], self.target_dir)
+        os.replace(self._part_path(upload_id), target)
+        write_hash_sidecar(target, digest)
+        self.abort(upload_id)
+        return {"filename": target.name, "size": status["offset"], "sha256": digest}
+
+    def abort(self, upload_id):
+        for path in (self._part_path(upload_id), self._meta_path(upload_id)):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        with self._lock:
+            self._hashers.pop(upload_id, None)
+
+
+upload_sessions = UploadSessions()
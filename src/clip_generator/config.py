@@ -1,4 +1,5 @@
 import os
+import json
 from dotenv import load_dotenv
 from moviepy.config import change_settings
 
@@ -16,12 +17,128 @@ os.makedirs(OUTPUT_DIR, exist_ok=True)
 TEMP_DIR = os.path.join(BASE_DIR, "temp")
 os.makedirs(TEMP_DIR, exist_ok=True)
 
+# Caches and indexes live outside the package so runs never write into the source tree
+CACHE_DIR = os.getenv("CACHE_DIR", os.path.join(
+    os.getenv("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache")), "clip_generator"))
+os.makedirs(CACHE_DIR, exist_ok=True)
+
 # Supabase and OpenAI configuration
 USE_SUPABASE = os.getenv("USE_SUPABASE", "False") == "True"
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 TWITCH_CLIENT_ID = os.getenv("TWITCH_CLIENT_ID")
 
+# Whisper model pool (see utils/whisper_pool.py)
+WHISPER_MODEL = os.getenv("WHISPER_MODEL", "base")
+WHISPER_DEVICE = os.getenv("WHISPER_DEVICE", "cpu")
+WHISPER_COMPUTE_TYPE = os.getenv("WHISPER_COMPUTE_TYPE", "default")  # e.g. "int8", "float32"
+WHISPER_CPU_THREADS = int(os.getenv("WHISPER_CPU_THREADS", "0"))  # 0 lets CTranslate2 decide
+WHISPER_NUM_WORKERS = int(os.getenv("WHISPER_NUM_WORKERS", "1"))
+WHISPER_POOL_SIZE = int(os.getenv("WHISPER_POOL_SIZE", "1"))
+WHISPER_WARMUP = os.getenv("WHISPER_WARMUP", "False") == "True"
+WHISPER_LANGUAGE = os.getenv("WHISPER_LANGUAGE") or None  # None auto-detects per chunk
+# Chunks transcribed in parallel; each worker leases its own model, so keep
+# WHISPER_POOL_SIZE >= TRANSCRIBE_WORKERS and cpu_threads ~ cores / workers.
+TRANSCRIBE_WORKERS = int(os.getenv("TRANSCRIBE_WORKERS", "1"))
+
+# Voice activity detection: transcription only runs inside detected speech
+VAD_ENABLED = os.getenv("VAD_ENABLED", "True") == "True"
+VAD_BACKEND = os.getenv("VAD_BACKEND", "energy")  # "energy" or "silero"
+
+# Clip rendering (see utils/renderer.py)
+RENDER_BACKEND = os.getenv("RENDER_BACKEND", "ffmpeg")  # "ffmpeg" or "moviepy"
+RENDER_PRESET = os.getenv("RENDER_PRESET", "medium")  # x264 preset
+# Clips encoded at once; the host's cores are split evenly between encoders.
+RENDER_WORKERS = int(os.getenv("RENDER_WORKERS", "3"))
+# "auto" decodes the source once for all clips when they sit close together
+# (span <= SINGLE_PASS_MAX_SPAN_RATIO x total clip length); "per_clip" or
+# "single_pass" force one strategy. Single pass needs the ffmpeg backend.
+RENDER_MODE = os.getenv("RENDER_MODE", "auto")
+SINGLE_PASS_MAX_SPAN_RATIO = float(os.getenv("SINGLE_PASS_MAX_SPAN_RATIO", "1.5"))
+
+# Scene detection (see utils/scene_detection.py). Fast mode downscales and
+# skips frames; raw scene lists are indexed per video under SCENE_INDEX_DIR.
+SCENE_DETECT_FAST = os.getenv("SCENE_DETECT_FAST", "True") == "True"
+SCENE_DOWNSCALE = int(os.getenv("SCENE_DOWNSCALE", "0"))  # 0 picks a factor automatically
+SCENE_FRAME_SKIP = int(os.getenv("SCENE_FRAME_SKIP", "2"))
+SCENE_BACKEND = os.getenv("SCENE_BACKEND", "opencv")  # or "pyav"
+SCENE_INDEX_DIR = os.path.join(CACHE_DIR, "scenes")
+os.makedirs(SCENE_INDEX_DIR, exist_ok=True)
+
+# Clip candidates (see utils/candidates.py). "windows" slides CANDIDATE_MIN..MAX
+# second windows every CANDIDATE_STRIDE seconds, snapped to sentence and
+# silence boundaries (and shot cuts if CANDIDATE_SNAP_TO_CUTS); "scenes" uses
+# the detected scenes as candidates.
+CANDIDATE_MODE = os.getenv("CANDIDATE_MODE", "windows")
+CANDIDATE_MIN_SECONDS = float(os.getenv("CANDIDATE_MIN_SECONDS", "30"))
+CANDIDATE_MAX_SECONDS = float(os.getenv("CANDIDATE_MAX_SECONDS", "60"))
+CANDIDATE_STRIDE = float(os.getenv("CANDIDATE_STRIDE", "5"))
+CANDIDATE_SNAP_TO_CUTS = os.getenv("CANDIDATE_SNAP_TO_CUTS", "True") == "True"
+
+# Clip scoring (see utils/scoring.py). SCORE_WEIGHTS is a JSON object that
+# overrides the default feature weights, e.g. '{"keywords": 2.0}'.
+SCORE_WEIGHTS = json.loads(os.getenv("SCORE_WEIGHTS", "{}"))
+CLIP_KEYWORDS = [k.strip() for k in os.getenv(
+    "CLIP_KEYWORDS", "insane,crazy,wow,omg,clutch,wtf,hype,lol,lmao,unbelievable"
+).split(",") if k.strip()]
+
+# Transcript cache (see utils/transcript_cache.py)
+TRANSCRIPT_CACHE_DIR = os.path.join(CACHE_DIR, "transcripts")
+os.makedirs(TRANSCRIPT_CACHE_DIR, exist_ok=True)
+TRANSCRIPT_CACHE_MAX_MB = int(os.getenv("TRANSCRIPT_CACHE_MAX_MB", "512"))
+
+# Uploads (see app/services/upload_service.py). Bodies are streamed to disk
+# UPLOAD_CHUNK_SIZE bytes at a time; resumable sessions live in UPLOAD_SESSION_DIR.
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+UPLOAD_SESSION_DIR = os.path.join(INPUT_DIR, ".sessions")
+os.makedirs(UPLOAD_SESSION_DIR, exist_ok=True)
+
+# Supabase Storage uploads (see utils/supabaseClient/resumable_upload.py):
+# files stream over TUS in STORAGE_PART_MB parts (Supabase requires 6), with
+# at most STORAGE_BUFFERED_PARTS read ahead and STORAGE_UPLOAD_RETRIES per part.
+STORAGE_PART_MB = int(os.getenv("STORAGE_PART_MB", "6"))
+STORAGE_BUFFERED_PARTS = int(os.getenv("STORAGE_BUFFERED_PARTS", "4"))
+STORAGE_UPLOAD_RETRIES = int(os.getenv("STORAGE_UPLOAD_RETRIES", "5"))
+STORAGE_UPLOAD_WORKERS = int(os.getenv("STORAGE_UPLOAD_WORKERS", "4"))  # files in parallel
+# Rendered clips waiting for upload (see utils/supabaseClient/clip_store.py);
+# rendering pauses when this many are queued behind slow uploads.
+CLIP_UPLOAD_QUEUE = int(os.getenv("CLIP_UPLOAD_QUEUE", "2"))
+
+# HLS VOD downloads (see utils/hls_download.py): HLS_WORKERS segments are
+# fetched at once, at most HLS_READ_AHEAD ahead of the one being remuxed.
+HLS_WORKERS = int(os.getenv("HLS_WORKERS", "8"))
+HLS_READ_AHEAD = int(os.getenv("HLS_READ_AHEAD", "24"))
+HLS_RETRIES = int(os.getenv("HLS_RETRIES", "4"))
+
+# Downloaded sources (see app/services/media_store.py): VODs and Supabase
+# files indexed by source and SHA-256, evicted least recently used first once
+# MEDIA_STORE_MAX_GB is exceeded (skipping files that jobs are reading).
+MEDIA_STORE_DIR = os.getenv("MEDIA_STORE_DIR", os.path.join(CACHE_DIR, "media"))
+os.makedirs(MEDIA_STORE_DIR, exist_ok=True)
+MEDIA_STORE_MAX_GB = float(os.getenv("MEDIA_STORE_MAX_GB", "50"))
+# A fetched file is kept at least this long, so jobs still queued for it can read it
+MEDIA_LEASE_HOURS = float(os.getenv("MEDIA_LEASE_HOURS", "6"))
+
+# Per-job scratch space (see utils/workspace.py). WORKSPACE_ON_TMPFS puts it in
+# RAM (/dev/shm) when available. WORKSPACE_CLEANUP is "always", "on_success"
+# (keep a failed job's files) or "never"; kept workspaces are swept after
+# WORKSPACE_RETENTION_HOURS.
+WORKSPACE_DIR = os.getenv("WORKSPACE_DIR", os.path.join(TEMP_DIR, "jobs"))
+WORKSPACE_ON_TMPFS = os.getenv("WORKSPACE_ON_TMPFS", "False") == "True"
+WORKSPACE_CLEANUP = os.getenv("WORKSPACE_CLEANUP", "always")
+WORKSPACE_RETENTION_HOURS = float(os.getenv("WORKSPACE_RETENTION_HOURS", "24"))
+
+# Background jobs (see app/services/job_queue.py). JOB_WORKERS processes run
+# jobs from the SQLite queue; failed jobs are retried up to JOB_MAX_ATTEMPTS
+# times with exponential backoff starting at JOB_RETRY_DELAY seconds.
+JOB_DB_PATH = os.getenv("JOB_DB_PATH", os.path.join(CACHE_DIR, "jobs.sqlite3"))
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "1"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "2"))
+JOB_RETRY_DELAY = float(os.getenv("JOB_RETRY_DELAY", "30"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1.0"))
+# how often each worker publishes its Whisper pool / transcript cache stats
+JOB_STATS_INTERVAL = float(os.getenv("JOB_STATS_INTERVAL", "5.0"))
+
 # Configure ImageMagick binary for MoviePy
 # IMAGEMAGICK_BINARY = os.getenv("IMAGEMAGICK_BINARY", "/usr/local/bin/magick")  # Default path for macOS
 # change_settings({"IMAGEMAGICK_BINARY": IMAGEMAGICK_BINARY})
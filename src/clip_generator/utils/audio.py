@@ -1,6 +1,11 @@
 import subprocess
 #import os
 
+import numpy as np
+
+SAMPLE_RATE = 16000  # what faster-whisper expects
+
+
 def enhance_audio(input_video_path: str, output_audio_path: str) -> str:
     """
     Extract and enhance audio from a video using FFmpeg filters.
@@ -16,3 +21,72 @@ def enhance_audio(input_video_path: str, output_audio_path: str) -> str:
     ]
     subprocess.run(cmd, check=True)
     return output_audio_path
+
+
+def _pcm_command(input_path: str, sample_rate: int) -> list:
+    return [
+        "ffmpeg", "-nostdin", "-v", "error",
+        "-i", input_path,
+        "-vn",  # no video
+        "-ac", "1",  # mono
+        "-ar", str(sample_rate),
+        "-f", "f32le",  # raw little-endian float32 samples
+        "pipe:1",
+    ]
+
+
+def stream_pcm(input_path: str, block_seconds: float = 30.0, sample_rate: int = SAMPLE_RATE):
+    """
+    Decode the audio track once with FFmpeg and yield it as float32 mono blocks.
+
+    Nothing is written to disk; each yielded block holds ``block_seconds`` of
+    audio (the last one may be shorter).
+    """
+    block_bytes = max(1, int(block_seconds * sample_rate)) * 4
+    proc = subprocess.Popen(_pcm_command(input_path, sample_rate),
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    try:
+        while True:
+            buf = proc.stdout.read(block_bytes)
+            if not buf:
+                break
+            yield np.frombuffer(buf, dtype=np.float32)
+        proc.wait()
+        if proc.returncode != 0:
+            raise RuntimeError(f"FFmpeg audio decode failed: {proc.stderr.read().decode(errors='replace').strip()}")
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+            proc.wait()
+        proc.stdout.close()
+        proc.stderr.close()
+
+
+def frame_rms(samples: np.ndarray, frame_seconds: float = 0.1, sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """Root-mean-square level of consecutive ``frame_seconds`` frames (trailing partial frame dropped)."""
+    frame = max(1, int(frame_seconds * sample_rate))
+    n = len(samples) // frame
+    if n == 0:
+        return np.zeros(0, dtype=np.float32)
+    frames = samples[:n * frame].reshape(n, frame).astype(np.float32, copy=False)
+    return np.sqrt(np.mean(np.square(frames), axis=1))
+
+
+def audio_stream_hash(input_path: str):
+    """
+    SHA-256 of the first audio stream's encoded packets, or None if it can't be read.
+
+    The stream is copied rather than decoded, so this is bound by disk speed
+    and ignores container-level differences such as remuxing or new metadata.
+    """
+    cmd = [
+        "ffmpeg", "-nostdin", "-v", "error",
+        "-i", input_path,
+        "-map", "0:a:0", "-c", "copy",
+        "-f", "hash", "-hash", "sha256",
+        "pipe:1",
+    ]
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0 or "=" not in result.stdout:
+        return None
+    return result.stdout.strip().split("=", 1)[1]
@@ -0,0 +1,83 @@
+import numpy as np
+
+from clip_generator.config import (CANDIDATE_MAX_SECONDS, CANDIDATE_MIN_SECONDS, CANDIDATE_SNAP_TO_CUTS,
+                                  CANDIDATE_STRIDE)
+
+SENTENCE_END = (".", "?", "!", "…")
+
+
+def sentence_boundaries(words, min_gap=0.6):
+    """
+    Times where a sentence plausibly ends: after entries ending in
+    punctuation, and in the middle of pauses longer than ``min_gap`` seconds.
+    """
+    if len(words) == 0:
+        return np.empty(0)
+    ends_sentence = np.array([text.rstrip().endswith(SENTENCE_END) for text in words.texts])
+    gaps = words.starts[1:] - words.ends[:-1]
+    pauses = (words.ends[:-1] + words.starts[1:])[gaps > min_gap] / 2
+    return np.concatenate((words.ends[ends_sentence], pauses))
+
+
+def silence_boundaries(speech):
+    """Edges of the VAD speech intervals (a window may start or end in silence)."""
+    if speech is None or len(speech) == 0:
+        return np.empty(0)
+    return np.concatenate((speech.starts, speech.ends))
+
+
+def snap(times, boundaries, tolerance):
+    """Move each time to the nearest boundary within ``tolerance`` seconds (vectorized)."""
+    times = np.asarray(times, dtype=np.float64)
+    if len(boundaries) == 0:
+        return times
+    idx = np.searchsorted(boundaries, times)
+    left = boundaries[np.maximum(idx - 1, 0)]
+    right = boundaries[np.minimum(idx, len(boundaries) - 1)]
+    nearest = np.where(np.abs(times - left) <= np.abs(right - times), left, right)
+    return np.where(np.abs(nearest - times) <= tolerance, nearest, times)
+
+
+def generate_candidates(duration,
+                        min_len=30.0,
+                        max_len=60.0,
+                        stride=5.0,
+                        lengths=3,
+                        boundaries=None,
+                        tolerance=3.0):
+    """
+    Propose ``(t0, t1)`` windows of ``min_len``..``max_len`` seconds on a stride.
+
+    A window starts every ``stride`` seconds with ``lengths`` target lengths
+    spread over the allowed range; both edges are snapped to the nearest of
+    ``boundaries`` (sentence ends, silence, scene cuts...) within
+    ``tolerance`` seconds. Snapped windows that leave the length range fall
+    back to their unsnapped end. Everything is array arithmetic, so a 6-hour
+    VOD yields its candidates in milliseconds.
+    """
+    if duration < min_len:
+        return []
+    bounds = np.unique(np.asarray(boundaries if boundaries is not None else [], dtype=np.float64))
+
+    starts = snap(np.arange(0.0, duration - min_len + 1e-9, stride), bounds, tolerance)
+    targets = np.linspace(min_len, max_len, max(1, lengths))
+    t0 = np.repeat(starts, len(targets))
+    raw_end = np.minimum(t0 + np.tile(targets, len(starts)), duration)
+    t1 = snap(raw_end, bounds, tolerance)
+
+    span = t1 - t0
+    t1 = np.where((span >= min_len) & (span <= max_len), t1, raw_end)
+    keep = (t1 - t0 >= min_len) & (t1 - t0 <= max_len) & (t0 >= 0)
+
+    pairs = np.unique(np.round(np.column_stack((t0[keep], t1[keep])), 3), axis=0)
+    return [(float(a), float(b)) for a, b in pairs]
+
+
+def candidate_windows(duration, words, speech=None, cuts=None, snap_to_cuts=CANDIDATE_SNAP_TO_CUTS,
+                      min_len=CANDIDATE_MIN_SECONDS, max_len=CANDIDATE_MAX_SECONDS, stride=CANDIDATE_STRIDE):
+    """Sliding-window candidates snapped to sentence/silence (and optionally shot) boundaries."""
+    boundaries = [sentence_boundaries(words), silence_boundaries(speech)]
+    if snap_to_cuts and cuts is not None:
+        boundaries.append(np.asarray(cuts, dtype=np.float64))
+    return generate_candidates(duration, min_len, max_len, stride,
+                               boundaries=np.concatenate(boundaries))
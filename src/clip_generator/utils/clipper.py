@@ -1,158 +1,160 @@
 import os
-from clip_generator.config import OUTPUT_DIR
-from moviepy.video.io.VideoFileClip import VideoFileClip
-from moviepy.video.fx.all import crop
-from moviepy.video.fx.resize import resize
-from clip_generator.utils.supabaseClient.supabase import supabase
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from clip_generator.config import CANDIDATE_MIN_SECONDS, OUTPUT_DIR, RENDER_BACKEND, RENDER_MODE, RENDER_WORKERS
+from clip_generator.utils.supabaseClient.clip_store import clip_store
 from clip_generator.utils.scene_detection import detect_scenes_local
+from clip_generator.utils.scoring import rank_windows
+from clip_generator.utils.word_index import WordIndex
+from clip_generator.utils.renderer import prefer_single_pass, render_clip, render_clips_single_pass
 
 
 MAX_CLIPS = 3
 MIN_WORDS = 20
+MIN_SPEECH_RATIO = 0.2  # scenes with less speech than this (per VAD) are skipped
 CHUNK_SIZE = 30.0  # seconds
 CROP_W, CROP_H = 720, 1280
 
 
+def select_scenes(scenes,
+                  words,
+                  min_words=MIN_WORDS,
+                  max_clips=MAX_CLIPS,
+                  speech=None,
+                  min_speech_ratio=MIN_SPEECH_RATIO,
+                  envelope=None,
+                  cuts=None):
+    """
+    Pick the scenes worth turning into clips, without rendering anything.
+
+    Every scene is scored at once (words per second, loudness, cut density,
+    keyword hits; see utils/scoring.py) and the best non-overlapping ones
+    win. Scenes under ``min_words`` words or ``min_speech_ratio`` speech are
+    never picked. ``words`` is the transcript's ``WordIndex``. Returns a list
+    of ``(scene_index, t0, t1)`` tuples, best first, at most ``max_clips`` long.
+    """
+    ranked = rank_windows(scenes, words, max_clips,
+                          min_words=min_words,
+                          speech=speech,
+                          min_speech_ratio=min_speech_ratio,
+                          envelope=envelope,
+                          cuts=cuts)
+    for i, t0, t1, score in ranked:
+        print(f"Scene {i} accepted ({t0:.1f}-{t1:.1f}s, {words.word_count(t0, t1)} words, score {score:.2f})")
+    print(f"Selected {len(ranked)} of {len(scenes)} scenes")
+    return [(i, t0, t1) for i, t0, t1, _ in ranked]
+
+
+def encoder_threads(workers):
+    """Threads per encoder so that ``workers`` concurrent encoders share the host's cores."""
+    return max(1, (os.cpu_count() or 1) // max(1, workers))
+
+
+def use_single_pass(windows, mode=RENDER_MODE, backend=RENDER_BACKEND):
+    """Decide whether ``(index, t0, t1)`` windows should share one decode of the source."""
+    if backend != "ffmpeg" or len(windows) < 2 or mode == "per_clip":
+        return False
+    return mode == "single_pass" or prefer_single_pass([(t0, t1) for _, t0, t1 in windows])
+
+
+def iter_rendered_clips(filepath,
+                        windows,
+                        crop_width=CROP_W,
+                        crop_height=CROP_H,
+                        workers=RENDER_WORKERS,
+                        output_dir=OUTPUT_DIR):
+    """
+    Render ``(index, t0, t1)`` windows.
+
+    Yields ``(index, t0, t1, clip_path, thumb_path)``. Clips that sit close
+    together are rendered from a single decode of the source and come back
+    together; otherwise each clip renders on its own FFmpeg process, at most
+    ``workers`` at a time, and is yielded as it finishes. Clips that fail to
+    render are reported and skipped.
+    """
+    if not windows:
+        return
+
+    paths = {i: (os.path.join(output_dir, f"clip_{i}.mp4"), os.path.join(output_dir, f"thumb_{i}.jpg"))
+             for i, _, _ in windows}
+
+    if use_single_pass(windows):
+        print(f"Rendering {len(windows)} clips in a single pass over the source")
+        jobs = [(*paths[i], t0, t1) for i, t0, t1 in windows]
+        try:
+            render_clips_single_pass(filepath, jobs, crop_width, crop_height,
+                                     threads=encoder_threads(len(windows)))
+        except Exception as e:
+            print(f"❌ Single-pass render failed, rendering clips one by one: {e}")
+        else:
+            for i, t0, t1 in windows:
+                yield (i, t0, t1, *paths[i])
+            return
+
+    workers = max(1, min(workers, len(windows)))
+    threads = encoder_threads(workers)
+    print(f"Rendering {len(windows)} clips on {workers} encoders x {threads} threads")
+
+    # the encoders are FFmpeg subprocesses, so threads are enough to drive them
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {}
+        for i, t0, t1 in windows:
+            out_path, thumb = paths[i]
+            future = pool.submit(render_clip, filepath, out_path, thumb, t0, t1,
+                                 crop_width, crop_height, threads=threads)
+            futures[future] = (i, t0, t1, out_path, thumb)
+
+        for future in as_completed(futures):
+            i, t0, t1, out_path, thumb = futures[future]
+            try:
+                future.result()
+            except Exception as e:
+                print(f"❌ Rendering clip {i} ({t0:.1f}-{t1:.1f}s) failed: {e}")
+                continue
+            yield i, t0, t1, out_path, thumb
+
+
 def cut_clips(filepath,
               transcript,
               project_id,
               min_words=MIN_WORDS,
               max_clips=MAX_CLIPS,
               crop_width=CROP_W,
-              crop_height=CROP_H):
-    # 1) detect your shot boundaries
-    scenes = detect_scenes_local(filepath)
-
-    # 2) index transcript by time for quick lookup
-    #    flatten segments into (time, word_count) points
-    word_events = []
-    for seg in transcript:
-        start, end, text = seg["start"], seg["end"], seg["text"]
-        wc = len(text.split())
-        # we'll assign all words in this segment to its midpoint
-        mid = (start + end) / 2
-        word_events.append((mid, wc))
-
-    def words_in_scene(t0, t1):
-        return sum(wc for t, wc in word_events if t0 <= t <= t1)
-
-    # 3) iterate scenes, pick the best ones
-    clips, video = [], VideoFileClip(filepath)
-    for i, (t0, t1) in enumerate(scenes):
-        if len(clips) >= max_clips:
-            break
-
-        wc = words_in_scene(t0, t1)
-        if wc < min_words:
-            print(f"Scene {i} ({t0:.1f}-{t1:.1f}s) skipped ({wc} words)")
-            continue
-
-        print(f"Scene {i} accepted ({t0:.1f}-{t1:.1f}s, {wc} words) → cutting clip")
-        clip = video.subclip(t0, t1)
-
-        # ensure we can crop to vertical
-        if clip.w < crop_width or clip.h < crop_height:
-            clip = resize(clip, height=max(clip.h, crop_height))
-
-        x_c, y_c = clip.w/2, clip.h/2
-        cropped = crop(clip,
-                       x_center=x_c,
-                       y_center=y_c,
-                       width=crop_width,
-                       height=crop_height)
-
-        out_path = os.path.join(OUTPUT_DIR, f"clip_{i}.mp4")
-        cropped.write_videofile(out_path,
-                                codec="libx264",
-                                audio_codec="aac",
-                                preset="medium",
-                                threads=4,
-                                fps=clip.fps)
-
-        thumb = os.path.join(OUTPUT_DIR, f"thumb_{i}.jpg")
-        cropped.save_frame(thumb, t=(t0 + t1)/2)
-
-        meta = save_clip_to_supabase(project_id,
-                                     out_path,
-                                     thumb,
-                                     "",  # you can join transcripts inside [t0,t1] if you like
-                                     t0, t1)
-        if meta:
-            clips.append(meta)
-
-    video.close()
+              crop_height=CROP_H,
+              speech=None,
+              min_speech_ratio=MIN_SPEECH_RATIO,
+              scenes=None,
+              envelope=None,
+              cuts=None,
+              timeline=None,
+              output_dir=OUTPUT_DIR,
+              store=None):
+    store = store or clip_store
+    if store is None:
+        raise RuntimeError("Supabase storage is not configured (SUPABASE_URL / SUPABASE_KEY)")
+
+    # 1) detect your shot boundaries (unless the caller already did)
+    if scenes is None:
+        scenes = detect_scenes_local(filepath)
+
+    # 2) index transcript by time for O(log n) window lookups
+    words = WordIndex(transcript)
+
+    # 3) choose every clip up front so they can all render at once; in a
+    #    partial download no clip may straddle two of the downloaded ranges
+    if timeline is not None:
+        scenes = timeline.split_windows(scenes, min_len=CANDIDATE_MIN_SECONDS)
+    windows = select_scenes(scenes, words, min_words, max_clips, speech, min_speech_ratio, envelope, cuts)
+
+    # 4) render concurrently; each clip uploads while the next ones encode and
+    #    all rows are written in one go. A partial download's clips are
+    #    stored in original-VOD time.
+    with store.publisher(project_id) as publisher:
+        for i, t0, t1, out_path, thumb in iter_rendered_clips(filepath, windows, crop_width, crop_height,
+                                                              output_dir=output_dir):
+            start, end = (timeline.to_source(t0), timeline.to_source(t1, end=True)) if timeline else (t0, t1)
+            publisher.submit({"clip_path": out_path, "thumbnail_path": thumb,
+                              "transcript": words.text(t0, t1), "start_time": start, "end_time": end})
+    clips = publisher.rows
+
+    clips.sort(key=lambda c: c["start_time"])
     return {"clips": clips, "status": "ready"}
-
-def save_clip_to_supabase(project_id, clip_path, thumbnail_path, transcript, start, end):
-    """
-    Save the clip, its thumbnail, and its transcript to Supabase using a signed URL upload strategy.
-
-    Args:
-        project_id (str): ID of the project in Supabase.
-        clip_path (str): Local file path of the clip.
-        thumbnail_path (str): Local file path of the thumbnail.
-        transcript (str): Transcript associated with the clip.
-        start (float): Start time of the clip in seconds.
-        end (float): End time of the clip in seconds.
-
-    Returns:
-        dict: Metadata for the uploaded clip.
-    """
-    bucket_name = "clips"
-    clip_filename = os.path.basename(clip_path)
-    thumbnail_filename = os.path.basename(thumbnail_path)
-
-    try:
-        # Upload clip
-        clip_upload_path = os.path.join(project_id, clip_filename)
-        clip_signed_url = supabase.storage.from_(bucket_name).create_signed_upload_url(clip_upload_path)
-        clip_token = clip_signed_url.get("token")
-        if not clip_token:
-            raise ValueError("Failed to retrieve the token for the clip upload.")
-
-        with open(clip_path, "rb") as clip_file:
-            supabase.storage.from_(bucket_name).upload_to_signed_url(
-                path=clip_upload_path,
-                file=clip_file,
-                token=clip_token
-            )
-
-        # Upload thumbnail
-        thumbnail_upload_path = os.path.join(project_id, thumbnail_filename)
-        thumbnail_signed_url = supabase.storage.from_('thumbnails').create_signed_upload_url(thumbnail_upload_path)
-        thumbnail_token = thumbnail_signed_url.get("token")
-        if not thumbnail_token:
-            raise ValueError("Failed to retrieve the token for the thumbnail upload.")
-
-        with open(thumbnail_path, "rb") as thumbnail_file:
-            supabase.storage.from_('thumbnails').upload_to_signed_url(
-                path=thumbnail_upload_path,
-                file=thumbnail_file,
-                token=thumbnail_token
-            )
-
-        # Save metadata to Supabase
-        metadata_response = supabase.table("clips").insert({
-            "project_id": project_id,
-            "file_url": clip_upload_path,
-            "thumbnail_url": thumbnail_upload_path,
-            "transcript": transcript,
-            "start_time": start,
-            "end_time": end
-        }).execute()
-
-        if metadata_response:
-            print(f"✅ Clip and thumbnail metadata successfully saved to Supabase for project {project_id}.")
-            return {
-                "project_id": project_id,
-                "file_url": clip_upload_path,
-                "thumbnail_url": thumbnail_upload_path,
-                "transcript": transcript,
-                "start_time": start,
-                "end_time": end
-            }
-        else:
-            print(f"❌ Failed to save clip metadata to Supabase: {metadata_response}")
-    except Exception as e:
-        print(f"❌ An error occurred while uploading the clip or thumbnail: {e}")
-    return None
\ No newline at end of file
@@ -0,0 +1,113 @@
+import numpy as np
+from scipy.signal import sosfilt
+
+from clip_generator.utils.audio import SAMPLE_RATE, stream_pcm
+
+ENVELOPE_HOP = 0.1  # seconds per envelope frame
+MOMENTARY_WINDOW = 0.4  # EBU R128 momentary loudness window
+LOUDNESS_FLOOR = -70.0  # LUFS; BS.1770's absolute gate, used for silence
+
+# columns of AudioEnvelope.data
+RMS, PEAK, LOUDNESS = 0, 1, 2
+
+
+def k_weighting(sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """
+    ITU-R BS.1770 K-weighting (high shelf + high pass) as second-order
+    sections, with coefficients derived for any sample rate.
+    """
+    # stage 1: +4 dB high shelf modelling the head
+    f0, gain, q = 1681.974450955533, 3.999843853973347, 0.7071752369554196
+    k = np.tan(np.pi * f0 / sample_rate)
+    vh = 10 ** (gain / 20)
+    vb = vh ** 0.4996667741545416
+    a0 = 1 + k / q + k * k
+    shelf = [(vh + vb * k / q + k * k) / a0, 2 * (k * k - vh) / a0, (vh - vb * k / q + k * k) / a0,
+             1.0, 2 * (k * k - 1) / a0, (1 - k / q + k * k) / a0]
+
+    # stage 2: RLB high pass
+    f0, q = 38.13547087602444, 0.5003270373238773
+    k = np.tan(np.pi * f0 / sample_rate)
+    a0 = 1 + k / q + k * k
+    highpass = [1.0, -2.0, 1.0, 1.0, 2 * (k * k - 1) / a0, (1 - k / q + k * k) / a0]
+    return np.array([shelf, highpass])
+
+
+class AudioEnvelope:
+    """
+    Compact loudness envelope of an audio track: one row per ``hop`` seconds
+    with the frame's RMS, sample peak and EBU R128 momentary loudness (LUFS,
+    400 ms window centred on the frame), stored as a float32 ``(n, 3)`` array.
+
+    A 6-hour VOD is ~216k rows (2.6 MB), so VAD, clip scoring and highlight
+    detection can all share it instead of re-reading the audio.
+    """
+
+    def __init__(self, data, hop=ENVELOPE_HOP):
+        self.data = np.asarray(data, dtype=np.float32).reshape(-1, 3)
+        self.hop = float(hop)
+
+    def __len__(self):
+        return len(self.data)
+
+    @property
+    def rms(self):
+        return self.data[:, RMS]
+
+    @property
+    def peak(self):
+        return self.data[:, PEAK]
+
+    @property
+    def loudness(self):
+        return self.data[:, LOUDNESS]
+
+    @property
+    def duration(self):
+        return len(self.data) * self.hop
+
+    @classmethod
+    def from_blocks(cls, blocks, sample_rate=SAMPLE_RATE, hop=ENVELOPE_HOP):
+        """
+        Build the envelope from an iterable of float32 mono blocks (e.g.
+        ``stream_pcm``) in one pass; the K-weighting filter state is carried
+        across blocks so block size does not affect the result. A trailing
+        partial frame is dropped.
+        """
+        frame = max(1, int(round(hop * sample_rate)))
+        sos = k_weighting(sample_rate)
+        zi = np.zeros((sos.shape[0], 2))
+        carry = np.zeros(0, dtype=np.float32)
+        rms, peak, power = [], [], []
+
+        for block in blocks:
+            block = np.concatenate((carry, block)) if len(carry) else block
+            n = len(block) // frame
+            carry = block[n * frame:]
+            if n == 0:
+                continue
+            frames = block[:n * frame].reshape(n, frame)
+            rms.append(np.sqrt(np.mean(np.square(frames, dtype=np.float64), axis=1)))
+            peak.append(np.max(np.abs(frames), axis=1))
+            weighted, zi = sosfilt(sos, frames.ravel(), zi=zi)
+            power.append(np.mean(np.square(weighted).reshape(n, frame), axis=1))
+
+        if not rms:
+            return cls(np.zeros((0, 3)), hop)
+        power = np.concatenate(power)
+
+        # mean K-weighted power over the momentary window around each frame
+        n = len(power)
+        width = max(1, int(round(MOMENTARY_WINDOW / hop)))
+        cum = np.concatenate(([0.0], np.cumsum(power)))
+        lo = np.clip(np.arange(n) - width // 2, 0, n)
+        hi = np.minimum(lo + width, n)
+        momentary = (cum[hi] - cum[lo]) / np.maximum(hi - lo, 1)
+        loudness = np.maximum(-0.691 + 10 * np.log10(momentary + 1e-12), LOUDNESS_FLOOR)
+
+        return cls(np.column_stack((np.concatenate(rms), np.concatenate(peak), loudness)), hop)
+
+
+def extract_envelope(input_path: str, hop: float = ENVELOPE_HOP) -> AudioEnvelope:
+    """Decode ``input_path``'s audio once, streaming, and return its envelope."""
+    return AudioEnvelope.from_blocks(stream_pcm(input_path, 60.0), SAMPLE_RATE, hop)
@@ -0,0 +1,71 @@
+import fcntl
+import os
+from contextlib import contextmanager
+
+
+def _lock_current(path, operation):
+    """Open ``path`` and ``flock`` it, retrying until the file locked is the one at ``path``."""
+    while True:
+        f = open(path, "a")
+        try:
+            fcntl.flock(f, operation)
+            try:
+                current = os.path.samestat(os.fstat(f.fileno()), os.stat(path))
+            except FileNotFoundError:
+                current = False
+        except BaseException:
+            f.close()
+            raise
+        if current:
+            return f
+        f.close()
+
+
+@contextmanager
+def exclusive_lock(path):
+    """
+    Hold an exclusive ``flock`` on ``path`` (created as needed), across
+    threads and processes, and delete the file on release so lock files
+    don't pile up.
+
+    A waiter that wakes up holding a file its previous owner already deleted
+    retries on the current one, so two holders never overlap.
+    """
+    f = _lock_current(path, fcntl.LOCK_EX)
+    try:
+        yield
+    finally:
+        # unlink while still holding the lock, then release it by closing
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        f.close()
+
+
+@contextmanager
+def shared_lock(path):
+    """
+    Hold a shared ``flock`` on ``path`` (created as needed); any number of
+    holders, but none while someone holds ``exclusive_lock`` or
+    ``try_exclusive_lock`` on it. The file is left in place.
+    """
+    f = _lock_current(path, fcntl.LOCK_SH)
+    try:
+        yield
+    finally:
+        f.close()
+
+
+def try_exclusive_lock(path):
+    """
+    Take an exclusive ``flock`` on ``path`` without waiting: the open file
+    (close it to release) or None if someone holds the lock.
+    """
+    f = open(path, "a")
+    try:
+        fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        f.close()
+        return None
+    return f
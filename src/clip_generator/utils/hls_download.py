@@ -0,0 +1,294 @@
+import hashlib
+import json
+import logging
+import os
+import subprocess
+import time
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin, urlsplit
+
+import httpx
+
+from clip_generator.config import HLS_READ_AHEAD, HLS_RETRIES, HLS_WORKERS
+from clip_generator.utils.timeline import Timeline, overlapping_segments
+
+logger = logging.getLogger(__name__)
+
+# ``start`` is the segment's offset in seconds from the start of the playlist
+Segment = namedtuple("Segment", "index uri start duration")
+
+
+class HLSError(RuntimeError):
+    pass
+
+
+def parse_media_playlist(text, base_url):
+    """
+    Parse an HLS media playlist into ``(segments, init_uri)``.
+
+    ``init_uri`` is the ``EXT-X-MAP`` initialisation section for fMP4
+    playlists (None for MPEG-TS). Encrypted playlists are rejected.
+    """
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    if not lines or lines[0] != "#EXTM3U":
+        raise HLSError("Not an HLS playlist")
+    if any(line.startswith("#EXT-X-STREAM-INF") for line in lines):
+        raise HLSError("Got a master playlist; pass the media playlist of one variant")
+
+    segments, init_uri = [], None
+    start, duration = 0.0, None
+    for line in lines[1:]:
+        if line.startswith("#EXTINF:"):
+            duration = float(line[len("#EXTINF:"):].split(",", 1)[0])
+        elif line.startswith("#EXT-X-MAP:"):
+            attrs = line[len("#EXT-X-MAP:"):]
+            uri = attrs.split('URI="', 1)[1].split('"', 1)[0]
+            init_uri = urljoin(base_url, uri)
+        elif line.startswith("#EXT-X-KEY:") and "METHOD=NONE" not in line:
+            raise HLSError("Encrypted HLS playlists are not supported")
+        elif not line.startswith("#"):
+            segments.append(Segment(len(segments), urljoin(base_url, line), start, duration or 0.0))
+            start += duration or 0.0
+            duration = None
+    return segments, init_uri
+
+
+def playlist_fingerprint(segments):
+    """Identity of a playlist that ignores signed query strings (tokens rotate between requests)."""
+    digest = hashlib.sha1()
+    for segment in segments:
+        digest.update(urlsplit(segment.uri).path.encode())
+        digest.update(b"\n")
+    return digest.hexdigest()
+
+
+class HLSDownloader:
+    """
+    Downloads an HLS VOD straight into an MP4 with no intermediate TS file.
+
+    Segments are fetched by ``workers`` threads over one pooled HTTP client,
+    at most ``read_ahead`` past the segment being written, and are piped in
+    order into ``ffmpeg -c copy``. If a segment can't be fetched after
+    ``retries`` attempts, FFmpeg's input is closed cleanly so the part file
+    holds every segment up to that point; the checkpoint next to the output
+    records it and the download resumes from the next segment in a new part
+    (in this call, or the next one if the process died). Parts are
+    concatenated (stream copy) only when a download resumed or skipped
+    ahead to another requested range.
+    """
+
+    def __init__(self, client=None, workers=HLS_WORKERS, read_ahead=HLS_READ_AHEAD,
+                 retries=HLS_RETRIES, backoff=1.0):
+        self._owns_client = client is None
+        self.client = client or httpx.Client(
+            timeout=httpx.Timeout(30.0, connect=10.0),
+            limits=httpx.Limits(max_connections=workers * 2, max_keepalive_connections=workers * 2),
+            follow_redirects=True,
+        )
+        self.workers = max(1, workers)
+        self.read_ahead = max(self.workers, read_ahead)
+        self.retries = retries
+        self.backoff = backoff
+
+    def close(self):
+        """Close the HTTP client if this downloader created it."""
+        if self._owns_client:
+            self.client.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def fetch(self, uri):
+        for attempt in range(self.retries + 1):
+            try:
+                response = self.client.get(uri)
+                response.raise_for_status()
+                return response.content
+            except httpx.HTTPError as e:
+                if attempt == self.retries:
+                    raise HLSError(f"Failed to fetch {uri}: {e}")
+                time.sleep(self.backoff * 2 ** attempt)
+
+    def playlist(self, url):
+        return parse_media_playlist(self.fetch(url).decode("utf-8"), url)
+
+    @staticmethod
+    def _checkpoint_path(mp4_path):
+        return f"{mp4_path}.hls.json"
+
+    def _load_checkpoint(self, mp4_path, fingerprint):
+        try:
+            with open(self._checkpoint_path(mp4_path)) as f:
+                checkpoint = json.load(f)
+        except (OSError, ValueError):
+            return {"fingerprint": fingerprint, "parts": []}
+        if checkpoint.get("fingerprint") != fingerprint:
+            logger.warning("Playlist changed since the last attempt; starting over")
+            for part in checkpoint.get("parts", []):
+                _remove(part["path"])
+            return {"fingerprint": fingerprint, "parts": []}
+        checkpoint["parts"] = [part for part in checkpoint["parts"] if os.path.isfile(part["path"])]
+        return checkpoint
+
+    def _save_checkpoint(self, mp4_path, checkpoint):
+        tmp = self._checkpoint_path(mp4_path) + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(checkpoint, f)
+        os.replace(tmp, self._checkpoint_path(mp4_path))
+
+    def _remux_part(self, segments, init_uri, part_path, pool):
+        """
+        Pipe ``segments`` in order into FFmpeg writing ``part_path``.
+        Returns how many were written; stops early at the first segment that
+        can't be fetched.
+        """
+        cmd = ["ffmpeg", "-v", "error", "-y"]
+        if init_uri is None:
+            cmd += ["-f", "mpegts"]
+        cmd += ["-i", "pipe:0", "-c", "copy"]
+        if init_uri is None:
+            cmd += ["-bsf:a", "aac_adtstoasc"]
+        cmd += ["-f", "mp4", part_path]
+        proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+
+        written = 0
+        pending = deque()
+        upcoming = iter(segments)
+
+        def submit_next():
+            segment = next(upcoming, None)
+            if segment is not None:
+                pending.append(pool.submit(self.fetch, segment.uri))
+
+        try:
+            if init_uri is not None:
+                proc.stdin.write(self.fetch(init_uri))
+            for _ in range(self.read_ahead):
+                submit_next()
+            while pending:
+                try:
+                    data = pending.popleft().result()
+                except HLSError as e:
+                    logger.error("%s; keeping %d segment(s) of this part", e, written)
+                    break
+                proc.stdin.write(data)
+                written += 1
+                submit_next()
+        except BrokenPipeError:
+            pass
+        finally:
+            for future in pending:
+                future.cancel()
+            try:
+                proc.stdin.close()
+            except BrokenPipeError:
+                pass
+            stderr = proc.stderr.read().decode(errors="replace").strip()
+            proc.wait()
+        if proc.returncode != 0 and written:
+            raise HLSError(f"FFmpeg remux failed: {stderr}")
+        return written
+
+    def download(self, playlist_url, mp4_path, ranges=None):
+        """
+        Download ``playlist_url`` (a media playlist) into ``mp4_path``,
+        resuming from the checkpoint if one matches.
+
+        ``ranges`` (``[(start, end), ...]`` seconds, see
+        ``utils.timeline.normalize_ranges``) limits the download to the
+        segments overlapping them. Each contiguous run of segments gets its
+        own parts so the concatenated file has no timestamp gaps, and the
+        ``Timeline`` mapping it back to the VOD is saved next to it and
+        returned. Returns None for a full download.
+        """
+        segments, init_uri = self.playlist(playlist_url)
+        timeline = None
+        if ranges:
+            segments = overlapping_segments(segments, ranges)
+            if segments:
+                timeline = Timeline.from_segments(segments)
+        if not segments:
+            raise HLSError("No segments to download")
+        # a part never spans two runs of segments
+        run_ends = [i for i in range(1, len(segments)) if segments[i].index != segments[i - 1].index + 1]
+        run_ends.append(len(segments))
+
+        checkpoint = self._load_checkpoint(mp4_path, playlist_fingerprint(segments))
+        done = sum(part["segments"] for part in checkpoint["parts"])
+        if done:
+            logger.info("Resuming HLS download at segment %d of %d", done, len(segments))
+
+        started = time.perf_counter()
+        stalls = 0
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            while done < len(segments):
+                part_path = f"{mp4_path}.part{len(checkpoint['parts'])}.mp4"
+                run_end = next(end for end in run_ends if end > done)
+                written = self._remux_part(segments[done:run_end], init_uri, part_path, pool)
+                if written == 0:
+                    _remove(part_path)
+                    stalls += 1
+                    if stalls > self.retries:
+                        raise HLSError(f"Download stalled at segment {done} of {len(segments)}; "
+                                       "call again to resume")
+                    time.sleep(self.backoff * 2 ** stalls)
+                    continue
+                stalls = 0
+                checkpoint["parts"].append({"path": part_path, "segments": written})
+                self._save_checkpoint(mp4_path, checkpoint)
+                done += written
+                if done < len(segments) and done != run_end:
+                    logger.warning("Resuming at segment %d of %d in a new part", done, len(segments))
+
+        parts = [part["path"] for part in checkpoint["parts"]]
+        if len(parts) == 1:
+            os.replace(parts[0], mp4_path)
+        else:
+            concat_parts(parts, mp4_path)
+            for path in parts:
+                _remove(path)
+        _remove(self._checkpoint_path(mp4_path))
+        if timeline is not None:
+            timeline.save(mp4_path)
+        logger.info("HLS download of %d segments done in %.1fs (%.1f MB)", len(segments),
+                    time.perf_counter() - started, os.path.getsize(mp4_path) / 1e6)
+        return timeline
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def concat_parts(parts, mp4_path):
+    """Join MP4 parts into ``mp4_path`` (stream copy); timestamps continue from part to part."""
+    listing = f"{mp4_path}.concat.txt"
+    with open(listing, "w") as f:
+        for path in parts:
+            f.write(f"file '{os.path.abspath(path)}'\n")
+    try:
+        result = subprocess.run(
+            ["ffmpeg", "-nostdin", "-v", "error", "-y", "-f", "concat", "-safe", "0",
+             "-i", listing, "-c", "copy", mp4_path],
+            capture_output=True, text=True,
+        )
+    finally:
+        _remove(listing)
+    if result.returncode != 0:
+        raise HLSError(f"FFmpeg concat failed: {result.stderr.strip()}")
+
+
+def download_hls(playlist_url, mp4_path, ranges=None, **options):
+    """
+    Download an HLS media playlist (or just ``ranges`` of it) into
+    ``mp4_path``; returns the ``Timeline`` of a partial download (see
+    ``HLSDownloader``).
+    """
+    with HLSDownloader(**options) as downloader:
+        return downloader.download(playlist_url, mp4_path, ranges)
@@ -0,0 +1,162 @@
+import subprocess
+
+from clip_generator.config import RENDER_BACKEND, RENDER_PRESET, SINGLE_PASS_MAX_SPAN_RATIO
+
+
+def vertical_filter(crop_width: int, crop_height: int) -> str:
+    """
+    FFmpeg filter chain that upscales the frame just enough to cover
+    ``crop_width`` x ``crop_height`` (never downscales) and center-crops to it.
+    """
+    factor = f"max(1,max({crop_width}/iw,{crop_height}/ih))"
+    return (
+        f"scale=w='ceil(iw*{factor}/2)*2':h='ceil(ih*{factor}/2)*2',"
+        f"crop={crop_width}:{crop_height},setsar=1"
+    )
+
+
+def _run_ffmpeg(cmd: list, what: str) -> None:
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"FFmpeg {what} failed: {result.stderr.strip()}")
+
+
+def render_clip_ffmpeg(filepath, out_path, thumb_path, t0, t1,
+                       crop_width, crop_height, threads=0, preset=RENDER_PRESET):
+    """
+    Cut, crop and encode ``[t0, t1]`` of ``filepath`` entirely inside FFmpeg.
+
+    Input seeking (``-ss`` before ``-i``) is frame-accurate when re-encoding,
+    and only the frames of the clip are decoded.
+    """
+    vf = vertical_filter(crop_width, crop_height)
+    _run_ffmpeg([
+        "ffmpeg", "-nostdin", "-v", "error", "-y",
+        "-ss", f"{t0:.3f}", "-i", filepath, "-t", f"{t1 - t0:.3f}",
+        "-vf", vf,
+        "-c:v", "libx264", "-preset", preset, "-threads", str(threads),
+        "-c:a", "aac",
+        "-movflags", "+faststart",
+        out_path,
+    ], "clip render")
+    _run_ffmpeg([
+        "ffmpeg", "-nostdin", "-v", "error", "-y",
+        "-ss", f"{(t0 + t1) / 2:.3f}", "-i", filepath,
+        "-frames:v", "1", "-vf", vf, "-q:v", "2",
+        thumb_path,
+    ], "thumbnail")
+    return out_path, thumb_path
+
+
+def render_clip_moviepy(filepath, out_path, thumb_path, t0, t1,
+                        crop_width, crop_height, threads=4, preset=RENDER_PRESET):
+    """Cut, crop and encode ``[t0, t1]`` of ``filepath`` by decoding frames through MoviePy."""
+    from moviepy.video.io.VideoFileClip import VideoFileClip
+    from moviepy.video.fx.all import crop
+    from moviepy.video.fx.resize import resize
+
+    with VideoFileClip(filepath) as video:
+        clip = video.subclip(t0, t1)
+
+        # ensure we can crop to vertical
+        if clip.w < crop_width or clip.h < crop_height:
+            clip = resize(clip, height=max(clip.h, crop_height))
+
+        x_c, y_c = clip.w/2, clip.h/2
+        cropped = crop(clip,
+                       x_center=x_c,
+                       y_center=y_c,
+                       width=crop_width,
+                       height=crop_height)
+
+        cropped.write_videofile(out_path,
+                                codec="libx264",
+                                audio_codec="aac",
+                                preset=preset,
+                                threads=threads or 4,
+                                fps=clip.fps)
+        # frame times are relative to the subclip
+        cropped.save_frame(thumb_path, t=(t1 - t0) / 2)
+    return out_path, thumb_path
+
+
+def has_audio(filepath) -> bool:
+    result = subprocess.run(
+        ["ffprobe", "-v", "error", "-select_streams", "a",
+         "-show_entries", "stream=index", "-of", "csv=p=0", filepath],
+        capture_output=True, text=True,
+    )
+    return result.returncode == 0 and bool(result.stdout.strip())
+
+
+def render_clips_single_pass(filepath, jobs, crop_width, crop_height, threads=0, preset=RENDER_PRESET):
+    """
+    Render several clips and their thumbnails from one decode of the source.
+
+    ``jobs`` is a list of ``(clip_path, thumb_path, t0, t1)``. A single FFmpeg
+    process seeks once to the earliest clip, decodes through to the latest
+    one, scales and crops every frame once, then splits the frames between one
+    trimmed encoder per clip and one single-frame JPEG output per thumbnail.
+    """
+    span_start = min(t0 for _, _, t0, _ in jobs)
+    span_end = max(t1 for _, _, _, t1 in jobs)
+    n = len(jobs)
+    audio = has_audio(filepath)
+
+    # trim times are relative to the seek point
+    video_taps = "".join(f"[v{k}]" for k in range(2 * n))
+    graph = [f"[0:v]{vertical_filter(crop_width, crop_height)},split={2 * n}{video_taps}"]
+    if audio:
+        graph.append(f"[0:a]asplit={n}" + "".join(f"[a{k}]" for k in range(n)))
+
+    outputs = []
+    for k, (clip_path, thumb_path, t0, t1) in enumerate(jobs):
+        a, b = t0 - span_start, t1 - span_start
+        mid = (a + b) / 2
+        graph.append(f"[v{2 * k}]trim=start={a:.3f}:end={b:.3f},setpts=PTS-STARTPTS[cv{k}]")
+        graph.append(f"[v{2 * k + 1}]trim=start={mid:.3f}:end={mid + 1:.3f},setpts=PTS-STARTPTS[tv{k}]")
+        outputs += ["-map", f"[cv{k}]"]
+        if audio:
+            graph.append(f"[a{k}]atrim=start={a:.3f}:end={b:.3f},asetpts=PTS-STARTPTS[ca{k}]")
+            outputs += ["-map", f"[ca{k}]", "-c:a", "aac"]
+        outputs += ["-c:v", "libx264", "-preset", preset, "-threads", str(threads),
+                    "-movflags", "+faststart", clip_path]
+        outputs += ["-map", f"[tv{k}]", "-frames:v", "1", "-q:v", "2", thumb_path]
+
+    _run_ffmpeg([
+        "ffmpeg", "-nostdin", "-v", "error", "-y",
+        "-ss", f"{span_start:.3f}", "-t", f"{span_end - span_start:.3f}", "-i", filepath,
+        "-filter_complex", ";".join(graph),
+        *outputs,
+    ], "single-pass render")
+    return [(clip_path, thumb_path) for clip_path, thumb_path, _, _ in jobs]
+
+
+def prefer_single_pass(windows, max_span_ratio=SINGLE_PASS_MAX_SPAN_RATIO) -> bool:
+    """
+    Whether one decode across all ``(t0, t1)`` windows is cheaper than seeking to each.
+
+    True when the decoded span (including the gaps between clips) is at most
+    ``max_span_ratio`` times the total clip duration.
+    """
+    if len(windows) < 2:
+        return False
+    span = max(t1 for _, t1 in windows) - min(t0 for t0, _ in windows)
+    total = sum(t1 - t0 for t0, t1 in windows)
+    return span <= max_span_ratio * total
+
+
+RENDERERS = {
+    "ffmpeg": render_clip_ffmpeg,
+    "moviepy": render_clip_moviepy,
+}
+
+
+def render_clip(filepath, out_path, thumb_path, t0, t1, crop_width, crop_height,
+                backend=RENDER_BACKEND, **options):
+    """Render one vertical clip and its thumbnail with the selected backend."""
+    try:
+        renderer = RENDERERS[backend]
+    except KeyError:
+        raise ValueError(f"Unknown render backend: {backend!r} (expected one of {', '.join(RENDERERS)})")
+    return renderer(filepath, out_path, thumb_path, t0, t1, crop_width, crop_height, **options)
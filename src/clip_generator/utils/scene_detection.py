@@ -1,9 +1,22 @@
+import hashlib
+import json
+import os
+from tempfile import NamedTemporaryFile
+
 import ffmpeg
 
-from scenedetect import VideoManager, SceneManager
+from scenedetect import open_video, SceneManager
 from scenedetect.detectors import AdaptiveDetector, ContentDetector, HashDetector
 import math
 
+from clip_generator.config import (
+    SCENE_BACKEND,
+    SCENE_DETECT_FAST,
+    SCENE_DOWNSCALE,
+    SCENE_FRAME_SKIP,
+    SCENE_INDEX_DIR,
+)
+
 def detect_scenes(input_path):
     out, _ = (
         ffmpeg
@@ -17,45 +30,84 @@ def detect_scenes(input_path):
 
 
 def detect_scenes_pyscenedetect(input_path, threshold=30.0):
-    video_manager = VideoManager([input_path])
+    video = open_video(input_path, backend=SCENE_BACKEND)
     scene_manager = SceneManager()
     scene_manager.add_detector(ContentDetector(threshold=threshold))
-    video_manager.start()
-    scene_manager.detect_scenes(frame_source=video_manager)
+    scene_manager.detect_scenes(video)
     scene_list = scene_manager.get_scene_list()
     # Return list of (start_time, end_time) tuples in seconds
     return [(start.get_seconds(), end.get_seconds()) for start, end in scene_list]
 
 
+def _scene_index_path(input_path, params):
+    """Index file for ``input_path`` detected with ``params``; changes when the file does."""
+    st = os.stat(input_path)
+    identity = {
+        "path": os.path.realpath(input_path),
+        "size": st.st_size,
+        "mtime_ns": st.st_mtime_ns,
+        **params,
+    }
+    digest = hashlib.sha256(json.dumps(identity, sort_keys=True).encode("utf-8")).hexdigest()
+    return os.path.join(SCENE_INDEX_DIR, f"{digest}.json")
 
 
-def detect_scenes_local(
+def detect_raw_scenes(
     input_path,
     content_thresh=27.0,
     adaptive_sensitivity=8.0,
-    # frame-based detection only needs a small debounce; we'll enforce seconds later
     min_scene_len=15,
-    min_duration=30.0,
-    max_duration=60.0
+    fast=SCENE_DETECT_FAST,
+    downscale=SCENE_DOWNSCALE,
+    frame_skip=SCENE_FRAME_SKIP,
 ):
-    # --- 1) Run the regular PySceneDetect pipeline ---
-    video_manager = VideoManager([input_path])
+    """
+    Shot boundaries of ``input_path`` as ``[(t0, t1), ...]`` in seconds.
+
+    Results are stored in a per-video index file, so repeated runs (and any
+    change to the post-processing) never decode the video again. In ``fast``
+    mode frames are downscaled by ``downscale`` (0 = automatic) and only one
+    in ``frame_skip + 1`` frames is analysed.
+    """
+    params = {
+        "content_thresh": content_thresh,
+        "adaptive_sensitivity": adaptive_sensitivity,
+        "min_scene_len": min_scene_len,
+        "fast": fast,
+        "downscale": downscale if fast else 0,
+        "frame_skip": frame_skip if fast else 0,
+    }
+    index_path = _scene_index_path(input_path, params)
+    if os.path.exists(index_path):
+        with open(index_path, encoding="utf-8") as f:
+            return [tuple(scene) for scene in json.load(f)["scenes"]]
+
+    video = open_video(input_path, backend=SCENE_BACKEND)
     scene_manager = SceneManager()
 
     scene_manager.add_detector(AdaptiveDetector(adaptive_sensitivity))
     scene_manager.add_detector(HashDetector())
     scene_manager.add_detector(ContentDetector(threshold=content_thresh,
                                               min_scene_len=min_scene_len))
+    if fast and downscale:
+        scene_manager.auto_downscale = False
+        scene_manager.downscale = downscale
 
-    video_manager.start()
-    scene_manager.detect_scenes(frame_source=video_manager)
-    raw_scenes = scene_manager.get_scene_list()
+    scene_manager.detect_scenes(video, frame_skip=params["frame_skip"])
+    # start_in_scene: a video without any cut is one long scene rather than none
+    raw_scenes = [(start.get_seconds(), end.get_seconds())
+                  for start, end in scene_manager.get_scene_list(start_in_scene=True)]
 
-    # --- 2) Post-process durations into just-right chunks ---
+    with NamedTemporaryFile("w", dir=SCENE_INDEX_DIR, suffix=".tmp", delete=False, encoding="utf-8") as f:
+        json.dump({"source": os.path.realpath(input_path), "params": params, "scenes": raw_scenes}, f)
+    os.replace(f.name, index_path)
+    return raw_scenes
+
+
+def split_scenes(raw_scenes, min_duration=30.0, max_duration=60.0):
+    """Post-process raw shots into clips of ``min_duration``..``max_duration`` seconds."""
     filtered = []
-    for start, end in raw_scenes:
-        t0 = start.get_seconds()
-        t1 = end.get_seconds()
+    for t0, t1 in raw_scenes:
         dur = t1 - t0
 
         # drop too-short scenes
@@ -79,3 +131,19 @@ def detect_scenes_local(
             filtered.append((t0, t1))
 
     return filtered
+
+
+def detect_scenes_local(
+    input_path,
+    content_thresh=27.0,
+    adaptive_sensitivity=8.0,
+    # frame-based detection only needs a small debounce; we'll enforce seconds later
+    min_scene_len=15,
+    min_duration=30.0,
+    max_duration=60.0
+):
+    # --- 1) Run (or reuse) the PySceneDetect pipeline ---
+    raw_scenes = detect_raw_scenes(input_path, content_thresh, adaptive_sensitivity, min_scene_len)
+
+    # --- 2) Post-process durations into just-right chunks ---
+    return split_scenes(raw_scenes, min_duration, max_duration)
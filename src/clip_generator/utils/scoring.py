@@ -0,0 +1,148 @@
+import re
+
+import numpy as np
+
+from clip_generator.config import CLIP_KEYWORDS, SCORE_WEIGHTS
+
+DEFAULT_WEIGHTS = {
+    "words_per_second": 1.0,
+    "loudness": 0.5,
+    "energy_peaks": 0.5,
+    "scene_cuts": 0.25,
+    "keywords": 1.0,
+}
+
+_NON_WORD = re.compile(r"[^\w']+")
+
+
+def _normalize_word(text):
+    return _NON_WORD.sub("", text.lower())
+
+
+def keyword_prefix(words, keywords):
+    """Prefix sum over ``words`` entries of keyword hits, aligned with ``words.cum_counts``."""
+    keywords = {_normalize_word(k) for k in keywords if _normalize_word(k)}
+    hits = np.array(
+        [sum(_normalize_word(token) in keywords for token in text.split()) for text in words.texts],
+        dtype=np.int64,
+    )
+    return np.concatenate(([0], np.cumsum(hits)))
+
+
+def window_features(t0, t1, words, speech=None, envelope=None, cuts=None, keywords=()):
+    """
+    Feature arrays for candidate windows ``[t0[i], t1[i]]``.
+
+    Every feature is computed for all windows at once from prefix sums and
+    ``searchsorted``, so the cost is O(n log n) for n candidates regardless
+    of window length:
+
+    - ``words_per_second`` from the ``WordIndex``;
+    - ``speech_ratio`` from the VAD ``SpeechMap`` (if given);
+    - ``loudness``: mean momentary loudness (LUFS) and ``energy_peaks``:
+      share of frames in the track's loudest 10%, from the ``AudioEnvelope``
+      (if given);
+    - ``scene_cuts``: shot changes per minute, from sorted cut times (if given);
+    - ``keywords``: keyword hits per minute.
+    """
+    t0 = np.asarray(t0, dtype=np.float64)
+    t1 = np.asarray(t1, dtype=np.float64)
+    duration = np.maximum(t1 - t0, 1e-9)
+    features = {
+        "word_count": words.word_count(t0, t1),
+        "words_per_second": words.density(t0, t1),
+    }
+
+    if speech is not None:
+        features["speech_ratio"] = speech.coverage(t0, t1) / duration
+
+    if envelope is not None and len(envelope):
+        db = envelope.loudness.astype(np.float64)
+        loud = db >= np.percentile(db, 90)
+        cum_db = np.concatenate(([0.0], np.cumsum(db)))
+        cum_loud = np.concatenate(([0], np.cumsum(loud)))
+        lo = np.clip((t0 / envelope.hop).astype(np.int64), 0, len(db))
+        hi = np.clip(np.ceil(t1 / envelope.hop).astype(np.int64), 0, len(db))
+        frames = np.maximum(hi - lo, 1)
+        features["loudness"] = (cum_db[hi] - cum_db[lo]) / frames
+        features["energy_peaks"] = (cum_loud[hi] - cum_loud[lo]) / frames
+
+    if cuts is not None:
+        cuts = np.sort(np.asarray(cuts, dtype=np.float64))
+        inside = np.searchsorted(cuts, t1, side="left") - np.searchsorted(cuts, t0, side="right")
+        features["scene_cuts"] = inside / duration * 60
+
+    if keywords:
+        cum_hits = keyword_prefix(words, keywords)
+        lo, hi = words.span(t0, t1)
+        features["keywords"] = (cum_hits[hi] - cum_hits[lo]) / duration * 60
+
+    return features
+
+
+def _standardize(values):
+    spread = values.std()
+    if not np.isfinite(spread) or spread < 1e-12:
+        return np.zeros_like(values, dtype=np.float64)
+    return (values - values.mean()) / spread
+
+
+def score_windows(features, weights=None):
+    """Weighted sum of standardized features; features without a weight are ignored."""
+    weights = weights if weights is not None else {**DEFAULT_WEIGHTS, **SCORE_WEIGHTS}
+    n = len(features["word_count"])
+    scores = np.zeros(n, dtype=np.float64)
+    for name, weight in weights.items():
+        if weight and name in features:
+            scores += weight * _standardize(np.asarray(features[name], dtype=np.float64))
+    return scores
+
+
+def suppress_overlaps(t0, t1, scores, k, eligible=None):
+    """
+    Greedy non-overlap suppression: indices of the top ``k`` windows by score
+    such that no two selected windows overlap.
+    """
+    t0 = np.asarray(t0, dtype=np.float64)
+    t1 = np.asarray(t1, dtype=np.float64)
+    order = np.argsort(-scores, kind="stable")
+    if eligible is not None:
+        order = order[eligible[order]]
+
+    chosen = []
+    chosen_t0 = np.empty(0)
+    chosen_t1 = np.empty(0)
+    for i in order:
+        if len(chosen) >= k:
+            break
+        if np.any((t0[i] < chosen_t1) & (chosen_t0 < t1[i])):
+            continue
+        chosen.append(int(i))
+        chosen_t0 = np.append(chosen_t0, t0[i])
+        chosen_t1 = np.append(chosen_t1, t1[i])
+    return chosen
+
+
+def rank_windows(windows, words, k, min_words=0, speech=None, min_speech_ratio=0.0,
+                 envelope=None, cuts=None, keywords=CLIP_KEYWORDS, weights=None):
+    """
+    Score candidate ``(t0, t1)`` windows and pick the best ``k`` non-overlapping ones.
+
+    Windows with fewer than ``min_words`` words or less than
+    ``min_speech_ratio`` speech are never picked. Returns
+    ``[(window_index, t0, t1, score), ...]`` best first.
+    """
+    if not windows:
+        return []
+    t0 = np.array([w[0] for w in windows], dtype=np.float64)
+    t1 = np.array([w[1] for w in windows], dtype=np.float64)
+
+    features = window_features(t0, t1, words, speech, envelope, cuts, keywords)
+    scores = score_windows(features, weights)
+
+    eligible = features["word_count"] >= min_words
+    if "speech_ratio" in features:
+        eligible &= features["speech_ratio"] >= min_speech_ratio
+
+    chosen = suppress_overlaps(t0, t1, scores, k, eligible)
+    return [(i, float(t0[i]), float(t1[i]), float(scores[i])) for i in chosen]
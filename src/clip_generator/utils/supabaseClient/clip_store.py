@@ -0,0 +1,213 @@
+import os
+import queue
+import threading
+import time
+
+from postgrest.exceptions import APIError
+
+from clip_generator.config import CLIP_UPLOAD_QUEUE, STORAGE_UPLOAD_WORKERS
+from clip_generator.utils.supabaseClient.resumable_upload import UploadFailed, storage_uploader
+from clip_generator.utils.supabaseClient.supabase import supabase
+
+CLIP_BUCKET = "clips"
+THUMBNAIL_BUCKET = "thumbnails"
+# a clip row is identified by its project and file, so re-publishing (e.g. a
+# retried job) updates rows instead of duplicating them
+UPSERT_KEY = ("project_id", "file_url")
+
+
+# Postgres error for an ON CONFLICT target without a matching unique index
+NO_UNIQUE_INDEX = "42P10"
+
+
+class SupabaseClipRows:
+    """
+    Writes clip rows to the Supabase ``clips`` table. The upsert needs a
+    unique index on ``UPSERT_KEY``, added by
+    supabase/migrations/20261018000000_clips_project_file_unique.sql.
+    """
+
+    def __init__(self, client, table="clips"):
+        self.client = client
+        self.table = table
+
+    def upsert(self, rows):
+        try:
+            self.client.table(self.table).upsert(rows, on_conflict=",".join(UPSERT_KEY)).execute()
+        except APIError as e:
+            if e.code == NO_UNIQUE_INDEX:
+                raise RuntimeError(
+                    f"The {self.table} table has no unique index on ({', '.join(UPSERT_KEY)}); apply "
+                    "supabase/migrations/20261018000000_clips_project_file_unique.sql") from e
+            raise
+
+
+class LocalClipRows:
+    """In-memory stand-in for the ``clips`` table, for development and tests."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.rows = {}
+        self.calls = 0
+
+    def upsert(self, rows):
+        with self.lock:
+            self.calls += 1
+            for row in rows:
+                self.rows[tuple(row[k] for k in UPSERT_KEY)] = dict(row)
+
+
+class ClipPublisher:
+    """
+    Uploads a job's clips while the next ones are still rendering.
+
+    ``submit`` hands a rendered clip to ``workers`` upload threads through a
+    queue holding at most ``max_pending`` clips, so when uploads fall behind
+    the renderer blocks instead of piling up finished files. Leaving the
+    ``with`` block waits for the uploads and writes all rows in one upsert;
+    ``rows`` then holds what was written.
+
+    Clips are published all or nothing: once an upload fails, ``submit`` and
+    ``close`` raise ``UploadFailed`` and no rows are written, so the job
+    fails and is retried. If the renderer raises, queued clips are dropped,
+    nothing is written and the error propagates.
+    """
+
+    def __init__(self, store, project_id, max_pending=CLIP_UPLOAD_QUEUE, workers=STORAGE_UPLOAD_WORKERS):
+        self.store = store
+        self.project_id = project_id
+        self.pending = queue.Queue(maxsize=max(1, max_pending))
+        self.uploaded = []
+        self.errors = []
+        self.rows = []
+        self.blocked = 0.0  # seconds the renderer waited on a full queue
+        self._lock = threading.Lock()
+        self._abort = threading.Event()
+        self._threads = [threading.Thread(target=self._work, name=f"clip-upload-{n}", daemon=True)
+                         for n in range(max(1, workers))]
+        for thread in self._threads:
+            thread.start()
+
+    def _work(self):
+        while True:
+            clip = self.pending.get()
+            if clip is None:
+                return
+            if self._abort.is_set() or self.errors:
+                continue
+            try:
+                row = self.store.upload(self.project_id, clip)
+            except Exception as e:
+                print(f"❌ Uploading {clip['clip_path']} failed: {e}")
+                with self._lock:
+                    self.errors.append(f"{clip['clip_path']}: {e}")
+                continue
+            with self._lock:
+                self.uploaded.append(row)
+
+    def _check(self):
+        if self.errors:
+            raise UploadFailed(f"{len(self.errors)} clip upload(s) failed: {'; '.join(self.errors)}")
+
+    def submit(self, clip):
+        """Queue a rendered clip (see ``ClipStore.publish``), waiting while the queue is full."""
+        self._check()
+        started = time.perf_counter()
+        self.pending.put(clip)
+        self.blocked += time.perf_counter() - started
+
+    def _join(self):
+        for _ in self._threads:
+            self.pending.put(None)
+        for thread in self._threads:
+            thread.join()
+
+    def close(self):
+        """Wait for the queued uploads, then write their rows. Returns the rows."""
+        started = time.perf_counter()
+        self._join()
+        print(f"Uploads finished {time.perf_counter() - started:.1f}s after the last render "
+              f"(renderer waited {self.blocked:.1f}s on uploads)")
+        self._check()
+        self.rows = self.store.save_rows(sorted(self.uploaded, key=lambda row: row["file_url"]))
+        return self.rows
+
+    def abort(self):
+        """Drop the clips still queued and wait for uploads in progress; writes nothing."""
+        self._abort.set()
+        self._join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+
+class ClipStore:
+    """
+    Publishes a job's rendered clips: each clip and its thumbnail are
+    uploaded through ``uploader`` (``ResumableUploader``, one pooled HTTP/2
+    client, objects overwritten on retry) on ``workers`` threads, and all
+    rows are written with one bulk upsert. ``publisher`` does this while
+    clips are still rendering.
+    """
+
+    def __init__(self, uploader, rows, workers=STORAGE_UPLOAD_WORKERS):
+        self.uploader = uploader
+        self.rows = rows
+        self.workers = max(1, workers)
+
+    @staticmethod
+    def object_names(project_id, clip_path, thumbnail_path):
+        return (f"{project_id}/{os.path.basename(clip_path)}",
+                f"{project_id}/{os.path.basename(thumbnail_path)}")
+
+    @staticmethod
+    def row(project_id, clip_name, thumbnail_name, transcript, start, end):
+        return {
+            "project_id": project_id,
+            "file_url": clip_name,
+            "thumbnail_url": thumbnail_name,
+            "transcript": transcript,
+            "start_time": start,
+            "end_time": end,
+        }
+
+    def upload(self, project_id, clip):
+        """Upload one rendered clip and its thumbnail; returns its row (not yet written)."""
+        clip_name, thumbnail_name = self.object_names(project_id, clip["clip_path"], clip["thumbnail_path"])
+        self.uploader.upload_file(clip["clip_path"], CLIP_BUCKET, clip_name, upsert=True)
+        self.uploader.upload_file(clip["thumbnail_path"], THUMBNAIL_BUCKET, thumbnail_name,
+                                  content_type="image/jpeg", upsert=True)
+        return self.row(project_id, clip_name, thumbnail_name, clip["transcript"],
+                        clip["start_time"], clip["end_time"])
+
+    def save_rows(self, rows):
+        if rows:
+            self.rows.upsert(rows)
+            print(f"✅ Saved {len(rows)} clip rows")
+        return rows
+
+    def publisher(self, project_id, max_pending=CLIP_UPLOAD_QUEUE):
+        """A ``ClipPublisher`` for ``project_id``'s clips as they finish rendering."""
+        return ClipPublisher(self, project_id, max_pending, self.workers)
+
+    def publish(self, project_id, clips):
+        """
+        Upload and record already rendered ``clips``: dicts with
+        ``clip_path``, ``thumbnail_path``, ``transcript``, ``start_time`` and
+        ``end_time``. Returns the rows written; raises ``UploadFailed`` (and
+        writes nothing) if any upload fails.
+        """
+        with self.publisher(project_id, max_pending=len(clips)) as publisher:
+            for clip in clips:
+                publisher.submit(clip)
+        return publisher.rows
+
+
+clip_store = ClipStore(storage_uploader, SupabaseClipRows(supabase)) if storage_uploader and supabase else None
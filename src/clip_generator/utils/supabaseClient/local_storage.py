@@ -0,0 +1,112 @@
+"""
+Local stand-in for Supabase Storage's TUS upload and public object endpoints.
+
+For development and tests only; objects are kept in memory.
+
+    uvicorn clip_generator.utils.supabaseClient.local_storage:app --port 54321
+    SUPABASE_URL=http://127.0.0.1:54321 SUPABASE_KEY=dev ...
+
+Tests can drive it in-process with ``starlette.testclient.TestClient`` and
+inject failures through ``LocalStorage.fail_patches``.
+"""
+import base64
+import threading
+import uuid
+
+from fastapi import FastAPI, Request, Response
+
+TUS_HEADERS = {"Tus-Resumable": "1.0.0"}
+
+
+def _parse_metadata(header):
+    fields = {}
+    for item in filter(None, (part.strip() for part in header.split(","))):
+        name, _, value = item.partition(" ")
+        fields[name] = base64.b64decode(value).decode() if value else ""
+    return fields
+
+
+class LocalStorage:
+    """
+    In-memory buckets plus in-progress uploads.
+
+    ``fail_patches`` makes the next N PATCH requests fail with 503 after
+    storing only the first half of their body, like a connection dropped
+    mid-part.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.uploads = {}
+        self.objects = {}
+        self.fail_patches = 0
+        self.patches = 0
+
+
+def create_app(storage=None):
+    storage = storage or LocalStorage()
+    app = FastAPI(title="Local storage stand-in")
+    app.state.storage = storage
+
+    @app.post("/storage/v1/upload/resumable")
+    async def create_upload(request: Request):
+        meta = _parse_metadata(request.headers.get("upload-metadata", ""))
+        key = (meta.get("bucketName"), meta.get("objectName"))
+        if None in key:
+            return Response("bucketName and objectName are required", 400, TUS_HEADERS)
+        if key in storage.objects and request.headers.get("x-upsert") != "true":
+            return Response("The resource already exists", 409, TUS_HEADERS)
+        upload_id = uuid.uuid4().hex
+        length = int(request.headers["upload-length"])
+        with storage.lock:
+            storage.uploads[upload_id] = {"key": key, "length": length, "data": bytearray()}
+            if length == 0:
+                storage.objects[key] = b""
+        location = f"{str(request.base_url).rstrip('/')}/storage/v1/upload/resumable/{upload_id}"
+        return Response(status_code=201, headers={**TUS_HEADERS, "Location": location})
+
+    @app.head("/storage/v1/upload/resumable/{upload_id}")
+    async def upload_offset(upload_id: str):
+        upload = storage.uploads.get(upload_id)
+        if upload is None:
+            return Response(status_code=404, headers=TUS_HEADERS)
+        return Response(status_code=200, headers={
+            **TUS_HEADERS,
+            "Upload-Offset": str(len(upload["data"])),
+            "Upload-Length": str(upload["length"]),
+            "Cache-Control": "no-store",
+        })
+
+    @app.patch("/storage/v1/upload/resumable/{upload_id}")
+    async def append(upload_id: str, request: Request):
+        upload = storage.uploads.get(upload_id)
+        if upload is None:
+            return Response(status_code=404, headers=TUS_HEADERS)
+        body = await request.body()
+        with storage.lock:
+            storage.patches += 1
+            if int(request.headers["upload-offset"]) != len(upload["data"]):
+                return Response("Offset mismatch", 409, TUS_HEADERS)
+            if len(upload["data"]) + len(body) > upload["length"]:
+                return Response("Upload exceeds Upload-Length", 413, TUS_HEADERS)
+            if storage.fail_patches > 0:
+                storage.fail_patches -= 1
+                upload["data"] += body[:len(body) // 2]
+                return Response("Injected failure", 503, TUS_HEADERS)
+            upload["data"] += body
+            if len(upload["data"]) == upload["length"]:
+                storage.objects[upload["key"]] = bytes(upload["data"])
+            offset = len(upload["data"])
+        return Response(status_code=204, headers={**TUS_HEADERS, "Upload-Offset": str(offset)})
+
+    @app.get("/storage/v1/object/public/{bucket}/{object_name:path}")
+    async def public_object(bucket: str, object_name: str):
+        data = storage.objects.get((bucket, object_name))
+        if data is None:
+            return Response(status_code=404)
+        return Response(data, media_type="application/octet-stream")
+
+    return app
+
+
+app = create_app()
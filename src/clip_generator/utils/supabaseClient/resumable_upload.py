@@ -0,0 +1,170 @@
+import base64
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+
+from clip_generator.config import (STORAGE_BUFFERED_PARTS, STORAGE_PART_MB, STORAGE_UPLOAD_RETRIES,
+                                   STORAGE_UPLOAD_WORKERS)
+from clip_generator.utils.supabaseClient.supabase import key, url
+
+TUS_VERSION = "1.0.0"
+RETRYABLE_STATUS = {408, 409, 423, 429, 500, 502, 503, 504}
+
+
+class UploadFailed(RuntimeError):
+    pass
+
+
+def _metadata(**fields):
+    return ",".join(f"{k} {base64.b64encode(str(v).encode()).decode()}" for k, v in fields.items())
+
+
+class ResumableUploader:
+    """
+    Streams files to Supabase Storage through its TUS resumable endpoint.
+
+    A reader thread fills a queue of at most ``buffered_parts`` parts, so
+    memory stays bounded (~``(buffered_parts + 1) * part_size``) and disk
+    reads overlap the network. TUS appends parts strictly in order, so the
+    parts of one file are sent one after another over a pooled keep-alive
+    (HTTP/2) client; ``upload_files`` sends several files in parallel over
+    the same pool. A failed part is retried with backoff after asking the
+    server how much of it arrived (``HEAD``), and resumes from there.
+    """
+
+    def __init__(self, base_url, api_key, part_size=STORAGE_PART_MB * 1024 * 1024,
+                 buffered_parts=STORAGE_BUFFERED_PARTS, retries=STORAGE_UPLOAD_RETRIES,
+                 backoff=0.5, client=None):
+        self.base_url = base_url.rstrip("/")
+        self.endpoint = f"{self.base_url}/storage/v1/upload/resumable"
+        self.part_size = part_size
+        self.buffered_parts = max(1, buffered_parts)
+        self.retries = retries
+        self.backoff = backoff
+        self.client = client or httpx.Client(
+            http2=True,
+            timeout=httpx.Timeout(120.0, connect=10.0),
+            limits=httpx.Limits(max_connections=16, max_keepalive_connections=16),
+        )
+        self.headers = {"Tus-Resumable": TUS_VERSION}
+        if api_key:
+            self.headers |= {"authorization": f"Bearer {api_key}", "apikey": api_key}
+
+    def public_url(self, bucket, object_name):
+        return f"{self.base_url}/storage/v1/object/public/{bucket}/{object_name}"
+
+    def _request(self, method, target, retry_status=RETRYABLE_STATUS, **kwargs):
+        """Send one request, retrying transport errors and ``retry_status`` responses."""
+        for attempt in range(self.retries + 1):
+            try:
+                response = self.client.request(method, target, **kwargs)
+                if response.status_code not in retry_status:
+                    return response
+                error = f"HTTP {response.status_code}: {response.text[:200]}"
+            except httpx.TransportError as e:
+                error = f"{type(e).__name__}: {e}"
+            if attempt < self.retries:
+                time.sleep(self.backoff * 2 ** attempt)
+        raise UploadFailed(f"{method} {target} failed after {self.retries + 1} attempts ({error})")
+
+    def _create(self, bucket, object_name, size, content_type, upsert):
+        # 409 here means the object exists (and upsert is off): not worth retrying
+        response = self._request("POST", self.endpoint, RETRYABLE_STATUS - {409}, headers={
+            **self.headers,
+            "Upload-Length": str(size),
+            "Upload-Metadata": _metadata(bucketName=bucket, objectName=object_name,
+                                         contentType=content_type, cacheControl=3600),
+            "x-upsert": "true" if upsert else "false",
+        })
+        if response.status_code != 201 or "location" not in response.headers:
+            raise UploadFailed(f"Could not create upload for {bucket}/{object_name}: "
+                               f"HTTP {response.status_code} {response.text[:200]}")
+        return response.headers["location"]
+
+    def _server_offset(self, location):
+        response = self._request("HEAD", location, headers=self.headers)
+        if response.status_code != 200:
+            raise UploadFailed(f"Upload {location} is gone: HTTP {response.status_code}")
+        return int(response.headers["upload-offset"])
+
+    def _send_part(self, location, offset, data):
+        """PATCH ``data`` at ``offset``, resyncing with the server after each failure."""
+        end = offset + len(data)
+        sent = offset
+        for attempt in range(self.retries + 1):
+            try:
+                response = self.client.patch(location, content=data[sent - offset:], headers={
+                    **self.headers,
+                    "Upload-Offset": str(sent),
+                    "Content-Type": "application/offset+octet-stream",
+                })
+                if response.status_code == 204:
+                    return
+                if response.status_code not in RETRYABLE_STATUS:
+                    raise UploadFailed(f"Part at {sent} rejected: HTTP {response.status_code} {response.text[:200]}")
+                error = f"HTTP {response.status_code}"
+            except httpx.TransportError as e:
+                error = f"{type(e).__name__}: {e}"
+            if attempt == self.retries:
+                break
+            time.sleep(self.backoff * 2 ** attempt)
+            sent = self._server_offset(location)
+            if sent >= end:
+                return
+            if sent < offset:
+                raise UploadFailed(f"Server offset {sent} is behind part start {offset}")
+        raise UploadFailed(f"Part at {offset} failed after {self.retries + 1} attempts ({error})")
+
+    def _read_parts(self, path, parts, stop):
+        try:
+            with open(path, "rb") as f:
+                offset = 0
+                while not stop.is_set():
+                    data = f.read(self.part_size)
+                    if not data:
+                        break
+                    parts.put((offset, data))
+                    offset += len(data)
+            parts.put(None)
+        except BaseException as e:
+            parts.put(e)
+
+    def upload_file(self, path, bucket, object_name, content_type="video/mp4", upsert=False):
+        """Stream ``path`` to ``bucket/object_name``; returns the object's public URL."""
+        size = os.path.getsize(path)
+        location = self._create(bucket, object_name, size, content_type, upsert)
+
+        parts = queue.Queue(maxsize=self.buffered_parts)
+        stop = threading.Event()
+        reader = threading.Thread(target=self._read_parts, args=(path, parts, stop), daemon=True)
+        reader.start()
+        try:
+            while True:
+                item = parts.get()
+                if item is None:
+                    break
+                if isinstance(item, BaseException):
+                    raise item
+                self._send_part(location, *item)
+        finally:
+            stop.set()
+            while reader.is_alive():  # unblock the reader if it is waiting on a full queue
+                try:
+                    parts.get_nowait()
+                except queue.Empty:
+                    reader.join(0.05)
+        return self.public_url(bucket, object_name)
+
+    def upload_files(self, items, workers=STORAGE_UPLOAD_WORKERS, **options):
+        """Upload ``(path, bucket, object_name)`` items in parallel; returns their URLs in order."""
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            futures = [pool.submit(self.upload_file, path, bucket, name, **options)
+                       for path, bucket, name in items]
+            return [future.result() for future in futures]
+
+
+storage_uploader = ResumableUploader(url, key) if url and key else None
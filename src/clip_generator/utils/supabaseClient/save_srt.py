@@ -1,4 +1,3 @@
-import os
 from clip_generator.utils.supabaseClient.supabase import supabase
 
 def save_srt_to_supabase(project_id: str, profile_id: str, srt_content: str) -> str:
@@ -15,41 +14,29 @@ def save_srt_to_supabase(project_id: str, profile_id: str, srt_content: str) ->
     """
     srt_filename = f"{profile_id}/{project_id}.srt"
     bucket_name = "transcripts"
-    temp_file_path = f"/tmp/{project_id}.srt"  # Save the SRT file temporarily
 
-    try:
-        # Generate a signed upload URL
-               # Generate a signed upload URL
-        signed_upload_url = supabase.storage.from_(bucket_name).create_signed_upload_url(srt_filename)
-        print(f"🔐 Signed Upload URL Response: {signed_upload_url}")
-        
-        # Extract the token
-        signed_token = signed_upload_url.get("token")
-        if not signed_token:
-            raise ValueError("Failed to retrieve the token from the signed upload URL response.")
-        
-        print(f"🔐 Signed Token: {signed_token}")
+    # Generate a signed upload URL
+    signed_upload_url = supabase.storage.from_(bucket_name).create_signed_upload_url(srt_filename)
+    print(f"🔐 Signed Upload URL Response: {signed_upload_url}")
 
-        # Write the SRT content to a temporary file
-        with open(temp_file_path, "w", encoding="utf-8") as temp_file:
-            temp_file.write(srt_content)
+    # Extract the token
+    signed_token = signed_upload_url.get("token")
+    if not signed_token:
+        raise ValueError("Failed to retrieve the token from the signed upload URL response.")
 
-        # Open the temporary file in binary mode and upload it to Supabase
-        with open(temp_file_path, "rb") as file:
-            response = supabase.storage.from_(bucket_name).upload_to_signed_url(
-                path=srt_filename,
-                file=file,
-                token=signed_token
-            )
-        print(f"🔐 Upload Response: {response}")
-        # Check the response status
-        if response:
-            print("✅ SRT file successfully uploaded to Supabase.")
-            return f"{bucket_name}/{srt_filename}"
-        else:
-            print(f"❌ Failed to upload SRT file to Supabase: {response.json()}")
-            return ""
-    finally:
-        # Clean up the temporary file
-        if os.path.exists(temp_file_path):
-            os.remove(temp_file_path)
\ No newline at end of file
+    print(f"🔐 Signed Token: {signed_token}")
+
+    # Upload the SRT straight from memory, so concurrent jobs share no temp file
+    response = supabase.storage.from_(bucket_name).upload_to_signed_url(
+        path=srt_filename,
+        file=srt_content.encode("utf-8"),
+        token=signed_token
+    )
+    print(f"🔐 Upload Response: {response}")
+    # Check the response status
+    if response:
+        print("✅ SRT file successfully uploaded to Supabase.")
+        return f"{bucket_name}/{srt_filename}"
+    else:
+        print(f"❌ Failed to upload SRT file to Supabase: {response.json()}")
+        return ""
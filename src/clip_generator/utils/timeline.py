@@ -0,0 +1,154 @@
+import json
+import math
+
+import numpy as np
+
+
+def normalize_ranges(start=None, end=None, ranges=None):
+    """
+    Turn a request's ``start``/``end`` and/or ``ranges`` (``[(start, end), ...]``
+    in seconds of the original VOD; an end of None means "to the end") into
+    sorted, merged ``(start, end)`` tuples. Returns None when the whole VOD
+    is wanted.
+    """
+    wanted = list(ranges or [])
+    if start is not None or end is not None:
+        wanted.append((start, end))
+    if not wanted:
+        return None
+
+    cleaned = []
+    for s, e in wanted:
+        s = float(s or 0.0)
+        e = math.inf if e is None else float(e)
+        if s < 0 or e <= s:
+            raise ValueError(f"Invalid time range {s:g}-{e:g}")
+        cleaned.append((s, e))
+    cleaned.sort()
+
+    merged = [cleaned[0]]
+    for s, e in cleaned[1:]:
+        if s <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], e))
+        else:
+            merged.append((s, e))
+    return merged
+
+
+def range_tag(ranges):
+    """Filename suffix that tells partial downloads of the same VOD apart ("" for the whole VOD)."""
+    if not ranges:
+        return ""
+    return "_" + "_".join(f"{s:g}-{e:g}" for s, e in ranges)
+
+
+def overlapping_segments(segments, ranges):
+    """HLS segments (see utils/hls_download.py) that overlap any of ``ranges``, in order."""
+    return [segment for segment in segments
+            if any(segment.start < e and segment.start + segment.duration > s for s, e in ranges)]
+
+
+class Timeline:
+    """
+    Maps times in a partially downloaded file back to the original VOD.
+
+    The file is a concatenation of ``pieces`` of the source, each given as
+    ``(local_start, source_start)`` in file order; a piece runs until the
+    next one starts. Stored next to the video as ``<file>.timeline.json``
+    so a cached partial download keeps its mapping.
+    """
+
+    def __init__(self, pieces):
+        self.pieces = [tuple(float(x) for x in piece) for piece in pieces]
+        if not self.pieces:
+            raise ValueError("A timeline needs at least one piece")
+        self._local = np.array([piece[0] for piece in self.pieces])
+        self._source = np.array([piece[1] for piece in self.pieces])
+
+    @classmethod
+    def from_ranges(cls, ranges):
+        """Timeline of a file holding exactly ``ranges`` of the source, back to back."""
+        pieces, local = [], 0.0
+        for s, e in ranges:
+            pieces.append((local, s))
+            local += e - s
+        return cls(pieces)
+
+    @classmethod
+    def from_segments(cls, segments):
+        """Timeline of a file holding ``segments`` (in order); consecutive segments form one piece."""
+        pieces, local, last = [], 0.0, None
+        for segment in segments:
+            if last is None or segment.index != last + 1:
+                pieces.append((local, segment.start))
+            local += segment.duration
+            last = segment.index
+        return cls(pieces)
+
+    @property
+    def boundaries(self):
+        """File times where one piece ends and the next begins (jumps in the source)."""
+        return self._local[1:]
+
+    def to_source(self, t, end=False):
+        """
+        Original-VOD time of ``t`` seconds into the file (scalar or array).
+
+        A time exactly on a boundary maps to the start of the next piece, or,
+        with ``end``, to the end of the previous one (use it for the ends of
+        spans).
+        """
+        t = np.asarray(t, dtype=float)
+        side = "left" if end else "right"
+        i = np.clip(np.searchsorted(self._local, t, side=side) - 1, 0, len(self.pieces) - 1)
+        source = self._source[i] + (t - self._local[i])
+        return float(source) if source.ndim == 0 else source
+
+    def split_windows(self, windows, min_len=0.0):
+        """
+        Cut ``(t0, t1)`` file windows at piece boundaries so none spans a jump
+        in the source (a clip across one would splice unrelated moments).
+        Pieces of a cut window shorter than ``min_len`` seconds are dropped;
+        windows that cross no boundary are kept as they are.
+        """
+        out = []
+        for t0, t1 in windows:
+            inner = self.boundaries[(self.boundaries > t0) & (self.boundaries < t1)]
+            if len(inner) == 0:
+                out.append((t0, t1))
+                continue
+            edges = [t0, *(float(b) for b in inner), t1]
+            out.extend((a, b) for a, b in zip(edges[:-1], edges[1:]) if b - a >= min_len)
+        return list(dict.fromkeys(out))
+
+    def map_segments(self, segments):
+        """Copies of transcript ``segments`` with ``start``/``end`` in original-VOD time."""
+        if not segments:
+            return segments
+        starts = self.to_source([seg["start"] for seg in segments])
+        ends = self.to_source([seg["end"] for seg in segments], end=True)
+        return [{**seg, "start": float(s), "end": float(e)} for seg, s, e in zip(segments, starts, ends)]
+
+    def to_list(self):
+        return [list(piece) for piece in self.pieces]
+
+    @classmethod
+    def from_list(cls, pieces):
+        return cls(pieces) if pieces else None
+
+    @staticmethod
+    def sidecar(path):
+        return f"{path}.timeline.json"
+
+    def save(self, path):
+        with open(self.sidecar(path), "w") as f:
+            json.dump(self.to_list(), f)
+
+    @classmethod
+    def load(cls, path):
+        """The timeline saved next to ``path``, or None (a full download needs no mapping)."""
+        try:
+            with open(cls.sidecar(path)) as f:
+                return cls.from_list(json.load(f))
+        except (OSError, ValueError):
+            return None
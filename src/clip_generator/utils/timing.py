@@ -0,0 +1,76 @@
+import threading
+import time
+from contextlib import contextmanager
+
+
+class StageTimer:
+    """
+    Records wall-clock spans of named pipeline stages, possibly running concurrently.
+
+    ``summary()`` reports each stage's duration, the job's wall time, and how
+    many seconds of stage work overlapped (sum of stages minus their union).
+    An optional ``listener(name, event)`` is told when each stage starts and
+    ends (``event`` is ``"start"`` or ``"end"``); an exception raised on
+    ``"start"`` aborts the stage before it runs.
+    """
+
+    def __init__(self, listener=None):
+        self._lock = threading.Lock()
+        self._spans = {}
+        self._listener = listener
+
+    def _notify(self, name, event):
+        if self._listener is not None:
+            self._listener(name, event)
+
+    @contextmanager
+    def stage(self, name):
+        self._notify(name, "start")
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._spans[name] = (started, time.perf_counter())
+            self._notify(name, "end")
+
+    def track(self, name, future):
+        """Time ``future`` (e.g. work running in another process) from now until it completes."""
+        self._notify(name, "start")
+        started = time.perf_counter()
+
+        def done(_):
+            with self._lock:
+                self._spans[name] = (started, time.perf_counter())
+            self._notify(name, "end")
+
+        future.add_done_callback(done)
+        return future
+
+    def summary(self):
+        with self._lock:
+            spans = dict(self._spans)
+        if not spans:
+            return {"stages": {}, "wall_seconds": 0.0, "overlap_seconds": 0.0}
+
+        union = 0.0
+        cur_start, cur_end = None, None
+        for start, end in sorted(spans.values()):
+            if cur_end is None or start > cur_end:
+                if cur_end is not None:
+                    union += cur_end - cur_start
+                cur_start, cur_end = start, end
+            else:
+                cur_end = max(cur_end, end)
+        union += cur_end - cur_start
+
+        first = min(start for start, _ in spans.values())
+        total = sum(end - start for start, end in spans.values())
+        return {
+            "stages": {
+                name: {"start": round(start - first, 2), "seconds": round(end - start, 2)}
+                for name, (start, end) in sorted(spans.items(), key=lambda item: item[1])
+            },
+            "wall_seconds": round(max(end for _, end in spans.values()) - first, 2),
+            "overlap_seconds": round(total - union, 2),
+        }
@@ -0,0 +1,170 @@
+import hashlib
+import json
+import os
+import threading
+from contextlib import contextmanager
+from tempfile import NamedTemporaryFile
+
+import numpy as np
+
+from clip_generator.config import TRANSCRIPT_CACHE_DIR, TRANSCRIPT_CACHE_MAX_MB
+from clip_generator.utils.audio import audio_stream_hash
+from clip_generator.utils.envelope import AudioEnvelope
+from clip_generator.utils.file_lock import exclusive_lock
+
+
+class TranscriptCache:
+    """
+    On-disk, content-addressed cache of word-level transcripts.
+
+    Entries are keyed by the hash of the source's audio stream plus the model
+    settings that produced them, and stored as compressed columnar NumPy
+    archives (start, end, UTF-8 text blob + offsets). The audio envelope of
+    the same source is kept alongside under its own key. File mtimes double
+    as the LRU clock, so several processes can share one cache directory;
+    ``single_flight`` lets them agree on who computes a missing entry.
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._source_hashes = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def audio_hash(self, video_path):
+        """Content hash of ``video_path``'s audio, memoised per (path, size, mtime)."""
+        st = os.stat(video_path)
+        identity = (os.path.realpath(video_path), st.st_size, st.st_mtime_ns)
+        with self._lock:
+            if identity in self._source_hashes:
+                return self._source_hashes[identity]
+        digest = audio_stream_hash(video_path)
+        if digest:
+            with self._lock:
+                self._source_hashes[identity] = digest
+        return digest
+
+    @staticmethod
+    def make_key(audio_hash, **params):
+        """Cache key for ``audio_hash`` transcribed with the given model settings."""
+        payload = json.dumps({"audio": audio_hash, **params}, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    @contextmanager
+    def single_flight(self, key):
+        """
+        Hold the lock for ``key`` (across processes). A job that finds an
+        entry missing computes it under the lock; a concurrent job for the
+        same key waits, then reads the entry instead of computing it again.
+        The lock file is removed once released.
+        """
+        with exclusive_lock(os.path.join(self.directory, f"{key}.lock")):
+            yield
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.npz")
+
+    def get(self, key):
+        """Return the cached word list for ``key``, or None on a miss."""
+        path = self._path(key)
+        try:
+            with np.load(path) as data:
+                starts, ends = data["start"], data["end"]
+                blob, offsets = data["text"].tobytes(), data["offsets"]
+            os.utime(path)  # mark as recently used
+        except (OSError, KeyError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return [
+            {
+                "start": float(starts[i]),
+                "end": float(ends[i]),
+                "text": blob[offsets[i]:offsets[i + 1]].decode("utf-8"),
+            }
+            for i in range(len(starts))
+        ]
+
+    def _write(self, key, **arrays):
+        # Write to a temp file and rename so readers never see a partial entry.
+        tmp = NamedTemporaryFile(dir=self.directory, suffix=".tmp", delete=False)
+        try:
+            with tmp:
+                np.savez_compressed(tmp, **arrays)
+            os.replace(tmp.name, self._path(key))
+        finally:
+            if os.path.exists(tmp.name):
+                os.remove(tmp.name)
+        self.evict()
+
+    def put(self, key, words):
+        """Store ``words`` under ``key`` and evict old entries if over budget."""
+        encoded = [w["text"].encode("utf-8") for w in words]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+
+        self._write(
+            key,
+            start=np.array([w["start"] for w in words], dtype=np.float64),
+            end=np.array([w["end"] for w in words], dtype=np.float64),
+            text=np.frombuffer(b"".join(encoded), dtype=np.uint8),
+            offsets=offsets,
+        )
+
+    def get_envelope(self, key):
+        """Return the cached ``AudioEnvelope`` for ``key``, or None on a miss."""
+        path = self._path(key)
+        try:
+            with np.load(path) as data:
+                envelope = AudioEnvelope(data["envelope"], float(data["hop"]))
+            os.utime(path)
+        except (OSError, KeyError, ValueError):
+            return None
+        return envelope
+
+    def put_envelope(self, key, envelope):
+        self._write(key, envelope=envelope.data, hop=np.float64(envelope.hop))
+
+    def evict(self):
+        """Delete least-recently-used entries until the cache fits ``max_bytes``."""
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".npz"):
+                continue
+            try:
+                st = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, name))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            total -= size
+            with self._lock:
+                self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "max_mb": round(self.max_bytes / (1024 * 1024), 1),
+            }
+
+
+transcript_cache = TranscriptCache(TRANSCRIPT_CACHE_DIR, TRANSCRIPT_CACHE_MAX_MB * 1024 * 1024)
@@ -1,52 +1,251 @@
-import os
-from tempfile import NamedTemporaryFile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
-from faster_whisper import WhisperModel
-from moviepy.video.io.VideoFileClip import VideoFileClip
+import numpy as np
 
+from clip_generator.config import TRANSCRIBE_WORKERS, WHISPER_LANGUAGE
+from clip_generator.utils.audio import SAMPLE_RATE, stream_pcm
 from clip_generator.utils.supabaseClient.save_srt import save_srt_to_supabase
 from clip_generator.utils.convertto_srt import convert_to_srt
 from clip_generator.utils.supabaseClient.supabase import supabase
+from clip_generator.utils.whisper_pool import whisper_pool
 
+CHUNK_OVERLAP = 1.0  # seconds of extra audio on each side of a chunk
+SILENCE_SEARCH = 5.0  # seconds either side of a chunk boundary to look for a quiet cut
+STREAM_BLOCK_SECONDS = 10.0  # PCM read from FFmpeg at a time
 
-def transcribe_audio(video_path: str, project_id: str, profile_id: str, chunk_size: float) -> str:
-    """Transcribe audio from a video file and store the transcript on Supabase."""
-    model = WhisperModel("base", device="cpu")
+
+def overlapping_windows(blocks, chunk_size: float, overlap: float, sample_rate: int = SAMPLE_RATE):
+    """
+    Regroup a stream of PCM blocks into ``chunk_size`` windows padded by ``overlap``.
+
+    Yields ``(owned_start, owned_end, audio_offset, samples)``. Each window
+    "owns" ``[owned_start, owned_end)`` seconds of the timeline; ``samples``
+    additionally covers up to ``overlap`` seconds on either side so that words
+    crossing a boundary are heard in full. ``audio_offset`` is the timeline
+    position of ``samples[0]``.
+    """
+    chunk = max(1, int(chunk_size * sample_rate))
+    pad = max(0, int(overlap * sample_rate))
+    buf = np.empty(0, dtype=np.float32)
+    buf_start = 0  # sample index of buf[0]
+    owned = 0  # sample index where the next window's owned region begins
+
+    def window(hi):
+        lo = max(owned - pad, buf_start)
+        return (owned / sample_rate, (owned + chunk) / sample_rate,
+                lo / sample_rate, buf[lo - buf_start:hi - buf_start])
+
+    for block in blocks:
+        buf = np.concatenate((buf, block))
+        while buf_start + len(buf) >= owned + chunk + pad:
+            yield window(owned + chunk + pad)
+            owned += chunk
+            drop = max(0, owned - pad - buf_start)
+            buf = buf[drop:]
+            buf_start += drop
+
+    while owned < buf_start + len(buf):
+        yield window(buf_start + len(buf))
+        owned += chunk
+
+
+def chunk_windows(blocks, chunks, overlap: float, sample_rate: int = SAMPLE_RATE):
+    """
+    Cut planned ``chunks`` (``[(start, end), ...]`` seconds, sorted) out of a
+    stream of PCM blocks as it goes by.
+
+    Yields ``(owned_start, owned_end, audio_offset, samples)`` like
+    ``overlapping_windows``, each as soon as the stream has passed the chunk's
+    end plus ``overlap``. Audio before the next chunk is dropped as it
+    arrives, so only the audio the chunk being cut needs is ever held, and
+    decoding stops after the last chunk.
+    """
+    pad = max(0, int(overlap * sample_rate))
+    spans = [(max(0, int(start * sample_rate) - pad), int(end * sample_rate) + pad) for start, end in chunks]
+    buf = np.empty(0, dtype=np.float32)
+    buf_start = 0  # sample index of buf[0]
+    i = 0  # next chunk to yield
+
+    def window(hi):
+        lo = spans[i][0]
+        return (chunks[i][0], chunks[i][1], lo / sample_rate, buf[lo - buf_start:hi - buf_start])
+
+    for block in blocks:
+        buf = np.concatenate((buf, block))
+        buf_end = buf_start + len(buf)
+        while i < len(spans) and spans[i][1] <= buf_end:
+            yield window(spans[i][1])
+            i += 1
+        if i == len(spans):
+            return
+        drop = max(0, min(spans[i][0], buf_end) - buf_start)
+        buf = buf[drop:]
+        buf_start += drop
+
+    # the stream ended inside (or before) the remaining chunks
+    buf_end = buf_start + len(buf)
+    while i < len(spans) and spans[i][0] < buf_end:
+        yield window(buf_end)
+        i += 1
+
+
+def transcribe_samples(model, samples: np.ndarray, audio_offset: float, owned_start: float, owned_end: float) -> list:
+    """
+    Transcribe one window of samples and return the words it owns.
+
+    Timestamps are shifted onto the source timeline; words whose start falls
+    outside ``[owned_start, owned_end)`` belong to a neighbouring window and are
+    dropped, which de-duplicates the overlap.
+    """
+    words = []
+    segments, _ = model.transcribe(samples, language=WHISPER_LANGUAGE, word_timestamps=True)
+    for segment in segments:
+        if segment.words:
+            entries = [(w.start, w.end, w.word) for w in segment.words]
+        else:
+            entries = [(segment.start, segment.end, segment.text)]
+        for start, end, text in entries:
+            start += audio_offset
+            if owned_start <= start < owned_end:
+                words.append({"start": start, "end": end + audio_offset, "text": text})
+    return words
+
+
+def plan_chunks(rms: np.ndarray, chunk_size: float, search: float = SILENCE_SEARCH,
+                frame_seconds: float = 0.1) -> list:
+    """
+    Split the timeline into roughly ``chunk_size`` pieces cut at quiet frames.
+
+    ``rms`` holds per-frame levels (e.g. ``AudioEnvelope.rms``). Each nominal
+    boundary is moved to the lowest-energy frame within ``search`` seconds of
+    it, so cuts land in pauses rather than mid-word. Returns
+    ``[(start, end), ...]`` in seconds covering the whole track.
+    """
+    duration = len(rms) * frame_seconds
+    if duration <= chunk_size:
+        return [(0.0, duration)] if duration > 0 else []
+
+    cuts = [0.0]
+    for target in np.arange(chunk_size, duration - search, chunk_size):
+        lo = max(int((target - search) / frame_seconds), int(cuts[-1] / frame_seconds) + 1)
+        hi = min(int((target + search) / frame_seconds) + 1, len(rms))
+        if lo >= hi:
+            continue
+        quietest = lo + int(np.argmin(rms[lo:hi]))
+        cuts.append((quietest + 0.5) * frame_seconds)
+    cuts.append(duration)
+    return list(zip(cuts[:-1], cuts[1:]))
+
+
+def plan_speech_chunks(speech, chunk_size: float, rms: np.ndarray, frame_seconds: float = 0.1) -> list:
+    """
+    Group VAD speech intervals into chunks of at most ~``chunk_size`` seconds.
+
+    Neighbouring intervals are packed together while they fit; a single
+    interval longer than ``chunk_size`` is split at quiet frames of ``rms``
+    with ``plan_chunks``. Silence between chunks is never sent to the model.
+    """
+    packed = []
+    for start, end in speech.intervals:
+        if packed and end - packed[-1][0] <= chunk_size:
+            packed[-1] = (packed[-1][0], end)
+        else:
+            packed.append((start, end))
+
+    chunks = []
+    for start, end in packed:
+        if end - start <= chunk_size:
+            chunks.append((start, end))
+            continue
+        sub = plan_chunks(rms[int(start / frame_seconds):int(end / frame_seconds)], chunk_size,
+                          frame_seconds=frame_seconds) or [(0.0, end - start)]
+        sub[-1] = (sub[-1][0], end - start)
+        chunks.extend((start + a, start + b) for a, b in sub)
+    return chunks
+
+
+def merge_words(chunk_results) -> list:
+    """Merge per-chunk word lists into one list ordered by start time."""
+    merged = [word for words in chunk_results for word in words]
+    merged.sort(key=lambda w: w["start"])
+    return merged
+
+
+def _transcribe_sequential(windows) -> list:
     transcript = []
+    with whisper_pool.lease() as model:
+        for owned_start, owned_end, offset, samples in windows:
+            transcript.extend(transcribe_samples(model, samples, offset, owned_start, owned_end))
+            print(f"Processed chunk: {owned_start:.0f}-{owned_end:.0f} seconds")
+    return merge_words([transcript])
+
+
+def _transcribe_parallel(windows, workers: int) -> list:
+    print(f"Transcribing on {workers} workers...")
+
+    def run(window):
+        owned_start, owned_end, offset, samples = window
+        with whisper_pool.lease() as model:
+            words = transcribe_samples(model, samples, offset, owned_start, owned_end)
+        print(f"Processed chunk: {owned_start:.0f}-{owned_end:.0f} seconds")
+        return words
+
+    # CTranslate2 releases the GIL while decoding, so threads scale across cores
+    # as long as each worker holds its own model instance. At most two windows
+    # per worker are decoded ahead, which bounds the audio held in memory.
+    results, pending = [], deque()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for window in windows:
+            pending.append(pool.submit(run, window))
+            if len(pending) >= 2 * workers:
+                results.append(pending.popleft().result())
+        results.extend(future.result() for future in pending)
+    return merge_words(results)
+
+
+def transcribe_audio(video_path: str, project_id: str, profile_id: str, chunk_size: float,
+                     overlap: float = CHUNK_OVERLAP, workers: int = TRANSCRIBE_WORKERS,
+                     speech=None, envelope=None, timeline=None) -> str:
+    """
+    Transcribe audio from a video file and store the transcript on Supabase.
+
+    The audio is streamed from one FFmpeg pipe and never held whole. With the
+    track's ``envelope`` chunks are cut at quiet frames; with a ``speech``
+    map from the VAD pre-pass (which needs the envelope too) only speech is
+    transcribed. Without either, fixed ``chunk_size`` windows are used.
+    ``timeline`` is passed on to ``publish_transcript``.
+    """
+    print("Starting real-time transcription...")
+    blocks = stream_pcm(video_path, block_seconds=STREAM_BLOCK_SECONDS)
+    if speech is not None:
+        chunks = plan_speech_chunks(speech, chunk_size, envelope.rms, envelope.hop)
+        windows = chunk_windows(blocks, chunks, overlap)
+    elif envelope is not None:
+        chunks = plan_chunks(envelope.rms, chunk_size, frame_seconds=envelope.hop)
+        windows = chunk_windows(blocks, chunks, overlap)
+    else:
+        windows = overlapping_windows(blocks, chunk_size, overlap)
+
+    if workers > 1:
+        transcript = _transcribe_parallel(windows, workers)
+    else:
+        transcript = _transcribe_sequential(windows)
+    print("Real-time transcription complete.")
+
+    return publish_transcript(project_id, profile_id, transcript, timeline)
+
+
+def publish_transcript(project_id: str, profile_id: str, transcript: list, timeline=None) -> dict:
+    """
+    Upload the transcript as SRT and mark the project as processing.
 
-    with VideoFileClip(video_path) as video:
-        audio = video.audio
-        duration = audio.duration
-
-        print("Starting real-time transcription...")
-        for start_time in range(0, int(duration), int(chunk_size)):
-            end_time = min(start_time + chunk_size, duration)
-            with NamedTemporaryFile(suffix=".wav", delete=False) as tmp_audio:
-                audio_chunk_path = tmp_audio.name
-            audio.subclip(start_time, end_time).write_audiofile(
-                audio_chunk_path, fps=16000, codec="pcm_s16le"
-            )
-
-            segments, _ = model.transcribe(audio_chunk_path)
-            for segment in segments:
-                if segment.words:
-                    for word in segment.words:
-                        transcript.append({
-                            "start": word.start + start_time,
-                            "end": word.end + start_time,
-                            "text": word.word,
-                        })
-                else:
-                    transcript.append({
-                        "start": segment.start + start_time,
-                        "end": segment.end + start_time,
-                        "text": segment.text,
-                    })
-            os.remove(audio_chunk_path)
-            print(f"Processed chunk: {start_time}-{end_time} seconds")
-        print("Real-time transcription complete.")
-
-    srt_content = convert_to_srt(transcript)
+    With the ``timeline`` of a partial download the SRT is written in
+    original-VOD time, like the clips; the returned transcript stays in file
+    time for the rest of the pipeline.
+    """
+    published = timeline.map_segments(transcript) if timeline is not None else transcript
+    srt_content = convert_to_srt(published)
     srt_file_path = save_srt_to_supabase(project_id, profile_id, srt_content)
     update_status_in_supabase(project_id, "processing", srt_file_path)
 
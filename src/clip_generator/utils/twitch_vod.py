@@ -0,0 +1,37 @@
+import logging
+
+from streamlink import Streamlink
+
+from clip_generator.utils.hls_download import HLSError, download_hls
+
+logger = logging.getLogger(__name__)
+
+
+class NoPlayableStream(HLSError):
+    pass
+
+
+def download_twitch_vod(vod_url, quality, mp4_path, ranges=None):
+    """
+    Resolve ``vod_url`` with Streamlink and download its HLS stream (or just
+    ``ranges`` of it) into ``mp4_path``.
+
+    ``quality`` falls back to "best" when the VOD doesn't offer it. Raises
+    Streamlink's ``StreamError`` when the URL can't be resolved,
+    ``NoPlayableStream`` when it has no streams and ``HLSError`` when the
+    download fails. Returns the ``Timeline`` of a partial download.
+    """
+    logger.info("→ Resolving streams for %s", vod_url)
+    streams = Streamlink().streams(vod_url)
+    if not streams:
+        raise NoPlayableStream("No playable streams found")
+    logger.info("✔ Qualities: %s", ", ".join(streams.keys()))
+
+    chosen = quality if quality in streams else "best"
+    if chosen not in streams:
+        raise NoPlayableStream(f"Neither {quality} nor best is available")
+    logger.info("✔ Selected quality: %s", chosen)
+
+    # Fetch HLS segments in parallel and remux them straight into the MP4
+    logger.info("→ Downloading segments to %s", mp4_path)
+    return download_hls(streams[chosen].url, mp4_path, ranges)
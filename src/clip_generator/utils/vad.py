@@ -0,0 +1,146 @@
+import numpy as np
+
+from clip_generator.config import VAD_BACKEND
+from clip_generator.utils.audio import SAMPLE_RATE, frame_rms
+
+
+class SpeechMap:
+    """
+    Sorted, non-overlapping speech intervals with O(log n) coverage queries.
+
+    ``coverage(t0, t1)`` returns the seconds of speech inside the window and
+    accepts scalars or NumPy arrays of window bounds.
+    """
+
+    def __init__(self, intervals):
+        intervals = sorted(intervals)
+        self.starts = np.array([s for s, _ in intervals], dtype=np.float64)
+        self.ends = np.array([e for _, e in intervals], dtype=np.float64)
+        self._cum = np.concatenate(([0.0], np.cumsum(self.ends - self.starts)))
+
+    @property
+    def intervals(self):
+        return list(zip(self.starts.tolist(), self.ends.tolist()))
+
+    @property
+    def total(self):
+        return float(self._cum[-1])
+
+    def __len__(self):
+        return len(self.starts)
+
+    def _speech_before(self, t):
+        t = np.atleast_1d(np.asarray(t, dtype=np.float64))
+        if len(self.starts) == 0:
+            return np.zeros_like(t)
+        i = np.searchsorted(self.ends, t, side="right")
+        # the first interval ending after t may have started before it
+        nxt = np.minimum(i, len(self.starts) - 1)
+        partial = np.where(i < len(self.starts), np.maximum(0.0, t - self.starts[nxt]), 0.0)
+        return self._cum[i] + partial
+
+    def coverage(self, t0, t1):
+        covered = self._speech_before(t1) - self._speech_before(t0)
+        if np.ndim(t0) == 0 and np.ndim(t1) == 0:
+            return float(covered[0])
+        return covered
+
+
+def _runs(mask):
+    """(start, end) frame indices of consecutive True runs in ``mask``."""
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+
+def energy_speech_intervals(samples, sample_rate=SAMPLE_RATE, frame_seconds=0.03, **options):
+    """Energy-based voice activity detection on raw samples (see ``rms_speech_intervals``)."""
+    rms = frame_rms(samples, frame_seconds, sample_rate)
+    return rms_speech_intervals(rms, frame_seconds, len(samples) / sample_rate, **options)
+
+
+def rms_speech_intervals(rms, frame_seconds, duration,
+                         margin_db=10.0, min_db=-60.0, max_db=-35.0,
+                         min_speech=0.25, min_silence=0.5, pad=0.3):
+    """
+    Energy-based voice activity detection over per-frame RMS levels.
+
+    Frames louder than the track's noise floor (10th percentile) plus
+    ``margin_db`` count as speech. The threshold is clamped to
+    ``[min_db, max_db]`` dBFS so that a stream with constant game audio or
+    music is never cut away wholesale; only genuinely quiet stretches are
+    skipped (use the Silero backend to also reject music). Gaps shorter than
+    ``min_silence`` are bridged, bursts shorter than ``min_speech`` are
+    dropped and every interval is padded by ``pad`` seconds.
+    """
+    if len(rms) == 0:
+        return []
+    db = 20 * np.log10(rms + 1e-10)
+    threshold = min(max(np.percentile(db, 10) + margin_db, min_db), max_db)
+    mask = db > threshold
+
+    # bridge short pauses between speech
+    starts, ends = _runs(~mask)
+    short = (starts > 0) & (ends < len(mask)) & ((ends - starts) * frame_seconds < min_silence)
+    fill = np.zeros(len(mask) + 1, dtype=np.int32)
+    np.add.at(fill, starts[short], 1)
+    np.add.at(fill, ends[short], -1)
+    mask |= np.cumsum(fill[:-1]) > 0
+
+    # drop short blips
+    starts, ends = _runs(mask)
+    keep = (ends - starts) * frame_seconds >= min_speech
+
+    intervals = []
+    for s, e in zip(starts[keep] * frame_seconds - pad, ends[keep] * frame_seconds + pad):
+        s, e = max(0.0, float(s)), min(duration, float(e))
+        if intervals and s <= intervals[-1][1]:
+            intervals[-1] = (intervals[-1][0], e)
+        else:
+            intervals.append((s, e))
+    return intervals
+
+
+def silero_speech_intervals(blocks, sample_rate=SAMPLE_RATE, min_silence=0.5):
+    """
+    Speech intervals from the Silero model bundled with faster-whisper
+    (CPU/ONNX), run block by block over a PCM stream (e.g. ``stream_pcm``)
+    so the audio is never held whole. Intervals less than ``min_silence``
+    apart across a block boundary are joined.
+    """
+    from faster_whisper.vad import VadOptions, get_speech_timestamps
+
+    options = VadOptions(min_silence_duration_ms=int(min_silence * 1000), speech_pad_ms=300)
+    intervals = []
+    offset = 0.0
+    for block in blocks:
+        for ts in get_speech_timestamps(block, options):
+            start, end = offset + ts["start"] / sample_rate, offset + ts["end"] / sample_rate
+            if intervals and start - intervals[-1][1] < min_silence:
+                intervals[-1] = (intervals[-1][0], end)
+            else:
+                intervals.append((start, end))
+        offset += len(block) / sample_rate
+    return intervals
+
+
+def detect_speech(samples=None, sample_rate=SAMPLE_RATE, backend=VAD_BACKEND, envelope=None, blocks=None):
+    """
+    Run the configured VAD backend and return a ``SpeechMap``.
+
+    The energy backend reads the RMS column of ``envelope`` when one is
+    given, so no samples are needed. Silero reads ``blocks`` (e.g. a lazy
+    ``stream_pcm``, only started for this backend) or ``samples``.
+    """
+    if backend == "silero":
+        intervals = silero_speech_intervals([samples] if blocks is None else blocks, sample_rate)
+        duration = envelope.duration if envelope is not None else len(samples) / sample_rate
+    elif envelope is not None:
+        intervals = rms_speech_intervals(envelope.rms, envelope.hop, envelope.duration)
+        duration = envelope.duration
+    else:
+        intervals = energy_speech_intervals(samples, sample_rate)
+        duration = len(samples) / sample_rate
+    speech = SpeechMap(intervals)
+    if duration:
+        print(f"VAD ({backend}): {speech.total:.0f}s of speech in {duration:.0f}s of audio")
+    return speech
@@ -0,0 +1,143 @@
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+import psutil
+
+from clip_generator.config import (
+    WHISPER_MODEL,
+    WHISPER_DEVICE,
+    WHISPER_COMPUTE_TYPE,
+    WHISPER_CPU_THREADS,
+    WHISPER_NUM_WORKERS,
+    WHISPER_POOL_SIZE,
+)
+
+
+class WhisperModelPool:
+    """
+    Process-wide pool of loaded WhisperModel instances.
+
+    Models are loaded lazily (or up front via ``warmup``) up to ``size``
+    instances and handed out with ``lease()``. A lease blocks until an
+    instance is free, so concurrent jobs share the loaded models instead of
+    each loading their own copy.
+    """
+
+    def __init__(self, model_name="base", device="cpu", compute_type="default",
+                 cpu_threads=0, num_workers=1, size=1):
+        self.model_name = model_name
+        self.device = device
+        self.compute_type = compute_type
+        self.cpu_threads = cpu_threads
+        self.num_workers = num_workers
+        self.size = max(1, size)
+
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self._loaded = 0
+        self._leased = 0
+        self._load_seconds = []
+        self._rss_bytes = 0
+
+    def _load(self):
+        # Imported here so that reading pool stats never pulls in CTranslate2.
+        from faster_whisper import WhisperModel
+
+        rss_before = psutil.Process().memory_info().rss
+        started = time.perf_counter()
+        model = WhisperModel(self.model_name,
+                             device=self.device,
+                             compute_type=self.compute_type,
+                             cpu_threads=self.cpu_threads,
+                             num_workers=self.num_workers)
+        elapsed = time.perf_counter() - started
+        rss_after = psutil.Process().memory_info().rss
+
+        with self._lock:
+            self._load_seconds.append(elapsed)
+            # RSS delta is approximate when other threads allocate meanwhile.
+            self._rss_bytes += max(0, rss_after - rss_before)
+        print(f"Loaded Whisper model '{self.model_name}' ({self.compute_type}) in {elapsed:.1f}s")
+        return model
+
+    def _acquire(self, timeout=None):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            reserve = self._loaded < self.size
+            if reserve:
+                self._loaded += 1
+
+        if reserve:
+            try:
+                return self._load()
+            except Exception:
+                with self._lock:
+                    self._loaded -= 1
+                raise
+
+        try:
+            return self._idle.get(timeout=timeout)
+        except queue.Empty:
+            raise TimeoutError(f"No Whisper model became available within {timeout}s")
+
+    @contextmanager
+    def lease(self, timeout=None):
+        """Borrow a loaded model for the duration of the ``with`` block."""
+        model = self._acquire(timeout)
+        with self._lock:
+            self._leased += 1
+        try:
+            yield model
+        finally:
+            with self._lock:
+                self._leased -= 1
+            self._idle.put(model)
+
+    def warmup(self, count=None):
+        """Load up to ``count`` instances (default: the full pool) ahead of time."""
+        count = self.size if count is None else min(count, self.size)
+        while True:
+            with self._lock:
+                if self._loaded >= count:
+                    return
+                self._loaded += 1
+            try:
+                self._idle.put(self._load())
+            except Exception:
+                with self._lock:
+                    self._loaded -= 1
+                raise
+
+    def stats(self):
+        """Snapshot of pool configuration, load time and memory for status reporting."""
+        with self._lock:
+            load_seconds = list(self._load_seconds)
+            return {
+                "model": self.model_name,
+                "device": self.device,
+                "compute_type": self.compute_type,
+                "cpu_threads": self.cpu_threads,
+                "num_workers": self.num_workers,
+                "pool_size": self.size,
+                "loaded": self._loaded,
+                "leased": self._leased,
+                "load_seconds_total": round(sum(load_seconds), 2),
+                "load_seconds_last": round(load_seconds[-1], 2) if load_seconds else None,
+                "rss_mb": round(self._rss_bytes / 1e6, 1),
+            }
+
+
+whisper_pool = WhisperModelPool(
+    model_name=WHISPER_MODEL,
+    device=WHISPER_DEVICE,
+    compute_type=WHISPER_COMPUTE_TYPE,
+    cpu_threads=WHISPER_CPU_THREADS,
+    num_workers=WHISPER_NUM_WORKERS,
+    size=WHISPER_POOL_SIZE,
+)
@@ -0,0 +1,56 @@
+import numpy as np
+
+
+class WordIndex:
+    """
+    Transcript entries sorted by time, with a prefix sum of word counts.
+
+    Each entry (a word, or a whole segment when Whisper gave no word
+    timings) is placed at its midpoint, and a window ``[t0, t1]`` contains the
+    entries whose midpoint falls inside it. Counts, text and speech density
+    for any window come from two ``searchsorted`` calls, so scoring thousands
+    of windows against a multi-hour transcript stays cheap. ``word_count`` and
+    ``density`` also accept arrays of window bounds.
+    """
+
+    def __init__(self, transcript):
+        entries = sorted(transcript, key=lambda seg: (seg["start"] + seg["end"]) / 2)
+        self.starts = np.array([seg["start"] for seg in entries], dtype=np.float64)
+        self.ends = np.array([seg["end"] for seg in entries], dtype=np.float64)
+        self.mids = (self.starts + self.ends) / 2
+        self.texts = [seg["text"] for seg in entries]
+        counts = np.array([len(text.split()) for text in self.texts], dtype=np.int64)
+        self.cum_counts = np.concatenate(([0], np.cumsum(counts)))
+
+    def __len__(self):
+        return len(self.texts)
+
+    def span(self, t0, t1):
+        """Index range ``[lo, hi)`` of the entries whose midpoint lies in ``[t0, t1]``."""
+        lo = np.searchsorted(self.mids, t0, side="left")
+        hi = np.searchsorted(self.mids, t1, side="right")
+        return lo, hi
+
+    def word_count(self, t0, t1):
+        lo, hi = self.span(t0, t1)
+        counts = self.cum_counts[hi] - self.cum_counts[lo]
+        return int(counts) if np.ndim(counts) == 0 else counts
+
+    def density(self, t0, t1):
+        """Words per second inside the window(s)."""
+        duration = np.maximum(np.asarray(t1, dtype=np.float64) - t0, 1e-9)
+        rate = self.word_count(t0, t1) / duration
+        return float(rate) if np.ndim(rate) == 0 else rate
+
+    def text(self, t0, t1):
+        """Transcript text spoken inside ``[t0, t1]``."""
+        lo, hi = self.span(t0, t1)
+        return "".join(self.texts[lo:hi]).strip()
+
+    def words(self, t0, t1):
+        """Entries inside ``[t0, t1]`` as transcript dicts."""
+        lo, hi = self.span(t0, t1)
+        return [
+            {"start": float(self.starts[i]), "end": float(self.ends[i]), "text": self.texts[i]}
+            for i in range(lo, hi)
+        ]
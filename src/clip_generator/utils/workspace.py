@@ -0,0 +1,74 @@
+import os
+import shutil
+import time
+import uuid
+
+from clip_generator.config import (WORKSPACE_CLEANUP, WORKSPACE_DIR, WORKSPACE_ON_TMPFS,
+                                   WORKSPACE_RETENTION_HOURS)
+
+TMPFS_DIR = "/dev/shm"
+CLEANUP_POLICIES = ("always", "on_success", "never")
+
+
+def workspace_root(root=WORKSPACE_DIR, on_tmpfs=WORKSPACE_ON_TMPFS):
+    """Where job workspaces live: ``root``, or a RAM-backed equivalent when ``on_tmpfs`` and available."""
+    if on_tmpfs and os.path.isdir(TMPFS_DIR) and os.access(TMPFS_DIR, os.W_OK):
+        return os.path.join(TMPFS_DIR, "clip_generator")
+    return root
+
+
+class Workspace:
+    """
+    Private scratch directory for one job's intermediate files (rendered
+    clips, thumbnails, ...), so jobs running side by side never write to the
+    same path.
+
+    Use it as a context manager. On exit the directory is removed according
+    to ``cleanup``: ``"always"``, ``"on_success"`` (kept when the job raised,
+    for debugging) or ``"never"``. Kept workspaces are swept by
+    ``sweep_workspaces`` once older than the retention period.
+    """
+
+    def __init__(self, name, root=None, cleanup=WORKSPACE_CLEANUP):
+        if cleanup not in CLEANUP_POLICIES:
+            raise ValueError(f"Unknown workspace cleanup policy: {cleanup!r}")
+        self.root = root or workspace_root()
+        self.cleanup = cleanup
+        self.path = os.path.join(self.root, f"{name}-{uuid.uuid4().hex[:8]}")
+        os.makedirs(self.path)
+
+    def file(self, name):
+        """Path of ``name`` inside the workspace."""
+        return os.path.join(self.path, name)
+
+    def remove(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.cleanup == "always" or (self.cleanup == "on_success" and exc_type is None):
+            self.remove()
+        else:
+            print(f"Keeping workspace {self.path}")
+        return False
+
+
+def sweep_workspaces(root=None, max_age=WORKSPACE_RETENTION_HOURS * 3600):
+    """Remove workspaces older than ``max_age`` seconds (kept ones, or left by a crash). Returns how many."""
+    root = root or workspace_root()
+    if not os.path.isdir(root):
+        return 0
+    cutoff = time.time() - max_age
+    removed = 0
+    for name in os.listdir(root):
+        path = os.path.join(root, name)
+        try:
+            if not os.path.isdir(path) or os.stat(path).st_mtime > cutoff:
+                continue
+        except OSError:
+            continue
+        shutil.rmtree(path, ignore_errors=True)
+        removed += 1
+    return removed
@@ -0,0 +1,48 @@
+import logging
+import os
+
+import yt_dlp
+from yt_dlp.utils import download_range_func
+
+from clip_generator.utils.hls_download import concat_parts
+from clip_generator.utils.timeline import Timeline
+
+logger = logging.getLogger(__name__)
+
+
+def download_sections(video_url, mp4_path, ranges, ydl_opts):
+    """
+    Download only ``ranges`` (``[(start, end), ...]`` seconds) of a video
+    into ``mp4_path`` with yt-dlp's ``download_ranges``.
+
+    Each range goes to its own part, with keyframes forced at the cuts so the
+    part starts exactly at the range start, and the parts are joined. The
+    ``Timeline`` mapping the file back to the video is saved next to it and
+    returned.
+    """
+    parts = []
+    try:
+        for n, (start, end) in enumerate(ranges):
+            part = f"{mp4_path}.section{n}.mp4"
+            options = {**ydl_opts,
+                       "outtmpl": part,
+                       "merge_output_format": "mp4",
+                       "download_ranges": download_range_func(None, [(start, end)]),
+                       "force_keyframes_at_cuts": True}
+            logger.info("Downloading section %g-%gs of %s", start, end, video_url)
+            with yt_dlp.YoutubeDL(options) as ydl:
+                ydl.download([video_url])
+            parts.append(part)
+
+        if len(parts) == 1:
+            os.replace(parts[0], mp4_path)
+        else:
+            concat_parts(parts, mp4_path)
+    finally:
+        for part in parts:
+            if os.path.exists(part):
+                os.remove(part)
+
+    timeline = Timeline.from_ranges(ranges)
+    timeline.save(mp4_path)
+    return timeline
@@ -0,0 +1,13 @@
+-- Clip rows are upserted on (project_id, file_url) so a retried job updates
+-- its rows instead of duplicating them (see
+-- src/clip_generator/utils/supabaseClient/clip_store.py). ON CONFLICT needs a
+-- unique index on those columns; duplicates written before it existed are
+-- dropped first, keeping the newest row.
+delete from public.clips a
+using public.clips b
+where a.project_id = b.project_id
+  and a.file_url = b.file_url
+  and (a.created_at, a.ctid) < (b.created_at, b.ctid);
+
+create unique index if not exists clips_project_id_file_url_key
+    on public.clips (project_id, file_url);
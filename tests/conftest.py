@@ -1,5 +1,6 @@
 import os
 import sys
+import tempfile
 from pathlib import Path
 
 # Ensure the src directory is on the path for test imports
@@ -12,3 +13,7 @@ if SRC.exists():
     env_path = os.environ.get("PYTHONPATH", "")
     paths = [str(SRC)] + ([env_path] if env_path else [])
     os.environ["PYTHONPATH"] = os.pathsep.join(paths)
+
+# Keep caches, indexes and the job database written during the tests out of
+# the user's cache directory
+os.environ["CACHE_DIR"] = tempfile.mkdtemp(prefix="clip_generator-tests-")
@@ -0,0 +1,37 @@
+import numpy as np
+
+from clip_generator.utils.candidates import candidate_windows, generate_candidates, sentence_boundaries, snap
+from clip_generator.utils.word_index import WordIndex
+
+
+def test_snap_within_tolerance_only():
+    bounds = np.array([10.0, 20.0])
+    np.testing.assert_allclose(snap([9.0, 15.0, 21.5], bounds, 2.0), [10.0, 15.0, 20.0])
+
+
+def test_sentence_boundaries_from_punctuation_and_pauses():
+    words = WordIndex([
+        {"start": 0.0, "end": 1.0, "text": " Hello"},
+        {"start": 1.0, "end": 2.0, "text": " there."},
+        {"start": 2.1, "end": 3.0, "text": " And"},
+        {"start": 5.0, "end": 6.0, "text": " then"},
+    ])
+    assert sorted(sentence_boundaries(words)) == [2.0, 4.0]
+
+
+def test_windows_respect_lengths_and_snap_to_boundaries():
+    windows = generate_candidates(300.0, 30.0, 60.0, stride=10.0, boundaries=[41.0, 99.0], tolerance=3.0)
+    assert windows
+    assert all(30.0 <= t1 - t0 <= 60.0 and 0 <= t0 and t1 <= 300.0 for t0, t1 in windows)
+    assert (41.0, 99.0) in windows
+    assert generate_candidates(20.0) == []
+
+
+def test_six_hour_vod():
+    words = WordIndex([
+        {"start": float(t), "end": t + 0.4, "text": " word." if t % 7 == 0 else " word"}
+        for t in np.arange(0, 6 * 3600, 0.5)
+    ])
+    cuts = np.arange(0, 6 * 3600, 97.0)
+    windows = candidate_windows(6 * 3600.0, words, cuts=cuts)
+    assert len(windows) > 6 * 3600 / 5
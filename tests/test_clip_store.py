@@ -0,0 +1,128 @@
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+from postgrest.exceptions import APIError
+
+from clip_generator.utils.supabaseClient.clip_store import ClipStore, LocalClipRows, SupabaseClipRows
+from clip_generator.utils.supabaseClient.local_storage import LocalStorage, create_app
+from clip_generator.utils.supabaseClient.resumable_upload import ResumableUploader, UploadFailed
+
+BASE = "http://storage.local"
+
+
+def make_store(storage, rows):
+    client = TestClient(create_app(storage), base_url=BASE)
+    uploader = ResumableUploader(BASE, "key", part_size=1000, backoff=0, retries=0, client=client)
+    return ClipStore(uploader, rows, workers=4)
+
+
+def rendered_clips(tmp_path, n):
+    clips = []
+    for i in range(n):
+        (tmp_path / f"clip_{i}.mp4").write_bytes(b"v" * (1500 + i))
+        (tmp_path / f"thumb_{i}.jpg").write_bytes(b"j" * 10)
+        clips.append({"clip_path": str(tmp_path / f"clip_{i}.mp4"), "thumbnail_path": str(tmp_path / f"thumb_{i}.jpg"),
+                      "transcript": f"clip {i}", "start_time": 10.0 * i, "end_time": 10.0 * i + 5})
+    return clips
+
+
+def test_publish_uploads_everything_and_writes_rows_once(tmp_path):
+    storage, rows = LocalStorage(), LocalClipRows()
+    store = make_store(storage, rows)
+    clips = rendered_clips(tmp_path, 3)
+
+    written = store.publish("p1", clips)
+
+    assert [row["file_url"] for row in written] == ["p1/clip_0.mp4", "p1/clip_1.mp4", "p1/clip_2.mp4"]
+    assert storage.objects[("clips", "p1/clip_2.mp4")] == b"v" * 1502
+    assert storage.objects[("thumbnails", "p1/thumb_0.jpg")] == b"j" * 10
+    assert rows.calls == 1 and len(rows.rows) == 3
+
+    # a retried job overwrites objects and rows instead of duplicating them
+    store.publish("p1", clips)
+    assert rows.calls == 2 and len(rows.rows) == 3
+
+
+def test_a_failed_upload_fails_the_publish_and_writes_no_rows(tmp_path):
+    rows = LocalClipRows()
+    clips = rendered_clips(tmp_path, 2)
+    (tmp_path / "thumb_1.jpg").unlink()
+
+    with pytest.raises(UploadFailed, match="thumb_1.jpg|clip_1.mp4"):
+        make_store(LocalStorage(), rows).publish("p1", clips)
+
+    assert rows.calls == 0 and rows.rows == {}
+
+
+class GatedUploader:
+    """Uploader whose uploads wait until the test opens the gate."""
+
+    def __init__(self):
+        self.gate = threading.Event()
+        self.started = threading.Event()
+        self.names = []
+
+    def upload_file(self, path, bucket, name, **options):
+        self.started.set()
+        self.gate.wait(5)
+        self.names.append(name)
+
+
+def test_publisher_uploads_while_rendering_and_applies_backpressure(tmp_path):
+    uploader, rows = GatedUploader(), LocalClipRows()
+    store = ClipStore(uploader, rows, workers=1)
+    clips = rendered_clips(tmp_path, 3)
+    submitted = []
+
+    def render():
+        with store.publisher("p1", max_pending=1) as publisher:
+            for clip in clips:
+                publisher.submit(clip)
+                submitted.append(clip["clip_path"])
+
+    renderer = threading.Thread(target=render)
+    renderer.start()
+    # the first clip uploads before rendering finishes; one more fits in the
+    # queue and the renderer waits on the third
+    assert uploader.started.wait(5)
+    renderer.join(0.2)
+    assert renderer.is_alive() and len(submitted) == 2
+
+    uploader.gate.set()
+    renderer.join(5)
+    assert len(submitted) == 3
+    assert rows.calls == 1 and len(rows.rows) == 3
+
+
+def test_missing_unique_index_is_reported_clearly():
+    class Table:
+        def upsert(self, rows, on_conflict):
+            return self
+
+        def execute(self):
+            raise APIError({"message": "there is no unique or exclusion constraint matching the ON CONFLICT"
+                                       " specification", "code": "42P10", "hint": None, "details": None})
+
+    client = type("Client", (), {"table": lambda self, name: Table()})()
+
+    with pytest.raises(RuntimeError, match="no unique index on \\(project_id, file_url\\)"):
+        SupabaseClipRows(client).upsert([{"project_id": "p1", "file_url": "p1/clip_0.mp4"}])
+
+
+def test_a_failed_render_drops_queued_clips_and_writes_no_rows(tmp_path):
+    uploader, rows = GatedUploader(), LocalClipRows()
+    store = ClipStore(uploader, rows, workers=1)
+    clips = rendered_clips(tmp_path, 3)
+
+    with pytest.raises(RuntimeError, match="encoder crashed"):
+        with store.publisher("p1", max_pending=2) as publisher:
+            publisher.submit(clips[0])
+            publisher.submit(clips[1])
+            assert uploader.started.wait(5)
+            threading.Timer(0.2, uploader.gate.set).start()
+            raise RuntimeError("encoder crashed")
+
+    # the upload in progress finishes, the queued clip is dropped
+    assert uploader.names == ["p1/clip_0.mp4", "p1/thumb_0.jpg"]
+    assert rows.calls == 0
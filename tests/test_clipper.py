@@ -0,0 +1,51 @@
+import threading
+
+from clip_generator.utils import clipper
+
+
+def test_encoder_threads_split_the_cores(monkeypatch):
+    monkeypatch.setattr(clipper.os, "cpu_count", lambda: 8)
+
+    assert clipper.encoder_threads(3) == 2
+    assert clipper.encoder_threads(0) == 8
+    assert clipper.encoder_threads(16) == 1
+
+
+def test_clips_are_yielded_as_they_finish_and_failures_skipped(monkeypatch, tmp_path):
+    first_done = threading.Event()
+
+    def render_clip(filepath, out_path, thumb, t0, t1, crop_width, crop_height, threads):
+        if t0 == 0:
+            # the first clip only finishes after the third one
+            assert first_done.wait(5)
+        elif t0 == 100:
+            raise RuntimeError("ffmpeg exploded")
+        else:
+            first_done.set()
+        return out_path, thumb
+
+    monkeypatch.setattr(clipper, "use_single_pass", lambda windows: False)
+    monkeypatch.setattr(clipper, "render_clip", render_clip)
+    windows = [(0, 0.0, 30.0), (1, 100.0, 130.0), (2, 200.0, 230.0)]
+
+    rendered = list(clipper.iter_rendered_clips("src.mp4", windows, workers=3, output_dir=str(tmp_path)))
+
+    assert [r[0] for r in rendered] == [2, 0]
+    assert rendered[0][3:] == (str(tmp_path / "clip_2.mp4"), str(tmp_path / "thumb_2.jpg"))
+
+
+def test_failed_single_pass_falls_back_to_one_by_one(monkeypatch, tmp_path):
+    rendered = []
+
+    def single_pass(*args, **kwargs):
+        raise RuntimeError("filter graph too large")
+
+    monkeypatch.setattr(clipper, "use_single_pass", lambda windows: True)
+    monkeypatch.setattr(clipper, "render_clips_single_pass", single_pass)
+    monkeypatch.setattr(clipper, "render_clip", lambda *args, **kwargs: rendered.append(args[3]))
+    windows = [(0, 0.0, 30.0), (1, 40.0, 70.0)]
+
+    clips = list(clipper.iter_rendered_clips("src.mp4", windows, output_dir=str(tmp_path)))
+
+    assert sorted(c[0] for c in clips) == [0, 1]
+    assert sorted(rendered) == [0.0, 40.0]
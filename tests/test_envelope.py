@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from clip_generator.utils.envelope import AudioEnvelope
+from clip_generator.utils.transcript_cache import TranscriptCache
+from clip_generator.utils.vad import detect_speech
+
+
+def sine(seconds, amplitude, freq=997.0, sample_rate=48000):
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    return (amplitude * np.sin(2 * np.pi * freq * t)).astype(np.float32)
+
+
+def test_full_scale_sine_reads_minus_three_lufs():
+    envelope = AudioEnvelope.from_blocks([sine(3.0, 1.0)], sample_rate=48000)
+
+    assert len(envelope) == 30
+    # BS.1770 reference: a 0 dBFS 997 Hz sine measures -3.01 LUFS
+    assert np.median(envelope.loudness) == pytest.approx(-3.01, abs=0.05)
+    assert np.median(envelope.rms) == pytest.approx(1 / np.sqrt(2), abs=1e-3)
+    assert np.median(envelope.peak) == pytest.approx(1.0, abs=1e-3)
+
+
+def test_block_size_does_not_change_the_envelope():
+    rng = np.random.default_rng(0)
+    samples = rng.normal(0, 0.1, 16000 * 10).astype(np.float32)
+    whole = AudioEnvelope.from_blocks([samples])
+    blocks = AudioEnvelope.from_blocks(np.array_split(samples, [1000, 12345, 99999]))
+
+    np.testing.assert_allclose(blocks.data, whole.data, rtol=1e-5, atol=1e-5)
+
+
+def test_vad_and_cache_read_the_same_envelope(tmp_path):
+    samples = np.concatenate((np.zeros(16000 * 20), sine(15.0, 0.3, sample_rate=16000),
+                              np.zeros(16000 * 20))).astype(np.float32)
+    envelope = AudioEnvelope.from_blocks([samples])
+
+    speech = detect_speech(envelope=envelope, backend="energy")
+    assert speech.intervals[0][0] == pytest.approx(20, abs=0.5)
+    assert speech.intervals[-1][1] == pytest.approx(35, abs=0.5)
+
+    cache = TranscriptCache(str(tmp_path), 1 << 20)
+    cache.put_envelope("k", envelope)
+    cached = cache.get_envelope("k")
+    np.testing.assert_array_equal(cached.data, envelope.data)
+    assert cached.hop == envelope.hop
+    assert cache.get_envelope("missing") is None
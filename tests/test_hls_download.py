@@ -0,0 +1,100 @@
+import httpx
+import pytest
+
+from clip_generator.utils.hls_download import HLSDownloader, HLSError, parse_media_playlist, playlist_fingerprint
+from clip_generator.utils.timeline import Timeline
+
+PLAYLIST = """#EXTM3U
+#EXT-X-VERSION:3
+#EXT-X-TARGETDURATION:10
+#EXTINF:10.000,
+0.ts
+#EXTINF:10.000,
+1.ts
+#EXTINF:4.5,
+https://cdn.example/vod/2.ts?token=abc
+#EXT-X-ENDLIST
+"""
+
+
+def test_parse_media_playlist():
+    segments, init_uri = parse_media_playlist(PLAYLIST, "https://cdn.example/vod/index-dvr.m3u8?sig=1")
+
+    assert init_uri is None
+    assert [s.uri for s in segments] == [
+        "https://cdn.example/vod/0.ts",
+        "https://cdn.example/vod/1.ts",
+        "https://cdn.example/vod/2.ts?token=abc",
+    ]
+    assert [s.start for s in segments] == [0.0, 10.0, 20.0]
+    assert segments[-1].duration == 4.5
+
+
+def test_parse_rejects_master_and_encrypted_playlists():
+    with pytest.raises(HLSError):
+        parse_media_playlist("#EXTM3U\n#EXT-X-STREAM-INF:BANDWIDTH=1\nlow.m3u8\n", "https://x/")
+    with pytest.raises(HLSError):
+        parse_media_playlist('#EXTM3U\n#EXT-X-KEY:METHOD=AES-128,URI="k"\n#EXTINF:1,\na.ts\n', "https://x/")
+
+
+def test_fingerprint_ignores_rotating_tokens():
+    a, _ = parse_media_playlist(PLAYLIST, "https://cdn.example/vod/index.m3u8")
+    b, _ = parse_media_playlist(PLAYLIST.replace("token=abc", "token=xyz"), "https://cdn.example/vod/index.m3u8")
+    assert playlist_fingerprint(a) == playlist_fingerprint(b)
+    assert playlist_fingerprint(a) != playlist_fingerprint(a[:2])
+
+
+def test_fetch_retries_transient_errors():
+    calls = []
+
+    def handler(request):
+        calls.append(request.url)
+        return httpx.Response(503 if len(calls) < 3 else 200, content=b"segment")
+
+    downloader = HLSDownloader(client=httpx.Client(transport=httpx.MockTransport(handler)), retries=3, backoff=0)
+    assert downloader.fetch("https://cdn.example/0.ts") == b"segment"
+    assert len(calls) == 3
+
+    failing = HLSDownloader(client=httpx.Client(transport=httpx.MockTransport(lambda r: httpx.Response(404))),
+                            retries=1, backoff=0)
+    with pytest.raises(HLSError):
+        failing.fetch("https://cdn.example/0.ts")
+
+
+
+def test_downloader_closes_only_the_client_it_created():
+    with HLSDownloader() as downloader:
+        pass
+    assert downloader.client.is_closed
+
+    shared = httpx.Client()
+    with HLSDownloader(client=shared):
+        pass
+    assert not shared.is_closed
+    shared.close()
+
+def test_ranged_download_fetches_overlapping_runs_as_separate_parts(tmp_path, monkeypatch):
+    playlist = "#EXTM3U\n" + "".join(f"#EXTINF:10.0,\n{i}.ts\n" for i in range(6)) + "#EXT-X-ENDLIST\n"
+    downloader = HLSDownloader(client=httpx.Client(transport=httpx.MockTransport(
+        lambda r: httpx.Response(200, text=playlist))))
+    remuxed, joined = [], []
+
+    def fake_remux(segments, init_uri, part_path, pool):
+        remuxed.append([s.index for s in segments])
+        open(part_path, "wb").close()
+        return len(segments)
+
+    def fake_concat(parts, mp4_path):
+        joined.append(len(parts))
+        open(mp4_path, "wb").close()
+
+    monkeypatch.setattr(downloader, "_remux_part", fake_remux)
+    monkeypatch.setattr("clip_generator.utils.hls_download.concat_parts", fake_concat)
+
+    mp4_path = str(tmp_path / "vod.mp4")
+    timeline = downloader.download("https://cdn.example/index.m3u8", mp4_path, ranges=[(5, 15), (45, 50)])
+
+    assert remuxed == [[0, 1], [4]]
+    assert joined == [2]
+    assert timeline.to_source(22.0) == 42.0
+    assert Timeline.load(mp4_path).pieces == timeline.pieces
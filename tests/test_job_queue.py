@@ -0,0 +1,223 @@
+import multiprocessing
+import os
+import signal
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from clip_generator.app.api import jobs as jobs_api
+from clip_generator.app.services import job_queue as jq
+
+
+def succeed(payload, job):
+    job.stage("work")
+    job.remember(project_id="p1")
+    job.stage("work", "done")
+    return {"echo": payload["x"]}
+
+
+def explode(payload, job):
+    raise RuntimeError("boom")
+
+
+FINALIZED = []
+
+
+def record_finalized(job, status):
+    FINALIZED.append((job["id"], status))
+
+
+@pytest.fixture
+def queue(tmp_path, monkeypatch):
+    monkeypatch.setitem(jq.JOB_HANDLERS, "succeed", f"{__name__}:succeed")
+    monkeypatch.setitem(jq.JOB_HANDLERS, "explode", f"{__name__}:explode")
+    return jq.JobQueue(str(tmp_path / "jobs.sqlite3"), retry_delay=0)
+
+
+def test_job_runs_and_records_progress(queue):
+    job = queue.enqueue("succeed", {"x": 1})
+    assert job["status"] == jq.QUEUED
+
+    claimed = queue.claim(worker_pid=123)
+    assert claimed["id"] == job["id"] and claimed["attempts"] == 1
+    assert queue.claim(worker_pid=456) is None
+
+    jq.run_job(queue, claimed)
+    done = queue.get(job["id"])
+    assert done["status"] == jq.COMPLETED
+    assert done["result"] == {"echo": 1}
+    assert done["progress"] == {"work": "done"}
+    assert done["payload"]["project_id"] == "p1"
+
+
+def test_failures_retry_then_fail(queue):
+    job = queue.enqueue("explode", {}, max_attempts=2)
+
+    first = queue.claim(1)
+    assert not jq.JobContext(queue, first).last_attempt
+    jq.run_job(queue, first)
+    assert queue.get(job["id"])["status"] == jq.QUEUED
+
+    second = queue.claim(1)
+    assert jq.JobContext(queue, second).last_attempt
+    jq.run_job(queue, second)
+    failed = queue.get(job["id"])
+    assert failed["status"] == jq.FAILED
+    assert failed["attempts"] == 2 and "boom" in failed["error"]
+
+
+def test_cancel_queued_and_running(queue):
+    queued = queue.enqueue("succeed", {"x": 1})
+    assert queue.cancel(queued["id"])["status"] == jq.CANCELLED
+    assert queue.claim(1) is None
+
+    running = queue.enqueue("succeed", {"x": 2})
+    queue.claim(1)
+    assert queue.cancel(running["id"])["cancel_requested"]
+    with pytest.raises(jq.JobCancelled):
+        jq.JobContext(queue, running).stage("next")
+
+
+def test_recover_requeues_orphaned_jobs(queue):
+    job = queue.enqueue("succeed", {"x": 1}, max_attempts=1)
+    queue.claim(worker_pid=99)
+
+    assert queue.recover([98]) == 0
+    assert queue.recover([99], count_attempt=False) == 1
+    recovered = queue.get(job["id"])
+    assert recovered["status"] == jq.QUEUED and recovered["attempts"] == 0
+
+    queue.claim(worker_pid=7)
+    queue.recover()
+    assert queue.get(job["id"])["status"] == jq.FAILED
+
+
+def test_job_endpoints(queue, monkeypatch):
+    monkeypatch.setattr(jobs_api, "get_job_queue", lambda: queue)
+    app = FastAPI()
+    app.include_router(jobs_api.router, prefix="/api")
+    client = TestClient(app)
+    job = queue.enqueue("succeed", {"x": 1})
+
+    assert client.get(f"/api/jobs/{job['id']}").json()["status"] == "queued"
+    assert [j["id"] for j in client.get("/api/jobs", params={"status": "queued"}).json()["jobs"]] == [job["id"]]
+    assert client.post(f"/api/jobs/{job['id']}/cancel").json()["status"] == "cancelled"
+    assert client.get("/api/jobs/missing").status_code == 404
+    assert client.get("/api/jobs", params={"status": "bogus"}).status_code == 400
+
+
+def test_generate_clips_returns_202_with_job_handle(queue, monkeypatch):
+    from clip_generator.app.api import generateClips
+    from clip_generator.app.services import clip_jobs
+
+    monkeypatch.setattr(clip_jobs, "get_job_queue", lambda: queue)
+    app = FastAPI()
+    app.include_router(generateClips.router)
+
+    response = TestClient(app).post("/generate-clips", json={
+        "filename": "stream.mp4", "profile_id": "p", "title": "t", "video_id": "v",
+    })
+
+    assert response.status_code == 202
+    job = queue.get(response.json()["job_id"])
+    assert job["kind"] == "generate_clips" and job["status"] == "queued"
+    assert job["payload"]["filename"] == "stream.mp4"
+    assert response.json()["status_url"] == f"/api/jobs/{job['id']}"
+
+    again = TestClient(app).post("/generate-clips", json={
+        "filename": "stream.mp4", "profile_id": "p", "title": "t", "video_id": "v",
+    })
+    assert again.json()["job_id"] == job["id"] and again.json()["deduplicated"]
+
+    # another user's request is its own job, sharing the per-source work
+    other = TestClient(app).post("/generate-clips", json={
+        "filename": "stream.mp4", "profile_id": "q", "title": "t", "video_id": "v",
+    })
+    assert other.json()["job_id"] != job["id"] and not other.json()["deduplicated"]
+    assert queue.get(other.json()["job_id"])["payload"]["work_key"] == job["payload"]["work_key"]
+
+
+def test_dedupe_key_attaches_to_active_jobs_only(queue):
+    first = queue.enqueue("succeed", {"x": 1}, dedupe_key="k")
+    again = queue.enqueue("succeed", {"x": 1}, dedupe_key="k")
+    assert again["id"] == first["id"] and again["deduplicated"]
+    assert queue.enqueue("succeed", {"x": 1}, dedupe_key="other")["id"] != first["id"]
+
+    jq.run_job(queue, queue.claim(worker_pid=1))
+    assert queue.get(first["id"])["status"] == jq.COMPLETED
+    assert not queue.enqueue("succeed", {"x": 1}, dedupe_key="k")["deduplicated"]
+
+
+def test_worker_stats_are_published_and_combined(queue):
+    def stats(loaded, hits):
+        return {"whisper": {"model": "base", "loaded": loaded, "leased": 0, "rss_mb": 100.0},
+                "transcript_cache": {"hits": hits, "misses": 1, "evictions": 0, "max_mb": 512.0}}
+
+    queue.publish_stats(11, stats(1, 2))
+    queue.publish_stats(12, stats(1, 3))
+    queue.publish_stats(12, stats(2, 5))  # a worker's latest stats replace its earlier ones
+
+    combined = jq.combine_worker_stats(queue.worker_stats())
+    assert combined["whisper"]["loaded"] == 3 and combined["whisper"]["rss_mb"] == 200.0
+    assert combined["whisper"]["model"] == "base" and combined["whisper"]["workers"] == 2
+    assert combined["transcript_cache"]["hits"] == 7 and combined["transcript_cache"]["max_mb"] == 512.0
+
+    queue.forget_workers([12])
+    assert [entry["pid"] for entry in queue.worker_stats()] == [11]
+    assert jq.combine_worker_stats([]) == {"whisper": {"workers": 0}, "transcript_cache": {"workers": 0}}
+
+
+class FakeProjects:
+    def __init__(self):
+        self.updates = []
+
+    def table(self, name):
+        return self
+
+    def update(self, fields):
+        self._fields = fields
+        return self
+
+    def eq(self, column, value):
+        self.updates.append((value, self._fields["status"]))
+        return self
+
+    def execute(self):
+        return self
+
+
+def test_a_worker_dying_on_the_last_attempt_fails_the_project(queue, monkeypatch):
+    from clip_generator.app.services import clip_jobs
+
+    projects = FakeProjects()
+    monkeypatch.setattr(clip_jobs, "supabase", projects)
+    job = queue.enqueue("generate_clips", {"project_id": "proj-1"}, max_attempts=1)
+
+    worker = multiprocessing.get_context("spawn").Process(target=time.sleep, args=(60,))
+    worker.start()
+    queue.claim(worker_pid=worker.pid)
+    os.kill(worker.pid, signal.SIGKILL)
+    worker.join()
+
+    # what the supervisor does for a worker that exited
+    assert queue.recover([worker.pid]) == 1
+    assert queue.get(job["id"])["status"] == jq.FAILED
+    assert projects.updates == [("proj-1", jq.FAILED)]
+
+
+def test_finalizers_run_when_jobs_end_for_good(queue, monkeypatch):
+    monkeypatch.setitem(jq.JOB_FINALIZERS, "explode", f"{__name__}:record_finalized")
+    ended = FINALIZED
+    ended.clear()
+
+    job = queue.enqueue("explode", {}, max_attempts=2)
+    jq.run_job(queue, queue.claim(1))
+    assert ended == []  # retried, not finished
+    jq.run_job(queue, queue.claim(1))
+    assert ended == [(job["id"], jq.FAILED)]
+
+    cancelled = queue.enqueue("explode", {})
+    queue.cancel(cancelled["id"])
+    assert ended[-1] == (cancelled["id"], jq.CANCELLED)
@@ -0,0 +1,80 @@
+import os
+import threading
+import time
+
+from clip_generator.app.services.media_store import MediaStore, source_key
+
+
+def test_concurrent_fetches_download_once(tmp_path):
+    store = MediaStore(str(tmp_path))
+    calls = []
+
+    def download(path):
+        calls.append(path)
+        time.sleep(0.2)
+        with open(path, "wb") as f:
+            f.write(b"video")
+
+    source = source_key("twitch", "123", quality="720p", ranges="")
+    assert source == "twitch:123?quality=720p"
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(store.fetch(source, download))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert {entry["path"] for entry in results} == {calls[0]}
+    assert store.lookup(source)["size"] == 5
+
+
+def test_changed_or_missing_files_are_forgotten(tmp_path):
+    store = MediaStore(str(tmp_path))
+    entry = store.fetch("youtube:abc", lambda path: open(path, "wb").write(b"abc"))
+    assert store.by_hash(entry["sha256"])["source"] == "youtube:abc"
+
+    os.remove(entry["path"])
+    assert store.lookup("youtube:abc") is None
+    assert store.stats()["sources"] == 0
+
+
+def test_identical_content_is_stored_once(tmp_path):
+    store = MediaStore(str(tmp_path))
+    first = store.fetch("youtube:a", lambda path: open(path, "wb").write(b"same"))
+    second = store.fetch("youtube:b", lambda path: open(path, "wb").write(b"same"))
+    assert second["path"] == first["path"]
+    assert store.stats()["files"] == 1
+
+
+def test_least_recently_used_files_are_evicted(tmp_path):
+    store = MediaStore(str(tmp_path), max_bytes=10, lease_seconds=0)
+    old = store.fetch("twitch:1", lambda path: open(path, "wb").write(b"1" * 4))
+    store.fetch("twitch:2", lambda path: open(path, "wb").write(b"2" * 4))
+    store.lookup("twitch:1")  # now more recent than twitch:2
+    store.fetch("twitch:3", lambda path: open(path, "wb").write(b"3" * 4))
+
+    assert store.lookup("twitch:2") is None
+    assert store.lookup("twitch:1")["path"] == old["path"]
+    assert store.lookup("twitch:3") is not None
+    assert store.evictions == 1
+
+
+def test_files_in_use_or_leased_are_not_evicted(tmp_path):
+    store = MediaStore(str(tmp_path), max_bytes=5, lease_seconds=0)
+    first = store.fetch("twitch:1", lambda path: open(path, "wb").write(b"1" * 4))
+
+    with store.in_use(first["path"]):
+        store.fetch("twitch:2", lambda path: open(path, "wb").write(b"2" * 4))
+        assert os.path.exists(first["path"])
+    store.fetch("twitch:3", lambda path: open(path, "wb").write(b"3" * 4))
+    assert store.lookup("twitch:1") is None
+
+    # a fresh lease protects a file no job has opened yet
+    store.lease_seconds = 3600
+    leased = store.fetch("twitch:4", lambda path: open(path, "wb").write(b"4" * 4))
+    store.fetch("twitch:5", lambda path: open(path, "wb").write(b"5" * 4))
+    assert os.path.exists(leased["path"])
+
+    # per-source download locks and use locks of evicted files are cleaned up
+    assert not [name for name in os.listdir(tmp_path / ".locks") if name.endswith(".lock")]
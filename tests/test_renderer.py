@@ -0,0 +1,27 @@
+from clip_generator.utils import renderer
+
+
+def test_prefer_single_pass_for_nearby_clips():
+    assert renderer.prefer_single_pass([(100, 140), (150, 190), (200, 240)])
+    assert not renderer.prefer_single_pass([(100, 140), (3600, 3640)])
+    assert not renderer.prefer_single_pass([(100, 140)])
+
+
+def test_single_pass_builds_one_ffmpeg_command(monkeypatch):
+    commands = []
+    monkeypatch.setattr(renderer, "has_audio", lambda path: True)
+    monkeypatch.setattr(renderer, "_run_ffmpeg", lambda cmd, what: commands.append(cmd))
+
+    jobs = [("a.mp4", "a.jpg", 100.0, 140.0), ("b.mp4", "b.jpg", 150.0, 190.0)]
+    renderer.render_clips_single_pass("src.mp4", jobs, 720, 1280)
+
+    assert len(commands) == 1
+    cmd = commands[0]
+    assert cmd[cmd.index("-ss") + 1] == "100.000"
+    assert cmd[cmd.index("-t") + 1] == "90.000"
+    graph = cmd[cmd.index("-filter_complex") + 1]
+    assert "split=4" in graph and "asplit=2" in graph
+    assert "trim=start=50.000:end=90.000" in graph
+    assert "trim=start=70.000:end=71.000" in graph  # thumbnail at the clip midpoint
+    for path in ("a.mp4", "a.jpg", "b.mp4", "b.jpg"):
+        assert path in cmd
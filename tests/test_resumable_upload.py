@@ -0,0 +1,65 @@
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+
+from clip_generator.utils.supabaseClient.local_storage import LocalStorage, create_app
+from clip_generator.utils.supabaseClient.resumable_upload import ResumableUploader, UploadFailed
+
+BASE = "http://storage.local"
+
+
+@pytest.fixture
+def storage():
+    return LocalStorage()
+
+
+def make_uploader(storage, **options):
+    client = TestClient(create_app(storage), base_url=BASE)
+    return ResumableUploader(BASE, "key", part_size=1000, buffered_parts=2, backoff=0, client=client, **options)
+
+
+def write(tmp_path, name, size):
+    path = tmp_path / name
+    path.write_bytes(os.urandom(size))
+    return path
+
+
+def test_streams_file_in_parts(storage, tmp_path):
+    path = write(tmp_path, "vod.mp4", 4500)
+
+    url = make_uploader(storage).upload_file(str(path), "videos", "p1/vod.mp4")
+
+    assert url == f"{BASE}/storage/v1/object/public/videos/p1/vod.mp4"
+    assert storage.objects[("videos", "p1/vod.mp4")] == path.read_bytes()
+    assert storage.patches == 5
+
+
+def test_failed_parts_resume_from_server_offset(storage, tmp_path):
+    path = write(tmp_path, "vod.mp4", 3000)
+    storage.fail_patches = 2  # each failure keeps half the part
+
+    make_uploader(storage).upload_file(str(path), "videos", "vod.mp4")
+
+    assert storage.objects[("videos", "vod.mp4")] == path.read_bytes()
+
+
+def test_gives_up_after_retries(storage, tmp_path):
+    path = write(tmp_path, "vod.mp4", 3000)
+    storage.fail_patches = 100
+
+    with pytest.raises(UploadFailed):
+        make_uploader(storage, retries=2).upload_file(str(path), "videos", "vod.mp4")
+
+
+def test_parallel_files_and_upsert(storage, tmp_path):
+    paths = [write(tmp_path, f"{i}.mp4", 2500 + i) for i in range(4)]
+    uploader = make_uploader(storage)
+
+    uploader.upload_files([(str(p), "videos", p.name) for p in paths], workers=4)
+
+    assert all(storage.objects[("videos", p.name)] == p.read_bytes() for p in paths)
+    with pytest.raises(UploadFailed):
+        uploader.upload_file(str(paths[0]), "videos", paths[0].name)
+    uploader.upload_file(str(paths[1]), "videos", paths[0].name, upsert=True)
+    assert storage.objects[("videos", paths[0].name)] == paths[1].read_bytes()
@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+
+from clip_generator.utils import scene_detection
+
+
+@pytest.fixture
+def two_shot_video(tmp_path):
+    path = str(tmp_path / "two_shots.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 10, (64, 48))
+    for i in range(200):
+        frame = np.full((48, 64, 3), 0 if i < 100 else 255, np.uint8)
+        frame[:, i % 64] = 128
+        writer.write(frame)
+    writer.release()
+    return path
+
+
+def test_raw_scenes_are_indexed_per_video(two_shot_video, tmp_path, monkeypatch):
+    monkeypatch.setattr(scene_detection, "SCENE_INDEX_DIR", str(tmp_path))
+
+    scenes = scene_detection.detect_raw_scenes(two_shot_video)
+    assert len(scenes) == 2
+    assert scenes[0][1] == pytest.approx(10.0, abs=0.5)
+
+    def no_decode(*args, **kwargs):
+        raise AssertionError("video decoded again")
+
+    monkeypatch.setattr(scene_detection, "open_video", no_decode)
+    assert scene_detection.detect_raw_scenes(two_shot_video) == scenes
+    # post-processing parameters only change the split, not the index
+    assert scene_detection.detect_scenes_local(two_shot_video, min_duration=4, max_duration=8) == [
+        (0.0, scenes[0][1] / 2), (scenes[0][1] / 2, scenes[0][1]),
+        (scenes[1][0], (scenes[1][0] + scenes[1][1]) / 2), ((scenes[1][0] + scenes[1][1]) / 2, scenes[1][1]),
+    ]
+
+
+def test_split_scenes_drops_short_and_splits_long():
+    assert scene_detection.split_scenes([(0, 10), (10, 130), (130, 175)], 30, 60) == [
+        (10, 70), (70, 130), (130, 175),
+    ]
@@ -0,0 +1,48 @@
+import numpy as np
+
+from clip_generator.utils.envelope import AudioEnvelope
+from clip_generator.utils.scoring import rank_windows, suppress_overlaps, window_features
+from clip_generator.utils.word_index import WordIndex
+
+
+def make_words(spec):
+    """spec: list of (time, text) pairs, one short entry each."""
+    return WordIndex([{"start": t, "end": t + 0.2, "text": f" {text}"} for t, text in spec])
+
+
+def test_suppress_overlaps_keeps_best_disjoint_windows():
+    t0 = np.array([0, 10, 40, 45])
+    t1 = np.array([30, 40, 70, 75])
+    scores = np.array([1.0, 3.0, 2.0, 2.5])
+
+    assert suppress_overlaps(t0, t1, scores, k=3) == [1, 3]
+    assert suppress_overlaps(t0, t1, scores, k=3, eligible=np.array([True, False, True, True])) == [3, 0]
+
+
+def test_features_cover_energy_cuts_and_keywords():
+    words = make_words([(1, "wow"), (2, "that"), (3, "was"), (4, "INSANE!"), (50, "ok")])
+    rms = np.full(600, 0.01)
+    rms[:100] = 0.5  # first 10 seconds are loud
+    envelope = AudioEnvelope(np.column_stack((rms, rms, 20 * np.log10(rms))), hop=0.1)
+
+    features = window_features([0, 30], [30, 60], words, envelope=envelope,
+                               cuts=[5.0, 10.0, 45.0], keywords=["wow", "insane"])
+
+    np.testing.assert_array_equal(features["word_count"], [4, 1])
+    assert features["loudness"][0] > features["loudness"][1]
+    assert features["energy_peaks"][0] > 0 and features["energy_peaks"][1] == 0
+    np.testing.assert_allclose(features["scene_cuts"], [4.0, 2.0])
+    np.testing.assert_allclose(features["keywords"], [4.0, 0.0])
+
+
+def test_rank_windows_handles_a_six_hour_vod():
+    rng = np.random.default_rng(1)
+    times = np.sort(rng.uniform(0, 6 * 3600, 60000))
+    words = make_words([(t, "word") for t in times])
+    starts = np.arange(0, 6 * 3600 - 60, 5.0)
+    windows = list(zip(starts, starts + 45))
+
+    ranked = rank_windows(windows, words, k=10, min_words=20, envelope=AudioEnvelope(rng.random((216000, 3))))
+    assert len(ranked) == 10
+    spans = sorted((t0, t1) for _, t0, t1, _ in ranked)
+    assert all(a[1] <= b[0] for a, b in zip(spans, spans[1:]))
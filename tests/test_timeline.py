@@ -0,0 +1,64 @@
+import math
+
+import numpy as np
+import pytest
+
+from clip_generator.app.models.request import RangeRequest
+from clip_generator.utils.hls_download import Segment
+from clip_generator.utils.timeline import Timeline, normalize_ranges, overlapping_segments, range_tag
+
+
+def test_normalize_ranges_merges_and_sorts():
+    assert normalize_ranges() is None
+    assert normalize_ranges(start=3600) == [(3600.0, math.inf)]
+    assert normalize_ranges(ranges=[(500, 900), (0, 100), (80, 200)]) == [(0.0, 200.0), (500.0, 900.0)]
+    assert range_tag([(0.0, 200.0), (500.0, math.inf)]) == "_0-200_500-inf"
+    with pytest.raises(ValueError):
+        normalize_ranges(start=10, end=5)
+
+
+def test_range_request_validates():
+    assert RangeRequest(ranges=[[600, 900]], start=0, end=60).requested_ranges() == [(0.0, 60.0), (600.0, 900.0)]
+    with pytest.raises(ValueError):
+        RangeRequest(start=-1)
+
+
+def test_segments_map_back_to_the_vod():
+    segments = [Segment(i, f"{i}.ts", i * 10.0, 10.0) for i in range(10)]
+    chosen = overlapping_segments(segments, [(15, 25), (72, 80)])
+    assert [s.index for s in chosen] == [1, 2, 7]
+
+    timeline = Timeline.from_segments(chosen)
+    assert timeline.pieces == [(0.0, 10.0), (20.0, 70.0)]
+    assert timeline.to_source(5.0) == 15.0
+    assert np.allclose(timeline.to_source([0.0, 19.0, 21.0]), [10.0, 29.0, 71.0])
+
+
+def test_timeline_round_trips_through_the_sidecar(tmp_path):
+    path = tmp_path / "vod.mp4"
+    assert Timeline.load(path) is None
+    Timeline.from_ranges([(600, 900), (7200, math.inf)]).save(path)
+    timeline = Timeline.load(path)
+    assert timeline.to_list() == [[0.0, 600.0], [300.0, 7200.0]]
+    assert timeline.to_source(310.0) == 7210.0
+
+
+def test_windows_never_straddle_a_jump_in_the_source():
+    timeline = Timeline.from_ranges([(600, 900), (7200, 7500)])
+    assert list(timeline.boundaries) == [300.0]
+    assert timeline.split_windows([(250.0, 340.0), (10.0, 60.0), (300.0, 340.0)]) == [
+        (250.0, 300.0), (300.0, 340.0), (10.0, 60.0)]
+    # a window barely crossing the boundary keeps only its long side
+    assert timeline.split_windows([(256.0, 316.0), (10.0, 60.0)], min_len=30.0) == [(256.0, 300.0), (10.0, 60.0)]
+    assert timeline.split_windows([(296.0, 326.0)], min_len=30.0) == []
+    # a window ending on the boundary ends in the first range, not the second
+    assert timeline.to_source(300.0) == 7200.0
+    assert timeline.to_source(300.0, end=True) == 900.0
+
+
+def test_transcript_segments_map_to_source_time():
+    timeline = Timeline.from_ranges([(600, 900), (7200, 7500)])
+    segments = [{"start": 10.0, "end": 300.0, "text": "a"}, {"start": 300.0, "end": 305.0, "text": "b"}]
+    assert timeline.map_segments(segments) == [{"start": 610.0, "end": 900.0, "text": "a"},
+                                               {"start": 7200.0, "end": 7205.0, "text": "b"}]
+    assert segments[0]["start"] == 10.0
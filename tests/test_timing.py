@@ -0,0 +1,20 @@
+from clip_generator.utils import timing
+
+
+def test_summary_reports_overlap(monkeypatch):
+    clock = iter([0.0, 10.0, 4.0, 12.0, 12.0, 15.0])
+    monkeypatch.setattr(timing.time, "perf_counter", lambda: next(clock))
+    timer = timing.StageTimer()
+
+    with timer.stage("transcription"):   # 0 -> 10
+        pass
+    with timer.stage("scene_detection"):  # 4 -> 12
+        pass
+    with timer.stage("clipping"):  # 12 -> 15
+        pass
+
+    summary = timer.summary()
+    assert summary["wall_seconds"] == 15.0
+    assert summary["overlap_seconds"] == 6.0
+    assert summary["stages"]["scene_detection"] == {"start": 4.0, "seconds": 8.0}
+    assert list(summary["stages"]) == ["transcription", "scene_detection", "clipping"]
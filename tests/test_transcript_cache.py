@@ -0,0 +1,80 @@
+import os
+
+from clip_generator.utils.transcript_cache import TranscriptCache
+
+WORDS = [
+    {"start": 0.0, "end": 0.4, "text": " Hello"},
+    {"start": 0.4, "end": 0.9, "text": " wörld!"},
+]
+
+
+def test_round_trip_and_counters(tmp_path):
+    cache = TranscriptCache(str(tmp_path), max_bytes=1 << 20)
+    key = cache.make_key("abc", model="base", language=None)
+
+    assert cache.get(key) is None
+    cache.put(key, WORDS)
+    assert cache.get(key) == WORDS
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_key_depends_on_model_settings():
+    assert TranscriptCache.make_key("abc", model="base") != TranscriptCache.make_key("abc", model="small")
+    assert TranscriptCache.make_key("abc", model="base") == TranscriptCache.make_key("abc", model="base")
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = TranscriptCache(str(tmp_path), max_bytes=1 << 20)
+    cache.put("old", WORDS)
+    cache.put("new", WORDS)
+    os.utime(tmp_path / "old.npz", (1, 1))
+    entry_size = os.path.getsize(tmp_path / "new.npz")
+
+    cache.max_bytes = entry_size
+    cache.evict()
+
+    assert cache.get("old") is None
+    assert cache.get("new") == WORDS
+    assert cache.stats()["evictions"] == 1
+
+
+def test_failed_write_leaves_no_temp_file(tmp_path, monkeypatch):
+    import numpy as np
+    import pytest
+
+    cache = TranscriptCache(str(tmp_path), max_bytes=1 << 20)
+
+    def fail(*args, **kwargs):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(np, "savez_compressed", fail)
+    with pytest.raises(OSError):
+        cache.put("k", WORDS)
+
+    assert os.listdir(tmp_path) == []
+
+
+def test_single_flight_computes_a_missing_entry_once(tmp_path):
+    import threading
+    import time
+
+    cache = TranscriptCache(str(tmp_path), max_bytes=1 << 20)
+    computed = []
+
+    def job():
+        with cache.single_flight("k"):
+            if cache.get("k") is None:
+                time.sleep(0.1)
+                computed.append(1)
+                cache.put("k", WORDS)
+
+    threads = [threading.Thread(target=job) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert computed == [1]
+    assert cache.get("k") == WORDS
+    assert not list(tmp_path.glob("*.lock"))
@@ -0,0 +1,82 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from clip_generator.utils.audio import frame_rms
+from clip_generator.utils.transcription import chunk_windows, overlapping_windows, plan_chunks, transcribe_samples
+
+
+def blocks_of(total_seconds, block_seconds, sample_rate=10):
+    samples = np.arange(int(total_seconds * sample_rate), dtype=np.float32)
+    step = int(block_seconds * sample_rate)
+    return [samples[i:i + step] for i in range(0, len(samples), step)]
+
+
+def test_windows_cover_timeline_with_overlap():
+    windows = list(overlapping_windows(blocks_of(95, 30), chunk_size=30, overlap=1, sample_rate=10))
+
+    assert [(w[0], w[1]) for w in windows] == [(0, 30), (30, 60), (60, 90), (90, 120)]
+    # every window is padded by the overlap on both sides, clipped to the audio
+    assert windows[0][2] == 0 and len(windows[0][3]) == 310
+    assert windows[1][2] == 29 and len(windows[1][3]) == 320
+    assert windows[3][2] == 89 and len(windows[3][3]) == 60
+    # samples line up with the reported audio offset
+    for _, _, offset, samples in windows:
+        assert samples[0] == offset * 10
+
+
+def test_chunk_windows_cut_planned_chunks_from_the_stream():
+    chunks = [(5, 10), (12, 20), (50, 60)]
+    windows = list(chunk_windows(blocks_of(55, 7), chunks, overlap=1, sample_rate=10))
+
+    assert [(w[0], w[1]) for w in windows] == chunks
+    assert windows[0][2] == 4 and len(windows[0][3]) == 70
+    assert windows[1][2] == 11 and len(windows[1][3]) == 100
+    # the stream ends inside the last chunk
+    assert windows[2][2] == 49 and len(windows[2][3]) == 60
+    for _, _, offset, samples in windows:
+        assert samples[0] == offset * 10
+
+
+def test_chunk_windows_stop_reading_after_the_last_chunk():
+    read = []
+
+    def blocks():
+        for block in blocks_of(100, 5):
+            read.append(block)
+            yield block
+
+    windows = list(chunk_windows(blocks(), [(0, 10)], overlap=1, sample_rate=10))
+
+    assert len(windows) == 1 and len(windows[0][3]) == 110
+    assert len(read) == 3
+
+
+def test_overlap_words_are_kept_once():
+    word = SimpleNamespace(start=1.5, end=2.5, word=" boundary")
+    model = SimpleNamespace(transcribe=lambda samples, **options: (
+        [SimpleNamespace(start=1.5, end=2.5, text=" boundary", words=[word])], None))
+
+    # window 0 owns [0, 30) and heard the word at 29.5s
+    first = transcribe_samples(model, None, audio_offset=28.0, owned_start=0, owned_end=30)
+    # window 1 owns [30, 60) and heard the same word through its overlap
+    second = transcribe_samples(model, None, audio_offset=28.0, owned_start=30, owned_end=60)
+
+    assert first == [{"start": 29.5, "end": 30.5, "text": " boundary"}]
+    assert second == []
+
+
+def test_plan_chunks_cuts_at_quiet_frames():
+    sample_rate = 1000
+    samples = np.ones(100 * sample_rate, dtype=np.float32)
+    samples[int(32.0 * sample_rate):int(32.1 * sample_rate)] = 0.0  # pause near the 30s boundary
+    samples[int(58.5 * sample_rate):int(58.6 * sample_rate)] = 0.0  # pause near the 60s boundary
+
+    chunks = plan_chunks(frame_rms(samples, 0.1, sample_rate), chunk_size=30, search=5, frame_seconds=0.1)
+
+    assert chunks[0] == pytest.approx((0.0, 32.05))
+    assert chunks[1] == pytest.approx((32.05, 58.55))
+    assert chunks[-1][1] == 100.0
+    # chunks tile the timeline without gaps
+    assert all(a[1] == b[0] for a, b in zip(chunks, chunks[1:]))
@@ -0,0 +1,72 @@
+import hashlib
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from clip_generator.app.api import upload
+from clip_generator.app.services import upload_service
+from clip_generator.app.services.upload_service import UploadSessions, stored_content_hash
+
+DATA = bytes(range(256)) * 4096  # 1 MiB
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(upload_service, "INPUT_DIR", str(tmp_path))
+    monkeypatch.setattr(upload, "upload_sessions", UploadSessions(str(tmp_path / ".sessions"), str(tmp_path)))
+    app = FastAPI()
+    app.include_router(upload.router)
+    return TestClient(app)
+
+
+def test_upload_streams_to_disk_and_hashes(client, tmp_path, monkeypatch):
+    monkeypatch.setattr(upload_service, "UPLOAD_CHUNK_SIZE", 64 * 1024)
+    response = client.post("/upload", files={"file": ("../../vod.mp4", DATA)})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["filename"] == "vod.mp4" and body["size"] == len(DATA)
+    assert body["sha256"] == hashlib.sha256(DATA).hexdigest()
+    assert (tmp_path / "vod.mp4").read_bytes() == DATA
+    assert stored_content_hash(tmp_path / "vod.mp4") == body["sha256"]
+
+
+def test_resumable_upload_survives_a_lost_part(client, tmp_path):
+    session = client.post("/upload/sessions", json={"filename": "vod.mp4", "size": len(DATA)}).json()
+    url = f"/upload/sessions/{session['upload_id']}"
+    half = len(DATA) // 2
+
+    assert client.put(url, params={"offset": 0}, content=DATA[:half]).json()["offset"] == half
+    # a retry of the first part is rejected with the offset to resume from
+    conflict = client.put(url, params={"offset": 0}, content=DATA[:half])
+    assert conflict.status_code == 409 and conflict.json()["detail"]["offset"] == half
+    # finalizing early fails; the upload stays resumable
+    assert client.post(f"{url}/finalize").status_code == 400
+    assert client.get(url).json()["offset"] == half
+
+    client.put(url, params={"offset": half}, content=DATA[half:])
+    done = client.post(f"{url}/finalize", json={"sha256": hashlib.sha256(DATA).hexdigest()})
+
+    assert done.status_code == 200 and done.json()["size"] == len(DATA)
+    assert (tmp_path / "vod.mp4").read_bytes() == DATA
+    assert client.get(url).status_code == 404
+
+
+def test_hash_is_recomputed_after_restart(client, tmp_path, monkeypatch):
+    session = client.post("/upload/sessions", json={"filename": "a.mp4"}).json()
+    url = f"/upload/sessions/{session['upload_id']}"
+    client.put(url, params={"offset": 0}, content=DATA[:1000])
+    # a new process has no running hash for the session
+    monkeypatch.setattr(upload, "upload_sessions", UploadSessions(str(tmp_path / ".sessions"), str(tmp_path)))
+    client.put(url, params={"offset": 1000}, content=DATA[1000:2000])
+
+    assert client.post(f"{url}/finalize", json={"sha256": "0" * 64}).status_code == 400
+    done = client.post(f"{url}/finalize", json={"sha256": hashlib.sha256(DATA[:2000]).hexdigest()})
+    assert done.status_code == 200
+
+
+def test_parts_cannot_exceed_declared_size(client):
+    session = client.post("/upload/sessions", json={"filename": "b.mp4", "size": 10}).json()
+    response = client.put(f"/upload/sessions/{session['upload_id']}", params={"offset": 0}, content=b"x" * 11)
+    assert response.status_code == 400
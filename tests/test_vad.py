@@ -0,0 +1,31 @@
+import numpy as np
+import pytest
+
+from clip_generator.utils.vad import SpeechMap, energy_speech_intervals
+
+
+def test_energy_vad_skips_silence():
+    sample_rate = 16000
+    rng = np.random.default_rng(0)
+    samples = np.zeros(60 * sample_rate, dtype=np.float32)
+    samples += rng.normal(0, 1e-4, len(samples)).astype(np.float32)  # near-silent noise floor
+    talk = slice(20 * sample_rate, 35 * sample_rate)
+    samples[talk] += rng.normal(0, 0.1, 15 * sample_rate).astype(np.float32)
+
+    intervals = energy_speech_intervals(samples, sample_rate)
+
+    assert len(intervals) == 1
+    start, end = intervals[0]
+    assert start == pytest.approx(20, abs=0.5)
+    assert end == pytest.approx(35, abs=0.5)
+
+
+def test_speech_map_coverage():
+    speech = SpeechMap([(10, 20), (0, 5), (30, 40)])
+
+    assert speech.total == 25
+    assert speech.coverage(0, 100) == 25
+    assert speech.coverage(3, 12) == 4
+    assert speech.coverage(20, 30) == 0
+    np.testing.assert_allclose(speech.coverage(np.array([0, 15]), np.array([10, 35])), [5, 10])
+    assert SpeechMap([]).coverage(0, 10) == 0
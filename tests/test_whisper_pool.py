@@ -0,0 +1,55 @@
+import threading
+
+from clip_generator.utils.whisper_pool import WhisperModelPool
+
+
+def make_pool(size):
+    pool = WhisperModelPool(size=size)
+    loads = []
+
+    def fake_load():
+        loads.append(object())
+        return loads[-1]
+
+    pool._load = fake_load
+    return pool, loads
+
+
+def test_lease_reuses_loaded_model():
+    pool, loads = make_pool(size=2)
+    with pool.lease() as first:
+        pass
+    with pool.lease() as second:
+        pass
+    assert first is second
+    assert len(loads) == 1
+    assert pool.stats()["loaded"] == 1
+
+
+def test_pool_never_exceeds_size():
+    pool, loads = make_pool(size=2)
+    barrier = threading.Barrier(4)
+    seen = []
+
+    def worker():
+        barrier.wait()
+        with pool.lease() as model:
+            seen.append(model)
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(seen) == 4
+    assert len(loads) <= 2
+    assert pool.stats()["leased"] == 0
+
+
+def test_warmup_loads_full_pool():
+    pool, loads = make_pool(size=3)
+    pool.warmup()
+    assert len(loads) == 3
+    pool.warmup()
+    assert len(loads) == 3
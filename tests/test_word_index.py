@@ -0,0 +1,40 @@
+import numpy as np
+
+from clip_generator.utils.clipper import select_scenes
+from clip_generator.utils.word_index import WordIndex
+
+TRANSCRIPT = [
+    {"start": 12.0, "end": 12.5, "text": " world"},
+    {"start": 11.0, "end": 11.5, "text": " Hello"},
+    {"start": 40.0, "end": 44.0, "text": " a whole segment here"},
+    {"start": 70.0, "end": 70.4, "text": " bye"},
+]
+
+
+def test_counts_and_text_for_a_window():
+    words = WordIndex(TRANSCRIPT)
+
+    assert words.word_count(0, 30) == 2
+    assert words.text(0, 30) == "Hello world"
+    # entries belong to the window containing their midpoint
+    assert words.word_count(41.9, 42.1) == 4
+    assert words.word_count(43, 100) == 1
+    assert words.density(0, 20) == 0.1
+    assert words.words(60, 80) == [{"start": 70.0, "end": 70.4, "text": " bye"}]
+
+
+def test_vectorized_counts_match_scalar():
+    words = WordIndex(TRANSCRIPT)
+    t0 = np.array([0, 10, 30, 60])
+    t1 = np.array([100, 12, 50, 65])
+
+    np.testing.assert_array_equal(words.word_count(t0, t1), [7, 1, 4, 0])
+
+
+def test_select_scenes_uses_word_counts():
+    words = WordIndex(TRANSCRIPT)
+    scenes = [(0, 30), (30, 60), (60, 90)]
+
+    # scene 2 has too few words; the busiest scene ranks first
+    assert select_scenes(scenes, words, min_words=2, max_clips=5) == [(1, 30, 60), (0, 0, 30)]
+    assert select_scenes(scenes, words, min_words=2, max_clips=1) == [(1, 30, 60)]
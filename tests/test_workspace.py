@@ -0,0 +1,25 @@
+import os
+
+import pytest
+
+from clip_generator.utils.workspace import Workspace, sweep_workspaces
+
+
+def test_workspaces_are_private_and_removed(tmp_path):
+    with Workspace("job-1", root=str(tmp_path)) as a, Workspace("job-1", root=str(tmp_path)) as b:
+        assert a.path != b.path
+        open(a.file("clip_0.mp4"), "wb").close()
+        assert not os.path.exists(b.file("clip_0.mp4"))
+    assert os.listdir(tmp_path) == []
+
+
+def test_on_success_keeps_failed_workspaces_until_swept(tmp_path):
+    with pytest.raises(RuntimeError):
+        with Workspace("job-2", root=str(tmp_path), cleanup="on_success") as workspace:
+            raise RuntimeError("render failed")
+    assert os.path.isdir(workspace.path)
+
+    assert sweep_workspaces(str(tmp_path), max_age=3600) == 0
+    os.utime(workspace.path, (1, 1))
+    assert sweep_workspaces(str(tmp_path), max_age=3600) == 1
+    assert not os.path.exists(workspace.path)